@@ -1,11 +1,13 @@
-import React, { useState, useEffect } from "react";
+import React, { useState, useEffect, useRef } from "react";
 import {
     fetchDashboard,
     fetchUsers,
+    fetchUsersPage,
     fetchUserDetail,
     blockUser,       // ✅ fixed
     unblockUser,     // ✅ fixed
-    editUser         // ✅ fixed
+    editUser,        // ✅ fixed
+    privateMediaUrl
 } from "./adminApi";
 import { useNavigate } from "react-router-dom";
 
@@ -16,11 +18,14 @@ export default function AdminDashboard() {
     const [activePage, setActivePage] = useState("dashboard");
     const [stats, setStats] = useState(null);
     const [users, setUsers] = useState([]);
+    const [nextPage, setNextPage] = useState(null);
     const [selectedUser, setSelectedUser] = useState(null);
     const [loading, setLoading] = useState(true);
     const [error, setError] = useState(null);
     const [searchQuery, setSearchQuery] = useState("");
+    const [searchTerms, setSearchTerms] = useState("");
     const [filterStatus, setFilterStatus] = useState("all");
+    const syncedAt = useRef(null); // `updated_since` for the next delta sync
 
     // Load dashboard + users
     useEffect(() => {
@@ -29,9 +34,6 @@ export default function AdminDashboard() {
             try {
                 const dashboardRes = await fetchDashboard();
                 setStats(dashboardRes.data);
-
-                const usersRes = await fetchUsers();
-                setUsers(usersRes.data);
             } catch (err) {
                 console.error("API error:", err);
                 setError("Failed to load data. Check console for details.");
@@ -42,27 +44,85 @@ export default function AdminDashboard() {
         loadData();
     }, []);
 
-    // Filtering
-    const filteredUsers = users.filter((u) => {
-        const fullName = u.full_name || "";
-        const email = u.email || "";
-        const matchesSearch =
-            fullName.toLowerCase().includes(searchQuery.toLowerCase()) ||
-            email.toLowerCase().includes(searchQuery.toLowerCase());
-
-        const matchesStatus =
-            filterStatus === "all"
-                ? true
-                : filterStatus === "active"
-                    ? u.is_active && !u.is_blocked
-                    : filterStatus === "blocked"
-                        ? u.is_blocked
-                        : filterStatus === "pending"
-                            ? !u.is_active && !u.is_blocked
-                            : true;
-
-        return matchesSearch && matchesStatus;
-    });
+    // Users are paginated and filtered (status, search) on the server
+    const loadUsers = async (status, q) => {
+        const params = {};
+        if (status !== "all") params.status = status;
+        if (q) params.q = q;
+        // our clock, for the first sync only; the server looks DELTA_SYNC_OVERLAP_SECONDS further back
+        const startedAt = new Date().toISOString();
+        const usersRes = await fetchUsers(params);
+        setUsers(usersRes.data.results);
+        setNextPage(usersRes.data.next);
+        syncedAt.current = startedAt;
+    };
+
+    const statusOf = (u) => (u.is_blocked ? "blocked" : !u.is_active ? "pending" : "active");
+
+    // Delta sync: fetch only the users changed or deleted since the last sync and
+    // merge them into the loaded rows, instead of reloading the whole list
+    const syncUsers = async () => {
+        if (!syncedAt.current) return;
+        let res;
+        try {
+            res = await fetchUsers({ updated_since: syncedAt.current });
+        } catch (err) {
+            if (err.response?.status === 400) return loadUsers(filterStatus, searchTerms); // too old: reload
+            throw err;
+        }
+        const deleted = new Set(res.data.deleted);
+        const changed = [...res.data.results];
+        while (res.data.next) {
+            res = await fetchUsersPage(res.data.next);
+            changed.push(...res.data.results);
+        }
+        syncedAt.current = res.data.synced_at;
+
+        const byId = new Map(changed.map((u) => [u.id, u]));
+        const listed = (u) => !deleted.has(u.id) && (filterStatus === "all" || statusOf(u) === filterStatus);
+        setUsers((prev) => {
+            const kept = prev.map((u) => byId.get(u.id) || u).filter(listed);
+            // new registrations go on top (the list is newest first); with a search, only what it found is shown
+            const newest = prev.length ? new Date(prev[0].date_joined) : null;
+            const added = searchTerms ? [] : changed
+                .filter((u) => !prev.some((p) => p.id === u.id) && listed(u))
+                .filter((u) => !newest || new Date(u.date_joined) > newest)
+                .sort((a, b) => new Date(b.date_joined) - new Date(a.date_joined));
+            return [...added, ...kept];
+        });
+        setSelectedUser((prev) => (prev && byId.get(prev.id) ? { ...prev, ...byId.get(prev.id) } : prev));
+    };
+
+    // Pick up other admins' changes and new registrations while the dashboard is open
+    useEffect(() => {
+        const timer = setInterval(() => {
+            syncUsers().catch((err) => console.error("Delta sync failed:", err));
+        }, 30000);
+        return () => clearInterval(timer);
+    }, [filterStatus, searchTerms]);
+
+    // Search once typing pauses, not on every keystroke
+    useEffect(() => {
+        const timer = setTimeout(() => setSearchTerms(searchQuery.trim()), 300);
+        return () => clearTimeout(timer);
+    }, [searchQuery]);
+
+    useEffect(() => {
+        loadUsers(filterStatus, searchTerms).catch((err) => {
+            console.error("API error:", err);
+            setError("Failed to load data. Check console for details.");
+        });
+    }, [filterStatus, searchTerms]);
+
+    const loadMoreUsers = async () => {
+        try {
+            const res = await fetchUsersPage(nextPage);
+            setUsers((prev) => [...prev, ...res.data.results]);
+            setNextPage(res.data.next);
+        } catch (err) {
+            console.error("Failed to load more users:", err);
+        }
+    };
 
     // View user
     const viewUser = async (id) => {
@@ -82,19 +142,8 @@ export default function AdminDashboard() {
             const res = isBlocked ? await unblockUser(id) : await blockUser(id);
             alert(res.data.message);
 
-            // Update state
-            setUsers(
-                users.map((u) =>
-                    u.id === id ? { ...u, is_blocked: !u.is_blocked } : u
-                )
-            );
-
-            if (selectedUser?.id === id) {
-                setSelectedUser({
-                    ...selectedUser,
-                    is_blocked: !selectedUser.is_blocked,
-                });
-            }
+            // merge the change (and anything else that changed meanwhile) into the list
+            await syncUsers().catch((err) => console.error("Delta sync failed:", err));
 
             // refresh dashboard cards immediately
             try {
@@ -115,8 +164,7 @@ export default function AdminDashboard() {
         try {
             await editUser(id, formData);
             alert("User updated successfully!");
-            const usersRes = await fetchUsers();
-            setUsers(usersRes.data);
+            await syncUsers().catch((err) => console.error("Delta sync failed:", err));
             // refresh dashboard cards
             try {
                 const dashboardRes = await fetchDashboard();
@@ -226,7 +274,7 @@ export default function AdminDashboard() {
                                     </tr>
                                 </thead>
                                 <tbody>
-                                    {filteredUsers.map((u) => (
+                                    {users.map((u) => (
                                         <tr key={u.id}>
                                             <td>{u.membership_id || "-"}</td>
                                             <td>{u.full_name || "-"}</td>
@@ -249,6 +297,9 @@ export default function AdminDashboard() {
                                     ))}
                                 </tbody>
                             </table>
+                            {nextPage && (
+                                <button onClick={loadMoreUsers}>Load more</button>
+                            )}
                         </>
                     )}
 
@@ -266,7 +317,7 @@ export default function AdminDashboard() {
                             <p><b>Address:</b> {selectedUser.profile?.address || "-"}</p>
                             <p><b>Skills:</b> {selectedUser.profile?.skills || "-"}</p>
                             <p><b>Languages:</b> {selectedUser.profile?.languages || "-"}</p>
-                            <p><b>Resume:</b> {selectedUser.profile?.resume && <a href={selectedUser.profile.resume} target="_blank" rel="noreferrer">View</a>}</p>
+                            <p><b>Resume:</b> {selectedUser.profile?.resume && <a href={privateMediaUrl(selectedUser.profile.resume)} target="_blank" rel="noreferrer">View</a>}</p>
                             <p><b>Profile Photo:</b> {selectedUser.profile?.profile_photo && <img src={selectedUser.profile.profile_photo} alt="Profile" style={{ width: '100px', height: '100px', objectFit: 'cover' }} />}</p>
 
                             <h3>Education:</h3>
@@ -162,7 +162,8 @@ function ProfileForm() {
                 <label>Resume</label>
                 <input type="file" name="resume" onChange={handleFileChange} />
                 {profile.resume && typeof profile.resume === "string" && (
-                    <a href={profile.resume} target="_blank" rel="noreferrer">View Resume</a>
+                    // resumes are private: the link carries the access token
+                    <a href={`${profile.resume}?token=${encodeURIComponent(localStorage.getItem("access_token") || "")}`} target="_blank" rel="noreferrer">View Resume</a>
                 )}
 
                 {/* --- Education --- */}
@@ -18,11 +18,21 @@ API.interceptors.request.use((req) => {
 
 // 3️⃣ Admin APIs
 export const fetchDashboard = () => API.get("/admin/stats/");
-export const fetchUsers = () => API.get("/admin/users/");
+// Paginated: returns { next, previous, results }. `params` are the server-side
+// filters (status, verified, blocked, joined_after, joined_before, q, ordering).
+export const fetchUsers = (params = {}) => API.get("/admin/users/", { params });
+export const fetchUsersPage = (url) => API.get(url); // follow a `next` cursor link
+export const exportUsers = (params = {}) =>
+    API.get("/admin/users/export/", { params, responseType: "blob" }); // export_format: csv | ndjson
 export const fetchUserDetail = (id) => API.get(`/admin/users/${id}/`);
 export const blockUser = (id) => API.post(`/admin/users/${id}/block/`);
 export const unblockUser = (id) => API.post(`/admin/users/${id}/unblock/`);
 export const editUser = (id, data) => API.patch(`/admin/users/${id}/`, data);
+// Resumes are private: a plain link needs the access token in the query string
+export const privateMediaUrl = (url) => {
+    const token = localStorage.getItem("admin_access_token");
+    return url && token ? `${url}${url.includes("?") ? "&" : "?"}token=${encodeURIComponent(token)}` : url;
+};
 
 // 4️⃣ Optional: Catch errors centrally (like 403)
 API.interceptors.response.use(
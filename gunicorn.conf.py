@@ -0,0 +1,34 @@
+# Picked up automatically by `gunicorn socrp_backend.wsgi` (see Procfile).
+#
+# Two ways to run the web process:
+#
+#   WSGI (default, as in the Procfile) - sync workers, one request per worker at a time:
+#       gunicorn socrp_backend.wsgi
+#
+#   ASGI - uvicorn workers; a request waiting on the database or a slow client
+#   only parks a coroutine. Enable the async read views with it:
+#       ASYNC_READ_VIEWS=true gunicorn socrp_backend.asgi:application -k uvicorn_worker.UvicornWorker
+#
+# Compare the two with `python manage.py bench_http <url> --concurrency 50` against each.
+#
+# Measured (2 workers, 1 vCPU, local PostgreSQL 16 over a Unix socket, 2000 seeded
+# members; WSGI with DB_CONNECTION_MODE=persistent, ASGI with pool):
+#
+#                                      WSGI                    ASGI
+#   shared profile, c=50, n=2000     73 req/s, p95  809 ms   56 req/s, p95 1349 ms
+#   profile/me,     c=50, n=2000     90 req/s, p95  629 ms   59 req/s, p95 1327 ms
+#   admin stats,    c=50, n=2000    220 req/s, p95  258 ms   96 req/s, p95  855 ms
+#   admin stats, c=20, n=1000,
+#     with 4 change streams open     100 of 1000 timed out    all 1000 served,
+#                                    (10 s), p50 99 ms        p95 264 ms
+#
+# When the CPU is the limit, WSGI is faster: each async ORM call still hops to a
+# thread. ASGI is worth it when workers spend their time waiting (open change
+# streams, slow clients, a distant database), which is where WSGI stalls. So WSGI
+# stays the default.
+
+
+def worker_exit(server, worker):
+    # don't lose profile views still sitting in this worker's buffer
+    from users import viewlog
+    viewlog.flush()
@@ -0,0 +1,51 @@
+"""
+Connection management for DATABASES entries (used by settings.py).
+
+DB_CONNECTION_MODE picks one of:
+
+* ``none``       - a new connection per request, closed at the end (Django's default).
+* ``persistent`` - each worker thread keeps its connection for CONN_MAX_AGE seconds and
+  checks it is still alive before reusing it (CONN_HEALTH_CHECKS). Right for sync
+  gunicorn workers, where a worker is one thread.
+* ``pool``       - a psycopg 3 connection pool per worker process (Django's native
+  ``OPTIONS["pool"]``). Needed under ASGI, where requests run on changing threads and
+  persistent connections wouldn't be reused. Keep ``workers * max_size`` below the
+  server's max_connections.
+
+Only PostgreSQL supports ``pool``; other engines fall back to ``persistent``.
+
+``python manage.py bench_db_connections -n 500`` against a local PostgreSQL 16
+(Unix socket, trust auth, so connecting is as cheap as it gets), 3 queries
+per request:
+
+    none        mean 3.5-3.8 ms   p95 4.2-4.6 ms
+    persistent  mean 0.4 ms       p95 0.4-0.7 ms
+    pool        mean 0.4 ms       p95 0.5 ms
+
+Nearly all of ``none`` is the connection setup, and over TCP with password
+auth it only gets bigger. Use ``persistent`` or ``pool``; there is no
+per-request difference between them.
+"""
+from django.core.exceptions import ImproperlyConfigured
+
+MODES = ("none", "persistent", "pool")
+POSTGRES_ENGINES = ("django.db.backends.postgresql",)
+
+
+def apply_connection_mode(database, mode, conn_max_age=60, pool=None):
+    """Return a copy of the ``database`` settings dict set up for ``mode``."""
+    if mode not in MODES:
+        raise ImproperlyConfigured(f"DB_CONNECTION_MODE must be one of {', '.join(MODES)}, not {mode!r}")
+    database = {**database, "OPTIONS": dict(database.get("OPTIONS", {}))}
+    database["OPTIONS"].pop("pool", None)
+    if mode == "pool" and database["ENGINE"] not in POSTGRES_ENGINES:
+        mode = "persistent"
+    if mode == "none":
+        database.update(CONN_MAX_AGE=0, CONN_HEALTH_CHECKS=False)
+    elif mode == "persistent":
+        database.update(CONN_MAX_AGE=conn_max_age, CONN_HEALTH_CHECKS=True)
+    else:
+        # the pool owns connection lifetime; Django must hand connections back every request
+        database.update(CONN_MAX_AGE=0, CONN_HEALTH_CHECKS=False)
+        database["OPTIONS"]["pool"] = dict(pool or {})
+    return database
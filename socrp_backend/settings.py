@@ -10,9 +10,12 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 import os
+import sys
+import tempfile
 from pathlib import Path
-from decouple import config
+from decouple import Csv, config
 import dj_database_url
+from socrp_backend.database import apply_connection_mode
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -56,8 +59,36 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
-   
+    'users.middleware.RequestMetricsMiddleware',
+    'users.routers.ReplicaRoutingMiddleware',
 ]
+# Serve shared profiles, profile/me and admin stats from async views (users.async_views).
+# Turn on when running under ASGI (see gunicorn.conf.py); under WSGI each async view
+# would just get its own event loop
+ASYNC_READ_VIEWS = config('ASYNC_READ_VIEWS', default=False, cast=bool)
+
+# Request metrics (users.middleware / users.metrics). Query timing is sampled;
+# /metrics needs `Authorization: Bearer $METRICS_TOKEN` or a staff session
+METRICS_ENABLED = config('METRICS_ENABLED', default=True, cast=bool)
+METRICS_SAMPLE_RATE = config('METRICS_SAMPLE_RATE', default=0.1, cast=float)
+METRICS_SLOW_REQUEST_MS = config('METRICS_SLOW_REQUEST_MS', default=1000, cast=int)
+METRICS_SLOW_QUERY_MS = config('METRICS_SLOW_QUERY_MS', default=200, cast=int)
+METRICS_TOKEN = config('METRICS_TOKEN', default='')
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'plain': {'format': '%(asctime)s %(levelname)s %(name)s %(message)s'},
+    },
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler', 'formatter': 'plain'},
+    },
+    'loggers': {
+        'users': {'handlers': ['console'], 'level': config('LOG_LEVEL', default='INFO'), 'propagate': False},
+    },
+}
+
 # CORS Configuration
 CORS_ALLOW_ALL_ORIGINS = True
 
@@ -84,12 +115,64 @@ WSGI_APPLICATION = 'socrp_backend.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
+# Connection handling: none | persistent | pool (see socrp_backend/database.py).
+# Pool sizes are per worker process.
+DB_CONNECTION_MODE = config('DB_CONNECTION_MODE', default='persistent')
+DB_CONN_MAX_AGE = config('DB_CONN_MAX_AGE', default=60, cast=int)
+DB_POOL = {
+    'min_size': config('DB_POOL_MIN_SIZE', default=2, cast=int),
+    'max_size': config('DB_POOL_MAX_SIZE', default=4, cast=int),
+    'timeout': config('DB_POOL_TIMEOUT', default=10, cast=float),  # seconds to wait for a free connection
+    'max_idle': config('DB_POOL_MAX_IDLE', default=300, cast=float),
+    'max_lifetime': config('DB_POOL_MAX_LIFETIME', default=3600, cast=float),
+}
+
 DATABASES = {
-    'default': dj_database_url.config(
-        default=config("DATABASE_URL")
+    'default': apply_connection_mode(
+        dj_database_url.config(default=config("DATABASE_URL")),
+        DB_CONNECTION_MODE, conn_max_age=DB_CONN_MAX_AGE, pool=DB_POOL,
     )
 }
-
+if DATABASES['default']['ENGINE'] == 'django.db.backends.sqlite3':
+    # concurrent writers wait for the lock instead of failing with "database is locked"
+    options = DATABASES['default'].setdefault('OPTIONS', {})
+    options.setdefault('transaction_mode', 'IMMEDIATE')
+    options.setdefault('timeout', 20)
+    # a file rather than in-memory, so the threaded tests can share the test database
+    DATABASES['default'].setdefault('TEST', {}).setdefault(
+        'NAME', os.path.join(tempfile.gettempdir(), 'socrp-test-db.sqlite3'))
+
+# Read replicas (comma-separated URLs) become replica1, replica2, ...; users.routers sends
+# the read-heavy endpoints there. In tests they mirror `default` unless
+# DATABASE_REPLICA_TEST_MIRROR=false (then each gets its own test database).
+DATABASE_REPLICA_URLS = config('DATABASE_REPLICA_URLS', default='', cast=Csv())
+for _index, _url in enumerate(DATABASE_REPLICA_URLS, start=1):
+    DATABASES[f'replica{_index}'] = apply_connection_mode(
+        dj_database_url.parse(_url), DB_CONNECTION_MODE, conn_max_age=DB_CONN_MAX_AGE, pool=DB_POOL,
+    )
+    if config('DATABASE_REPLICA_TEST_MIRROR', default=True, cast=bool):
+        DATABASES[f'replica{_index}']['TEST'] = {'MIRROR': 'default'}
+DATABASE_ROUTERS = ['users.routers.ReplicaRouter']
+# After a user writes, their reads stay on the primary this long (replication lag budget)
+READ_YOUR_WRITES_SECONDS = config('READ_YOUR_WRITES_SECONDS', default=5, cast=int)
+
+
+# Cache: local memory per process by default; point CACHE_BACKEND/CACHE_LOCATION
+# at e.g. django.core.cache.backends.filebased.FileBasedCache to share it between workers
+CACHES = {
+    'default': {
+        'BACKEND': config('CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': config('CACHE_LOCATION', default='socrp'),
+    }
+}
+# Whether every worker process sees the same cache. Invalidation of cached profile pages and
+# auth users, replica pins and throttle buckets only work across workers if it does, so they're
+# skipped (users.caching) otherwise; LocMemCache is only shared when there's a single worker process
+PROCESS_LOCAL_CACHE_BACKENDS = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+CACHE_SHARED = config('CACHE_SHARED', default=CACHES['default']['BACKEND'] not in PROCESS_LOCAL_CACHE_BACKENDS, cast=bool)
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -109,16 +192,21 @@ AUTH_PASSWORD_VALIDATORS = [
     },
 ]
 # DRF Configuration
+# Tried in order; JWT first so API calls never touch the session. Basic auth
+# is off by default (it hashes a password on every request that sends it).
 REST_FRAMEWORK = {
-    'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.SessionAuthentication',
-        'rest_framework.authentication.BasicAuthentication',
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
-    ],
+    'DEFAULT_AUTHENTICATION_CLASSES': config(
+        'API_AUTHENTICATION_CLASSES',
+        default='users.authentication.CachedJWTAuthentication,rest_framework.authentication.SessionAuthentication',
+        cast=Csv(),
+    ),
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.AllowAny',
         'rest_framework.permissions.IsAuthenticated',
-    ]
+    ],
+    # reverse proxies in front of the app: the client IP (for throttling) is read that many hops
+    # back in X-Forwarded-For; 0 uses REMOTE_ADDR. Never unset: then any client can pick its IP
+    'NUM_PROXIES': config('NUM_PROXIES', default=0, cast=int),
 }
 # JWT configuration
 from datetime import timedelta
@@ -127,6 +215,20 @@ SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(days=1),
     'AUTH_HEADER_TYPES': ('Bearer',),
 }
+# Token buckets for the password-hashing endpoints (users.throttling); "memory" is per worker,
+# "cache" shares the buckets through CACHES (only across workers if CACHES is shared, see CACHE_SHARED)
+LOGIN_THROTTLE_ENABLED = config('LOGIN_THROTTLE_ENABLED', default=True, cast=bool)
+LOGIN_THROTTLE_BACKEND = config('LOGIN_THROTTLE_BACKEND', default='cache')
+LOGIN_THROTTLE_RATES = {
+    'token': {'ip': config('TOKEN_THROTTLE_IP_RATE', default='20/min'),
+              'email': config('TOKEN_THROTTLE_EMAIL_RATE', default='5/min')},
+    'admin_login': {'ip': config('ADMIN_LOGIN_THROTTLE_IP_RATE', default='10/min'),
+                    'email': config('ADMIN_LOGIN_THROTTLE_EMAIL_RATE', default='5/min')},
+    'register': {'ip': config('REGISTER_THROTTLE_IP_RATE', default='10/hour'),
+                 'email': config('REGISTER_THROTTLE_EMAIL_RATE', default='3/hour')},
+}
+# How long CachedJWTAuthentication may keep a user it has loaded (changes invalidate it sooner)
+AUTH_USER_CACHE_TTL = config('AUTH_USER_CACHE_TTL', default=300, cast=int)
 
 
 # Internationalization
@@ -151,6 +253,27 @@ STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')# for your CSS/JS
 
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+
+# Production media serving (users.media.serve_media). MEDIA_ACCEL is "",
+# "x-accel-redirect" (nginx, internal location at MEDIA_ACCEL_PREFIX) or "x-sendfile"
+SERVE_MEDIA = config('SERVE_MEDIA', default=True, cast=bool)
+MEDIA_ACCEL = config('MEDIA_ACCEL', default='')
+MEDIA_ACCEL_PREFIX = config('MEDIA_ACCEL_PREFIX', default='/protected-media/')
+# (request, name) -> "public", "private" or None (404); the default keeps resumes to
+# their owner, staff and share-link visitors
+MEDIA_ACCESS_POLICY = config('MEDIA_ACCESS_POLICY', default='users.media.member_media_policy')
+MEDIA_CACHE_MAX_AGE = config('MEDIA_CACHE_MAX_AGE', default=3600, cast=int)  # for names that aren't content-hashed
+
+# Uploads under profiles/ and resumes/ are stored once per distinct content
+# (sha256-named); `manage.py gc_media_blobs` removes unreferenced ones
+STORAGES = {
+    'default': {
+        'BACKEND': config('MEDIA_STORAGE_BACKEND', default='users.storage.ContentAddressedStorage'),
+    },
+    'staticfiles': {
+        'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage',
+    },
+}
 CORS_ALLOWED_ORIGINS = [
     "http://localhost:3000",
     "https://socrp-frontend-v2-2.onrender.com", # React dev server
@@ -162,10 +285,87 @@ FRONTEND_URL = "http://localhost:3000"
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
-EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
+EMAIL_BACKEND = config('EMAIL_BACKEND', default='django.core.mail.backends.smtp.EmailBackend')
+EMAIL_FILE_PATH = config('EMAIL_FILE_PATH', default=os.path.join(BASE_DIR, 'sent_emails'))  # filebased backend only
 EMAIL_HOST = 'smtp.gmail.com'
 EMAIL_PORT = 587
 EMAIL_USE_TLS = True
 EMAIL_HOST_USER = config('EMAIL_USER')         # Your Gmail address
 EMAIL_HOST_PASSWORD = config('EMAIL_PASSWORD')        # See note below
 DEFAULT_FROM_EMAIL = config('EMAIL_USER')
+
+# Email outbox: RegisterUser queues mail, `manage.py send_outbox_emails --loop` sends it
+OUTBOX_BATCH_SIZE = config('OUTBOX_BATCH_SIZE', default=50, cast=int)
+OUTBOX_MAX_ATTEMPTS = config('OUTBOX_MAX_ATTEMPTS', default=8, cast=int)
+OUTBOX_BACKOFF_SECONDS = config('OUTBOX_BACKOFF_SECONDS', default=30, cast=int)  # doubled per failed attempt
+OUTBOX_MAX_BACKOFF = config('OUTBOX_MAX_BACKOFF', default=3600, cast=int)
+OUTBOX_POLL_INTERVAL = config('OUTBOX_POLL_INTERVAL', default=5, cast=float)
+
+# Shared profile view logging: "sync" (INSERT per view), "buffered" (in-process
+# batches) or "spool" (append-only files loaded by `manage.py flush_view_logs`)
+PROFILE_VIEW_LOG_MODE = config('PROFILE_VIEW_LOG_MODE', default='buffered')
+if sys.argv[1:2] == ['test']:
+    # a buffer still holding views at exit would be flushed after the test database is
+    # gone, into the real spool; tests that need the buffer or the spool set them up
+    PROFILE_VIEW_LOG_MODE = 'sync'
+PROFILE_VIEW_LOG_BATCH_SIZE = config('PROFILE_VIEW_LOG_BATCH_SIZE', default=200, cast=int)
+PROFILE_VIEW_LOG_FLUSH_INTERVAL = config('PROFILE_VIEW_LOG_FLUSH_INTERVAL', default=5, cast=float)
+PROFILE_VIEW_LOG_SPOOL_DIR = config('PROFILE_VIEW_LOG_SPOOL_DIR', default=os.path.join(BASE_DIR, 'var', 'viewlog-spool'))
+# views of a share link that can't be found are retried (via the spool) for this long, then dropped
+PROFILE_VIEW_LOG_RETRY_SECONDS = config('PROFILE_VIEW_LOG_RETRY_SECONDS', default=3600, cast=int)
+
+# Shared profile pages: server-side cache lifetime and browser max-age (seconds)
+SHARED_PROFILE_CACHE_TTL = config('SHARED_PROFILE_CACHE_TTL', default=3600, cast=int)
+SHARED_PROFILE_BROWSER_MAX_AGE = config('SHARED_PROFILE_BROWSER_MAX_AGE', default=0, cast=int)
+
+# Share link analytics: hourly rollups older than this are pruned (daily ones are kept)
+VIEW_ROLLUP_HOURLY_RETENTION_DAYS = config('VIEW_ROLLUP_HOURLY_RETENTION_DAYS', default=7, cast=int)
+# A missing log id holds the rollup watermark back this long (it may still commit) before it's
+# taken to be a rollback and skipped, along with every other gap that was visible by then
+VIEW_ROLLUP_GAP_SECONDS = config('VIEW_ROLLUP_GAP_SECONDS', default=600, cast=int)
+
+# Retention (`manage.py purge_stale_data`); an age of 0 disables that policy
+RETENTION = {
+    'SHARE_LINK_GRACE_DAYS': config('RETENTION_SHARE_LINK_GRACE_DAYS', default=30, cast=int),
+    'VIEW_LOG_DAYS': config('RETENTION_VIEW_LOG_DAYS', default=180, cast=int),
+    'UNVERIFIED_USER_DAYS': config('RETENTION_UNVERIFIED_USER_DAYS', default=30, cast=int),
+    # also the oldest ?updated_since= the admin list accepts (older deletions may be gone)
+    'USER_TOMBSTONE_DAYS': config('RETENTION_USER_TOMBSTONE_DAYS', default=30, cast=int),
+    # a dashboard offline for longer gets a "reset" event instead of what it missed
+    'CHANGE_EVENT_DAYS': config('RETENTION_CHANGE_EVENT_DAYS', default=7, cast=int),
+    'BATCH_SIZE': config('RETENTION_BATCH_SIZE', default=1000, cast=int),
+    'PAUSE_SECONDS': config('RETENTION_PAUSE_SECONDS', default=0.2, cast=float),
+}
+
+# Admin list delta sync: ?updated_since= looks this far further back, so rows written
+# by transactions that hadn't committed at the client's previous sync aren't missed
+DELTA_SYNC_OVERLAP_SECONDS = config('DELTA_SYNC_OVERLAP_SECONDS', default=60, cast=int)
+
+# Admin change stream (users.events, /api/admin/events/), in seconds: how often the
+# change table is polled, heartbeat interval, and how long one connection lasts before
+# the browser reconnects (resuming from Last-Event-ID after CHANGE_STREAM_RETRY_MS)
+CHANGE_STREAM_POLL_INTERVAL = config('CHANGE_STREAM_POLL_INTERVAL', default=1.0, cast=float)
+CHANGE_STREAM_HEARTBEAT = config('CHANGE_STREAM_HEARTBEAT', default=15, cast=float)
+CHANGE_STREAM_MAX_SECONDS = config('CHANGE_STREAM_MAX_SECONDS', default=300, cast=float)
+CHANGE_STREAM_RETRY_MS = config('CHANGE_STREAM_RETRY_MS', default=3000, cast=int)
+CHANGE_STREAM_BATCH_SIZE = config('CHANGE_STREAM_BATCH_SIZE', default=100, cast=int)
+# how long a missing event id (a transaction still committing) holds back later events
+CHANGE_STREAM_GAP_SECONDS = config('CHANGE_STREAM_GAP_SECONDS', default=5, cast=float)
+# under WSGI each open stream ties up a worker thread for CHANGE_STREAM_MAX_SECONDS, so the
+# sync view answers 503 beyond this many per process; by default streams need the ASGI
+# view (ASYNC_READ_VIEWS)
+CHANGE_STREAM_SYNC_MAX_STREAMS = config('CHANGE_STREAM_SYNC_MAX_STREAMS', default=0, cast=int)
+
+# Most users one POST /api/admin/users/bulk/ may change (explicit ids or a filter)
+BULK_ACTION_MAX_USERS = config('BULK_ACTION_MAX_USERS', default=1000, cast=int)
+
+# Membership IDs are reserved from the per-year sequence this many at a time per worker
+MEMBERSHIP_ID_BLOCK_SIZE = config('MEMBERSHIP_ID_BLOCK_SIZE', default=20, cast=int)
+
+# Profile photos: uploads are re-encoded without EXIF and capped to this size (px);
+# thumbnails are square crops of PROFILE_PHOTO_THUMBNAIL_SIZE
+PROFILE_PHOTO_MAX_DIMENSION = config('PROFILE_PHOTO_MAX_DIMENSION', default=1600, cast=int)
+PROFILE_PHOTO_THUMBNAIL_SIZE = config('PROFILE_PHOTO_THUMBNAIL_SIZE', default=256, cast=int)
+# Uploads with more pixels than this are rejected before they're decoded (a small file can
+# decompress to gigabytes)
+PROFILE_PHOTO_MAX_PIXELS = config('PROFILE_PHOTO_MAX_PIXELS', default=40_000_000, cast=int)
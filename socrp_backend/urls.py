@@ -15,11 +15,14 @@ Including another URLconf
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
 from django.contrib import admin
-from django.urls import path,include
+import re
+from django.urls import path,include,re_path
 from django.conf import settings
-from django.conf.urls.static import static
 from rest_framework.routers import DefaultRouter
 from users.views import UserProfileViewSet
+from users.media import serve_media
+from users.metrics import metrics_view
+from users import async_views
 
 router = DefaultRouter()
 router.register(r'profile', UserProfileViewSet, basename='profile')
@@ -29,7 +32,15 @@ urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/', include('users.urls')),
     path('api1/', include(router.urls)),
+    path('metrics', metrics_view, name='metrics'),
 ]
 
-if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
\ No newline at end of file
+if settings.ASYNC_READ_VIEWS:
+    # ahead of the router's sync `me` route
+    urlpatterns.insert(0, path('api1/profile/me/', async_views.profile_me, name='profile-me'))
+
+if settings.SERVE_MEDIA:
+    # Range, conditional GETs, immutable caching and optional X-Accel-Redirect/X-Sendfile
+    urlpatterns += [
+        re_path(r"^%s(?P<path>.+)$" % re.escape(settings.MEDIA_URL.lstrip("/")), serve_media, name="media"),
+    ]
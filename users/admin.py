@@ -1,7 +1,8 @@
 from django.contrib import admin
-from .models import CustomUser,UserProfile, Education, WorkExperience
+from .models import CustomUser,UserProfile, Education, WorkExperience, OutboxEmail
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
+from . import search, tags
 
 
 class CustomUserAdmin(UserAdmin):
@@ -10,6 +11,14 @@ class CustomUserAdmin(UserAdmin):
     list_filter = ("is_active", "is_staff", "is_superuser")
     search_fields = ("email", "full_name", "membership_id")
     ordering = ("email",)
+    search_limit = 500
+
+    # use the member search index instead of icontains scans over the table
+    def get_search_results(self, request, queryset, search_term):
+        if not search.terms(search_term):
+            return super().get_search_results(request, queryset, search_term)
+        _, hits = search.search_members(search_term, limit=self.search_limit)
+        return queryset.filter(pk__in=[user_id for user_id, _ in hits]), False
 
     fieldsets = (
         (None, {"fields": ("email", "password")}),
@@ -42,6 +51,10 @@ class UserProfileAdmin(admin.ModelAdmin):
     search_fields = ("user__email", "user__full_name", "contact")
     inlines = [EducationInline, WorkExperienceInline]   # show related models inline
 
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        tags.sync_profile_tags([obj])
+
 @admin.register(Education)
 class EducationAdmin(admin.ModelAdmin):
     list_display = ("degree", "university", "year_of_completion", "marks_cgpa", "user_profile")
@@ -50,4 +63,10 @@ class EducationAdmin(admin.ModelAdmin):
 @admin.register(WorkExperience)
 class WorkExperienceAdmin(admin.ModelAdmin):
     list_display = ("company_name", "designation", "start_date", "end_date", "user_profile")
-    search_fields = ("company_name", "designation", "user_profile__user__full_name")
\ No newline at end of file
+    search_fields = ("company_name", "designation", "user_profile__user__full_name")
+
+@admin.register(OutboxEmail)
+class OutboxEmailAdmin(admin.ModelAdmin):
+    list_display = ("subject", "status", "attempts", "next_attempt_at", "created_at", "sent_at")
+    list_filter = ("status",)
+    search_fields = ("subject",)
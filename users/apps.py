@@ -6,3 +6,4 @@ class UsersConfig(AppConfig):
 
     def ready(self):
         import users.signals  # ✅ load signals when app is ready
+        import users.checks  # noqa: F401  registers the system checks
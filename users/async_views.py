@@ -0,0 +1,110 @@
+"""
+Async versions of the hot read endpoints, for ASGI deployments.
+
+Enabled with ASYNC_READ_VIEWS (see the routes in users.urls and
+socrp_backend.urls). They return exactly what their DRF counterparts in
+users.views return, but are plain Django async views: DRF's APIView is
+sync-only, so authentication is done with
+``CachedJWTAuthentication.aauthenticate`` (falling back to the session when
+SessionAuthentication is configured) and all database and cache access goes
+through the async ORM / cache APIs. A slow database or client then parks a
+coroutine instead of a whole worker.
+"""
+from django.conf import settings
+from django.http import Http404, HttpResponseNotModified, JsonResponse
+from django.utils import timezone
+from django.utils.http import parse_etags
+from django.views.decorators.http import require_GET
+from rest_framework.exceptions import APIException
+
+from . import events, profile_cache, routers, stats
+from .authentication import SESSION_AUTHENTICATION, CachedJWTAuthentication, QueryTokenJWTAuthentication, error_response
+from .models import UserProfile
+from .serializers import UserProfileSerializer
+from .viewlog import arecord_view
+
+async def _authenticate(request, authentication=CachedJWTAuthentication):
+    """The request's user (or None), the way the configured DRF authenticators would find it."""
+    result = await authentication().aauthenticate(request)
+    if result is not None:
+        return result[0]
+    if SESSION_AUTHENTICATION in settings.REST_FRAMEWORK["DEFAULT_AUTHENTICATION_CLASSES"]:
+        user = await request.auser()
+        if user.is_authenticated and user.is_active and not getattr(user, "is_blocked", False):
+            return user
+    return None
+
+
+async def _require_user(request, staff=False, authentication=CachedJWTAuthentication):
+    """``(user, None)`` or ``(None, error response)``."""
+    try:
+        user = await _authenticate(request, authentication)
+    except APIException as exc:
+        return None, error_response(exc.detail, exc.status_code)
+    if user is None:
+        return None, error_response("Authentication credentials were not provided.", 401)
+    if staff and not user.is_staff:
+        return None, error_response("You do not have permission to perform this action.", 403)
+    return user, None
+
+
+@require_GET
+async def shared_profile(request, token):
+    share_link = await profile_cache.aget_share_link(token)
+    if share_link is None:
+        raise Http404
+    link_id, user_id, expiry_date = share_link
+
+    remaining = (expiry_date - timezone.now()).total_seconds()
+    if remaining <= 0:
+        return JsonResponse({"error": "Link expired"}, status=410)
+
+    await routers.ause_replica(user_id)
+    await arecord_view(link_id, viewer_ip=request.META.get("REMOTE_ADDR"),
+                       user_agent=request.META.get("HTTP_USER_AGENT", ""))
+
+    version = await profile_cache.aprofile_version(user_id)
+    cached = await profile_cache.aget_cached_response(token, version)
+    if cached is None:
+        profile = await (UserProfile.objects.select_related("user")
+                         .prefetch_related("educations", "experiences").filter(user_id=user_id).afirst())
+        if profile is None:
+            raise Http404
+        data = UserProfileSerializer(profile, context={"share_token": token}).data
+        cached = await profile_cache.acache_response(token, version, expiry_date, data)
+    etag, data = cached
+
+    headers = profile_cache.response_headers(etag, remaining)
+    if etag in parse_etags(request.headers.get("If-None-Match", "")):
+        return HttpResponseNotModified(headers=headers)
+    return JsonResponse(data, headers=headers)
+
+
+@require_GET
+async def profile_me(request):
+    user, error = await _require_user(request)
+    if error:
+        return error
+    await routers.ause_replica(user.pk)
+    profile = await UserProfile.objects.filter(user=user).prefetch_related("educations", "experiences").afirst()
+    if profile:
+        profile.user = user
+        return JsonResponse(UserProfileSerializer(profile, context={"request": request}).data)
+    return JsonResponse({"user": {"id": user.id, "email": user.email, "full_name": user.full_name}})
+
+
+@require_GET
+async def admin_stats(request):
+    user, error = await _require_user(request, staff=True)
+    if error:
+        return error
+    await routers.ause_replica(user.pk)
+    return JsonResponse(await stats.acurrent())
+
+
+@require_GET
+async def change_events(request):
+    user, error = await _require_user(request, staff=True, authentication=QueryTokenJWTAuthentication)
+    if error:
+        return error
+    return events.event_stream_response(events.astream(events.parse_last_event_id(request)))
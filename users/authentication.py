@@ -0,0 +1,180 @@
+"""
+JWT authentication that resolves the user from a short-lived, versioned cache.
+
+A valid access token already proves who the caller is; the only thing the
+per-request ``CustomUser`` query adds is the user's current state. That
+state is cached per user together with a version number, and every save or
+delete of the user (blocking, deactivating, staff changes, password
+changes...) bumps the version on commit, so a changed user is re-read on its
+next request instead of after the TTL.
+
+Only the fields in AUTH_USER_FIELDS are cached (never the password hash);
+the user handed to the view has the rest deferred. Without a cache that all
+workers share (CACHE_SHARED, see users.caching) a bump in one worker can't
+reach the others, so the user is then read from the database every time.
+
+Code that changes users with ``QuerySet.update()`` bypasses the signals and
+must call ``invalidate_user`` / ``invalidate_users`` itself.
+"""
+import time
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.http import JsonResponse
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+from .caching import shared_cache
+
+
+def _version_key(user_id):
+    return f"auth-user-version:{user_id}"
+
+
+def _user_key(user_id):
+    return f"auth-user:{user_id}"
+
+
+def invalidate_user(user_id):
+    """Make the next request of `user_id` reload the user, once the current transaction commits."""
+    invalidate_users([user_id])
+
+
+def invalidate_users(user_ids):
+    user_ids = list(user_ids)
+    transaction.on_commit(lambda: shared_cache().set_many(
+        {_version_key(user_id): time.time_ns() for user_id in user_ids}, timeout=None))
+
+
+# what check_user and the views read from request.user; anything else loads on access
+AUTH_USER_FIELDS = ("id", "email", "full_name", "membership_id", "is_active", "is_blocked", "is_staff", "is_superuser")
+
+
+def _lookup(user_model, user_id):
+    fields = AUTH_USER_FIELDS + (("password",) if api_settings.CHECK_REVOKE_TOKEN else ())
+    return user_model.objects.filter(**{api_settings.USER_ID_FIELD: user_id}).values(*fields)
+
+
+def _entry(version, values):
+    """What's cached for a user: its auth fields, and a digest of the password hash if tokens are revocable."""
+    digest = get_md5_hash_password(values.pop("password")) if "password" in values else None
+    return version, values, digest
+
+
+def _user(user_model, entry):
+    _, values, digest = entry
+    fields = [field.attname for field in user_model._meta.concrete_fields if field.attname in values]  # model order
+    user = user_model.from_db(DEFAULT_DB_ALIAS, fields, [values[field] for field in fields])
+    user.password_digest = digest
+    return user
+
+
+def _cached_user_steps(user_model, user_id):
+    """
+    The lookup behind ``cached_user`` / ``acached_user``, as a generator: it
+    yields ``(target, method, args)`` for each cache or database call and is
+    sent back the result, so the two only differ in how they make the calls.
+    """
+    cache = shared_cache()
+    version_key, user_key = _version_key(user_id), _user_key(user_id)
+    found = yield cache, "get_many", ([version_key, user_key],)  # one round trip on the hot path
+    version = found.get(version_key)
+    if version is None:
+        # never reuse an old value after eviction, or a stale entry could match it again
+        yield cache, "add", (version_key, time.time_ns(), None)
+        version = yield cache, "get", (version_key,)
+    entry = found.get(user_key)
+    if entry is None or entry[0] != version:
+        values = yield _lookup(user_model, user_id), "first", ()
+        if values is None:
+            return None
+        entry = _entry(version, values)
+        yield cache, "set", (user_key, entry, settings.AUTH_USER_CACHE_TTL)
+    return _user(user_model, entry)
+
+
+def cached_user(user_model, user_id):
+    """The user with ``USER_ID_FIELD == user_id`` (or None), from the cache when it's current."""
+    steps, result = _cached_user_steps(user_model, user_id), None
+    try:
+        while True:
+            target, method, args = steps.send(result)
+            result = getattr(target, method)(*args)
+    except StopIteration as done:
+        return done.value
+
+
+async def acached_user(user_model, user_id):
+    """``cached_user`` through the async cache and ORM APIs."""
+    steps, result = _cached_user_steps(user_model, user_id), None
+    try:
+        while True:
+            target, method, args = steps.send(result)
+            result = await getattr(target, f"a{method}")(*args)
+    except StopIteration as done:
+        return done.value
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """``JWTAuthentication`` without the per-request user query, and blocked users are rejected."""
+
+    def user_id(self, validated_token):
+        try:
+            return validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError as e:
+            raise InvalidToken(_("Token contained no recognizable user identification")) from e
+
+    def check_user(self, user, validated_token):
+        if user is None:
+            raise AuthenticationFailed(_("User not found"), code="user_not_found")
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+        if getattr(user, "is_blocked", False):
+            raise AuthenticationFailed(_("User is blocked"), code="user_blocked")
+        if api_settings.CHECK_REVOKE_TOKEN:
+            digest = getattr(user, "password_digest", None) or get_md5_hash_password(user.password)
+            if validated_token.get(api_settings.REVOKE_TOKEN_CLAIM) != digest:
+                raise AuthenticationFailed(_("The user's password has been changed."), code="password_changed")
+        return user
+
+    def get_user(self, validated_token):
+        user = cached_user(self.user_model, self.user_id(validated_token))
+        return self.check_user(user, validated_token)
+
+    async def aauthenticate(self, request):
+        """Async ``authenticate()`` for plain Django async views: ``(user, token)`` or None."""
+        header = self.get_header(request)
+        if header is None:
+            return None
+        raw_token = self.get_raw_token(header)
+        if raw_token is None:
+            return None
+        validated_token = self.get_validated_token(raw_token)  # signature check only, no I/O
+        user = await acached_user(self.user_model, self.user_id(validated_token))
+        return self.check_user(user, validated_token), validated_token
+
+
+class QueryTokenJWTAuthentication(CachedJWTAuthentication):
+    """Also takes the access token from ``?token=``, for clients like EventSource that can't set headers."""
+
+    def get_header(self, request):
+        header = super().get_header(request)
+        token = request.GET.get("token")
+        if header is None and token:
+            header = f"{api_settings.AUTH_HEADER_TYPES[0]} {token}".encode()
+        return header
+
+
+# --- for the plain Django views (users.async_views, users.events) that authenticate with these classes ---
+SESSION_AUTHENTICATION = "rest_framework.authentication.SessionAuthentication"
+
+
+def error_response(detail, status):
+    """The JSON error response DRF would send for ``detail``."""
+    response = JsonResponse(detail if isinstance(detail, dict) else {"detail": str(detail)}, status=status)
+    if status == 401:
+        response["WWW-Authenticate"] = 'Bearer realm="api"'
+    return response
@@ -0,0 +1,82 @@
+"""
+Reference counts for content-addressed media (see users.storage).
+
+Every FileField value that points at a blob holds one reference. Signals
+in users.signals call ``retain``/``release`` when a field changes or its
+row is deleted; ``collect_garbage`` removes blobs nobody references any more.
+"""
+import os
+import time
+
+from django.core.files.storage import default_storage
+from django.db.models import F
+from django.utils import timezone
+
+from . import images
+from .models import CustomUser, MediaBlob, UserProfile
+
+# every field that may point at a blob
+BLOB_FIELDS = {
+    CustomUser: ("profile_photo", "resume"),
+    UserProfile: ("profile_photo", "resume"),
+}
+
+
+def is_blob(name):
+    return bool(name) and getattr(default_storage, "is_hashed", lambda _: False)(name)
+
+
+def loaded_names(instance):
+    """Stored file names of the blob fields, as loaded (without triggering deferred loads)."""
+    values = instance.__dict__
+    return {
+        field: str(values[field] or "") for field in BLOB_FIELDS[type(instance)] if field in values
+    }
+
+
+def retain(name):
+    if not is_blob(name):
+        return
+    MediaBlob.objects.bulk_create([MediaBlob(name=name, refcount=0)], ignore_conflicts=True)
+    MediaBlob.objects.filter(name=name).update(refcount=F("refcount") + 1, updated_at=timezone.now())
+
+
+def release(name):
+    if not is_blob(name):
+        return
+    MediaBlob.objects.filter(name=name).update(refcount=F("refcount") - 1, updated_at=timezone.now())
+
+
+def _still_referenced(name):
+    return any(
+        model.objects.filter(**{field: name}).exists()
+        for model, fields in BLOB_FIELDS.items()
+        for field in fields
+    )
+
+
+def collect_garbage(grace, dry_run=False):
+    """
+    Delete blobs (and their photo derivatives) with no references.
+
+    A blob is only removed if its count dropped to zero more than `grace`
+    ago, the file itself hasn't been re-uploaded within `grace`, and no row
+    points at it. Returns the list of removed (or, with `dry_run`, removable) names.
+    """
+    cutoff = timezone.now() - grace
+    removed = []
+    for blob in MediaBlob.objects.filter(refcount__lte=0, updated_at__lt=cutoff).order_by("pk").iterator():
+        try:
+            recently_written = time.time() - os.path.getmtime(default_storage.path(blob.name)) < grace.total_seconds()
+        except OSError:
+            recently_written = False
+        if recently_written or _still_referenced(blob.name):
+            continue
+        removed.append(blob.name)
+        if dry_run:
+            continue
+        for name in [blob.name] + [images.derivative_name(blob.name, kind) for kind in images.DERIVATIVES]:
+            if default_storage.exists(name):
+                default_storage.delete(name)
+        blob.delete()
+    return removed
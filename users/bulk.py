@@ -0,0 +1,72 @@
+"""
+Block, unblock or activate many members in one statement.
+
+The target rows are locked and read once, the ones that actually change are
+written with a single ``UPDATE``, and everything the per-user ``save()``
+signals would have done is done in bulk in the same transaction: MemberStats
+deltas, ``updated_at``, change-stream events and, on commit, the cached auth
+users, shared-profile versions and replica pins. Nothing else the signals
+maintain (search index, tags, photos) depends on these fields.
+"""
+from collections import Counter
+
+from django.db import transaction
+from django.utils import timezone
+
+from . import authentication, events, profile_cache, stats
+from .models import ChangeEvent, CustomUser
+
+ACTIONS = {
+    "block": {"is_blocked": True},
+    "unblock": {"is_blocked": False},
+    "activate": {"is_active": True},  # what VerifyEmail does
+}
+
+UPDATED = "updated"
+UNCHANGED = "unchanged"
+SKIPPED = "skipped"
+NOT_FOUND = "not_found"
+
+
+def apply(action, queryset, ids=None, actor=None):
+    """
+    Run ``action`` on every user in ``queryset``; returns ``{user_id: result}``.
+
+    ``ids`` are the ids the caller asked for, so the ones that don't exist can
+    be reported as not_found. The acting admin is never blocked (skipped).
+    """
+    values = ACTIONS[action]
+    results, changed, deltas, change_events = {}, [], Counter(), []
+    with transaction.atomic():
+        users = (queryset.select_for_update(of=("self",)).order_by("pk")
+                 .only("pk", "is_active", "is_blocked", "email", "full_name", "membership_id"))
+        for user in users:
+            if action == "block" and actor is not None and user.pk == actor.pk:
+                results[user.pk] = SKIPPED
+                continue
+            old_bucket = stats.status_bucket(user.is_active, user.is_blocked)
+            if all(getattr(user, field) == value for field, value in values.items()):
+                results[user.pk] = UNCHANGED
+                continue
+            for field, value in values.items():
+                setattr(user, field, value)
+            new_bucket = stats.status_bucket(user.is_active, user.is_blocked)
+            if new_bucket != old_bucket:
+                deltas[stats.BUCKET_FIELDS[old_bucket]] -= 1
+                deltas[stats.BUCKET_FIELDS[new_bucket]] += 1
+            kind = events.user_change_kind(old_bucket, new_bucket, created=False)
+            if kind:
+                change_events.append(ChangeEvent(kind=kind, user_id=user.pk, data=events.payload(user)))
+            results[user.pk] = UPDATED
+            changed.append(user.pk)
+
+        if changed:
+            CustomUser.objects.filter(pk__in=changed).update(**values, updated_at=timezone.now())
+            stats.apply_delta(deltas)
+            ChangeEvent.objects.bulk_create(change_events)
+            authentication.invalidate_users(changed)
+            profile_cache.bump_profile_versions(changed)
+
+    for user_id in ids or ():
+        results.setdefault(user_id, NOT_FOUND)
+    return results
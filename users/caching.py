@@ -0,0 +1,19 @@
+"""
+The cache that worker-spanning state (cached pages, versions, buckets, pins) goes through.
+
+Invalidating an entry only helps if every worker reads the same cache. With a
+per-process backend (LocMemCache, the default) a change seen by one worker
+would leave the others serving their stale copies, so unless CACHE_SHARED is
+set those callers get a cache that stores nothing and read the database
+instead.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.core.cache.backends.dummy import DummyCache
+
+_nothing = DummyCache("", {})
+
+
+def shared_cache():
+    """The default cache if all workers share it, else a no-op cache."""
+    return cache if settings.CACHE_SHARED else _nothing
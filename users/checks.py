@@ -0,0 +1,15 @@
+from django.conf import settings
+from django.core import checks
+
+
+@checks.register(checks.Tags.caches)
+def check_throttle_cache(app_configs, **kwargs):
+    # "cache" buckets in a per-process cache give every worker its own allowance
+    if settings.LOGIN_THROTTLE_ENABLED and settings.LOGIN_THROTTLE_BACKEND == "cache" and not settings.CACHE_SHARED:
+        return [checks.Warning(
+            "Login throttle buckets live in a per-process cache, so each worker allows the full rate.",
+            hint="Point CACHE_BACKEND at a cache all workers share (Redis, Memcached, database) "
+                 "or set CACHE_SHARED if there's a single worker process.",
+            id="users.W001",
+        )]
+    return []
@@ -0,0 +1,231 @@
+"""
+Server-Sent Events stream of member changes for the admin dashboard.
+
+Registrations, verifications, blocks, account / profile edits and deletions
+are written to ``ChangeEvent`` in the same transaction as the change (see
+users.signals), so an event exists exactly when its change committed. The
+stream polls that table from the last id the client saw: EventSource sends
+it back as ``Last-Event-ID`` when it reconnects, so a dropped or recycled
+connection (after CHANGE_STREAM_MAX_SECONDS) resumes without gaps. A comment
+line every CHANGE_STREAM_HEARTBEAT seconds keeps proxies from closing an idle
+stream.
+
+Ids are handed out at insert but become visible at commit, so a slow
+transaction can commit id N after N+1 was already sent. A missing id holds
+back everything after it for up to CHANGE_STREAM_GAP_SECONDS; after that it's
+taken to be a rollback and skipped.
+
+Under WSGI every open stream holds a worker thread and its database
+connection for up to CHANGE_STREAM_MAX_SECONDS, so the sync view only serves
+CHANGE_STREAM_SYNC_MAX_STREAMS of them per process (none by default) and
+answers 503 beyond that. With ASYNC_READ_VIEWS under ASGI a stream is a
+coroutine instead, and isn't capped.
+"""
+import asyncio
+import json
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from django.views.decorators.http import require_GET
+from rest_framework.exceptions import APIException
+
+from .authentication import SESSION_AUTHENTICATION, QueryTokenJWTAuthentication, error_response
+from .models import ChangeEvent
+
+
+def record(kind, user, **data):
+    """Log a change to ``user``; call inside the change's transaction."""
+    ChangeEvent.objects.create(kind=kind, user_id=user.pk, data=payload(user, **data))
+
+
+def user_change_kind(old_bucket, new_bucket, created):
+    """The event for a saved user, from its status bucket (users.stats) before and after."""
+    if created:
+        return ChangeEvent.KIND_REGISTERED
+    if old_bucket is None or old_bucket == new_bucket:
+        return ChangeEvent.KIND_UPDATED
+    if new_bucket == "blocked":
+        return ChangeEvent.KIND_BLOCKED
+    if old_bucket == "blocked":
+        return ChangeEvent.KIND_UNBLOCKED
+    if new_bucket == "active":
+        return ChangeEvent.KIND_VERIFIED
+    return None  # active -> pending only happens right after registering
+
+
+def payload(user, **data):
+    # enough to update a list row; the dashboard fetches the detail if it needs more
+    return {"email": user.email, "full_name": user.full_name, "membership_id": user.membership_id, **data}
+
+
+def parse_last_event_id(request):
+    """Where to resume: the ``Last-Event-ID`` header (or ``?last_event_id=``), else None for "from now"."""
+    value = request.headers.get("Last-Event-ID") or request.GET.get("last_event_id")
+    try:
+        return max(int(value), 0) if value else None
+    except ValueError:
+        return None
+
+
+def _pending(after):
+    return ChangeEvent.objects.filter(id__gt=after).order_by("id")[:settings.CHANGE_STREAM_BATCH_SIZE]
+
+
+def _ready(events, after):
+    """The leading run of ``events`` that can be sent without skipping an id that may still commit."""
+    settled = timezone.now() - timedelta(seconds=settings.CHANGE_STREAM_GAP_SECONDS)
+    ready = []
+    for event in events:
+        if event.id != after + 1 and event.created_at > settled:
+            break
+        ready.append(event)
+        after = event.id
+    return ready
+
+
+def _start(after, latest, oldest):
+    """``(first id to wait after, frames to send first)`` for a client resuming after ``after``."""
+    if after is None:
+        return latest or 0, []
+    if oldest is not None and after < oldest - 1:
+        # what it missed has been purged: tell the dashboard to reload instead
+        return latest, [frame("reset", {"latest_id": latest}, latest)]
+    return after, []
+
+
+class _Cursor:
+    """Where one stream is; ``stream()`` and ``astream()`` differ only in how they poll and sleep."""
+
+    def __init__(self, after, latest, oldest):
+        self.after, frames = _start(after, latest, oldest)
+        self.opening = [f"retry: {settings.CHANGE_STREAM_RETRY_MS}\n\n", *frames]
+        self.started = self.last_sent = time.monotonic()
+
+    def is_open(self):
+        return time.monotonic() - self.started < settings.CHANGE_STREAM_MAX_SECONDS
+
+    def advance(self, events):
+        """``(frames to send, whether to poll again without sleeping)`` for a batch from ``_pending()``."""
+        ready = _ready(events, self.after)
+        frames = [event_frame(event) for event in ready]
+        if ready:
+            self.after, self.last_sent = ready[-1].id, time.monotonic()
+        elif time.monotonic() - self.last_sent >= settings.CHANGE_STREAM_HEARTBEAT:
+            frames.append(HEARTBEAT)
+            self.last_sent = time.monotonic()
+        return frames, len(ready) >= settings.CHANGE_STREAM_BATCH_SIZE
+
+
+def frame(kind, data, event_id=None):
+    lines = [f"id: {event_id}"] if event_id is not None else []
+    lines += [f"event: {kind}", f"data: {json.dumps(data, separators=(',', ':'), default=str)}"]
+    return "\n".join(lines) + "\n\n"
+
+
+def event_frame(event):
+    return frame(event.kind, {"user_id": event.user_id, "at": event.created_at.isoformat(), **event.data}, event.id)
+
+
+HEARTBEAT = ": heartbeat\n\n"
+
+
+def stream(after):
+    """Sync generator of SSE frames, for WSGI workers."""
+    ids = ChangeEvent.objects.order_by("id").values_list("id", flat=True)
+    cursor = _Cursor(after, ids.last(), ids.first())
+    yield from cursor.opening
+    while cursor.is_open():
+        frames, more = cursor.advance(list(_pending(cursor.after)))
+        yield from frames
+        if not more:
+            time.sleep(settings.CHANGE_STREAM_POLL_INTERVAL)
+
+
+async def astream(after):
+    """``stream()`` for ASGI: polls through the async ORM and sleeps without holding a thread."""
+    ids = ChangeEvent.objects.order_by("id").values_list("id", flat=True)
+    cursor = _Cursor(after, await ids.alast(), await ids.afirst())
+    for item in cursor.opening:
+        yield item
+    while cursor.is_open():
+        frames, more = cursor.advance([event async for event in _pending(cursor.after)])
+        for item in frames:
+            yield item
+        if not more:
+            await asyncio.sleep(settings.CHANGE_STREAM_POLL_INTERVAL)
+
+
+class _SyncStreamSlot:
+    """
+    One of this process's CHANGE_STREAM_SYNC_MAX_STREAMS, held by a response's
+    frames until the response is closed (which Django does even when the
+    client went away before the first frame).
+    """
+    lock = threading.Lock()
+    taken = 0
+
+    @classmethod
+    def take(cls, frames):
+        with cls.lock:
+            if cls.taken >= settings.CHANGE_STREAM_SYNC_MAX_STREAMS:
+                return None
+            cls.taken += 1
+        return cls(frames)
+
+    def __init__(self, frames):
+        self.frames = frames
+        self.released = False
+
+    def __iter__(self):
+        return iter(self.frames)
+
+    def close(self):
+        self.frames.close()
+        with self.lock:
+            if not self.released:
+                self.released = True
+                type(self).taken -= 1
+
+
+def event_stream_response(events):
+    response = StreamingHttpResponse(events, content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"  # nginx: pass frames through as they're written
+    return response
+
+
+def _staff_error(user):
+    if user is None:
+        return error_response("Authentication credentials were not provided.", 401)
+    if not user.is_staff:
+        return error_response("You do not have permission to perform this action.", 403)
+    return None
+
+
+@require_GET
+def change_events(request):
+    """
+    ``GET /api/admin/events/``: the change stream, for staff.
+
+    EventSource can't set headers, so besides ``Authorization: Bearer`` and
+    the session the access token is accepted as ``?token=``.
+    """
+    try:
+        result = QueryTokenJWTAuthentication().authenticate(request)
+    except APIException as exc:
+        return error_response(exc.detail, exc.status_code)
+    user = result[0] if result else None
+    if user is None and SESSION_AUTHENTICATION in settings.REST_FRAMEWORK["DEFAULT_AUTHENTICATION_CLASSES"]:
+        if request.user.is_authenticated and request.user.is_active and not request.user.is_blocked:
+            user = request.user
+    error = _staff_error(user)
+    if error:
+        return error
+    frames = _SyncStreamSlot.take(stream(parse_last_event_id(request)))
+    if frames is None:
+        return error_response("Change stream unavailable; try again later.", 503)
+    return event_stream_response(frames)
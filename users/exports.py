@@ -0,0 +1,123 @@
+import csv
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models.fields.files import FieldFile
+
+from .filters import filter_users
+from .models import CustomUser
+
+EXPORT_FORMATS = ("csv", "ndjson")
+EXPORT_CHUNK_SIZE = 500
+
+USER_FIELDS = [
+    "id", "membership_id", "full_name", "email", "phone",
+    "is_active", "is_verified", "is_blocked", "date_joined",
+]
+PROFILE_FIELDS = [
+    "dob", "gender", "contact", "address", "skills", "languages", "profile_photo", "resume",
+]
+EDUCATION_FIELDS = ["id", "degree", "university", "year_of_completion", "marks_cgpa"]
+EXPERIENCE_FIELDS = ["id", "company_name", "designation", "start_date", "end_date", "responsibilities"]
+
+# one flat CSV layout: every row carries the user id and a record_type telling
+# which group of columns is filled in (user + profile, education or experience)
+CSV_HEADER = (
+    ["record_type", "user_id"]
+    + [f"user_{f}" for f in USER_FIELDS if f != "id"]
+    + [f"profile_{f}" for f in PROFILE_FIELDS]
+    + [f"education_{f}" for f in EDUCATION_FIELDS]
+    + [f"experience_{f}" for f in EXPERIENCE_FIELDS]
+)
+
+
+def export_queryset(params):
+    """Users matching the admin list filters, with everything the export needs prefetched."""
+    queryset = CustomUser.objects.select_related("profile").prefetch_related(
+        "profile__educations", "profile__experiences"
+    ).order_by("id")
+    return filter_users(queryset, params)
+
+
+def _value(obj, field):
+    value = getattr(obj, field)
+    if isinstance(value, FieldFile):
+        return value.url if value else ""
+    return value
+
+
+def _profile(user):
+    try:
+        return user.profile
+    except CustomUser.profile.RelatedObjectDoesNotExist:
+        return None
+
+
+def user_record(user):
+    profile = _profile(user)
+    record = {field: _value(user, field) for field in USER_FIELDS}
+    if profile is None:
+        record["profile"] = None
+        return record
+    record["profile"] = {field: _value(profile, field) for field in PROFILE_FIELDS}
+    record["profile"]["educations"] = [
+        {field: _value(edu, field) for field in EDUCATION_FIELDS} for edu in profile.educations.all()
+    ]
+    record["profile"]["experiences"] = [
+        {field: _value(exp, field) for field in EXPERIENCE_FIELDS} for exp in profile.experiences.all()
+    ]
+    return record
+
+
+def iter_ndjson(queryset, chunk_size=EXPORT_CHUNK_SIZE):
+    # iterator(chunk_size=...) uses a server-side cursor where the backend has
+    # one and runs the prefetches once per chunk, so memory stays flat
+    for user in queryset.iterator(chunk_size=chunk_size):
+        yield json.dumps(user_record(user), cls=DjangoJSONEncoder) + "\n"
+
+
+class _Echo:
+    """File-like object whose write() hands the formatted line straight back."""
+
+    def write(self, value):
+        return value
+
+
+def _csv_rows(user):
+    blank = dict.fromkeys(CSV_HEADER, "")
+    profile = _profile(user)
+
+    row = dict(blank, record_type="user", user_id=user.id)
+    for field in USER_FIELDS[1:]:
+        row[f"user_{field}"] = _value(user, field)
+    if profile is not None:
+        for field in PROFILE_FIELDS:
+            row[f"profile_{field}"] = _value(profile, field)
+    yield row
+
+    if profile is None:
+        return
+    for edu in profile.educations.all():
+        row = dict(blank, record_type="education", user_id=user.id)
+        for field in EDUCATION_FIELDS:
+            row[f"education_{field}"] = _value(edu, field)
+        yield row
+    for exp in profile.experiences.all():
+        row = dict(blank, record_type="experience", user_id=user.id)
+        for field in EXPERIENCE_FIELDS:
+            row[f"experience_{field}"] = _value(exp, field)
+        yield row
+
+
+def iter_csv(queryset, chunk_size=EXPORT_CHUNK_SIZE):
+    writer = csv.DictWriter(_Echo(), fieldnames=CSV_HEADER)
+    yield writer.writeheader()
+    for user in queryset.iterator(chunk_size=chunk_size):
+        for row in _csv_rows(user):
+            yield writer.writerow(row)
+
+
+def iter_export(queryset, export_format, chunk_size=EXPORT_CHUNK_SIZE):
+    if export_format == "csv":
+        return iter_csv(queryset, chunk_size)
+    return iter_ndjson(queryset, chunk_size)
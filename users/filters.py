@@ -0,0 +1,92 @@
+from datetime import datetime, time
+
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from rest_framework.exceptions import ValidationError
+from rest_framework.filters import BaseFilterBackend
+
+from . import search
+from .tags import TAG_FIELDS, filter_by_tags, split_tags
+
+STATUS_FILTERS = {
+    "active": {"is_active": True, "is_blocked": False},
+    "blocked": {"is_blocked": True},
+    "pending": {"is_active": False, "is_blocked": False},
+}
+
+TRUE_VALUES = {"1", "true", "yes"}
+FALSE_VALUES = {"0", "false", "no"}
+TAG_MATCHES = ("all", "any")
+
+
+def parse_bool(name, value):
+    value = value.strip().lower()
+    if value in TRUE_VALUES:
+        return True
+    if value in FALSE_VALUES:
+        return False
+    raise ValidationError({name: "Expected true or false."})
+
+
+def parse_moment(name, value, end_of_day=False):
+    """Accept either an ISO date or an ISO datetime, returning an aware datetime."""
+    moment = parse_datetime(value)
+    if moment is None:
+        day = parse_date(value)
+        if day is None:
+            raise ValidationError({name: "Expected an ISO date or datetime."})
+        moment = datetime.combine(day, time.max if end_of_day else time.min)
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return moment
+
+
+def filter_users(queryset, params):
+    """
+    Apply the admin list filters to a ``CustomUser`` queryset.
+
+    ``params`` is any mapping of query parameters (``request.query_params`` or
+    the options of a management command), so the API and the CLI tools share
+    exactly one definition of each filter.
+    """
+    status_value = params.get("status")
+    if status_value and status_value != "all":
+        if status_value not in STATUS_FILTERS:
+            raise ValidationError({"status": f"Expected one of: all, {', '.join(STATUS_FILTERS)}."})
+        queryset = queryset.filter(**STATUS_FILTERS[status_value])
+
+    verified = params.get("verified")
+    if verified not in (None, ""):
+        queryset = queryset.filter(is_verified=parse_bool("verified", verified))
+
+    blocked = params.get("blocked")
+    if blocked not in (None, ""):
+        queryset = queryset.filter(is_blocked=parse_bool("blocked", blocked))
+
+    joined_after = params.get("joined_after")
+    if joined_after:
+        queryset = queryset.filter(date_joined__gte=parse_moment("joined_after", joined_after))
+
+    joined_before = params.get("joined_before")
+    if joined_before:
+        queryset = queryset.filter(date_joined__lte=parse_moment("joined_before", joined_before, end_of_day=True))
+
+    # ?skills=python,django&skills_match=all|any (same for languages); separate params are ANDed
+    for field in TAG_FIELDS:
+        names = split_tags(params.get(field))
+        if not names:
+            continue
+        match = params.get(f"{field}_match") or "all"
+        if match not in TAG_MATCHES:
+            raise ValidationError({f"{field}_match": f"Expected one of: {', '.join(TAG_MATCHES)}."})
+        queryset = filter_by_tags(queryset, field, names, match)
+
+    # ?q=<words>: name, email, membership id or profile text, through the search index
+    return search.filter_matching(queryset, params.get("q"))
+
+
+class AdminUserFilterBackend(BaseFilterBackend):
+    """Server-side filters for the admin user list (status, verified, blocked, joined range, skills, languages, q)."""
+
+    def filter_queryset(self, request, queryset, view):
+        return filter_users(queryset, request.query_params)
@@ -0,0 +1,168 @@
+"""
+Profile photo processing.
+
+Uploads are re-encoded through Pillow before they are stored: EXIF (GPS,
+camera data) is dropped after applying its orientation, and the image is
+scaled down to ``PROFILE_PHOTO_MAX_DIMENSION``. Each stored photo then gets
+fixed-size derivatives under ``derivatives/`` next to MEDIA_ROOT, named after
+the original, so avatars never download the full image. Rows holding the
+photo get ``profile_photo_derivatives`` set once they exist, so listing
+their URLs never has to ask the storage.
+"""
+import logging
+import os
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps, UnidentifiedImageError
+from rest_framework.exceptions import ValidationError
+
+logger = logging.getLogger(__name__)
+
+DERIVATIVES_DIR = "derivatives"
+
+# kind -> (file name suffix, Pillow format, extension, square thumbnail?)
+DERIVATIVES = {
+    "thumbnail": ("_thumb", "JPEG", ".jpg", True),
+    "thumbnail_webp": ("_thumb", "WEBP", ".webp", True),
+    "webp": ("", "WEBP", ".webp", False),
+}
+
+# formats kept as uploaded; anything else (GIF, BMP, TIFF...) becomes JPEG
+KEEP_FORMATS = {"JPEG": ".jpg", "PNG": ".png", "WEBP": ".webp"}
+
+
+def _flatten(image):
+    """RGB copy of `image` with any transparency composited onto white (for JPEG)."""
+    if image.mode in ("RGBA", "LA", "P"):
+        image = image.convert("RGBA")
+        background = Image.new("RGB", image.size, "white")
+        background.paste(image, mask=image.getchannel("A"))
+        return background
+    return image.convert("RGB")
+
+
+def _encode(image, image_format):
+    buffer = BytesIO()
+    if image_format == "JPEG":
+        _flatten(image).save(buffer, "JPEG", quality=85, optimize=True, progressive=True)
+    elif image_format == "WEBP":
+        image.save(buffer, "WEBP", quality=80, method=4)
+    else:
+        image.save(buffer, image_format, optimize=True)
+    return buffer.getvalue()
+
+
+def _load(fileobj):
+    return _prepare(Image.open(fileobj))
+
+
+def _prepare(image):
+    image_format = image.format
+    image = ImageOps.exif_transpose(image)  # bake in the rotation before EXIF goes away
+    if image.mode not in ("RGB", "RGBA", "L", "LA", "P"):
+        image = image.convert("RGB")
+    return image, image_format
+
+
+def sanitize_upload(upload):
+    """
+    Re-encode an uploaded photo without metadata, capped to the max dimension.
+
+    Returns a ContentFile ready to assign to the ImageField, or None if
+    Pillow can't read it (the upload is then stored untouched). Raises
+    ValidationError for images above PROFILE_PHOTO_MAX_PIXELS, before
+    anything is decoded.
+    """
+    try:
+        upload.seek(0)
+        image = Image.open(upload)  # reads the header only
+        if image.width * image.height > settings.PROFILE_PHOTO_MAX_PIXELS:
+            raise Image.DecompressionBombError(f"{image.width}x{image.height}")
+        image, image_format = _prepare(image)
+    except Image.DecompressionBombError:
+        logger.warning("Rejected oversized photo %s", getattr(upload, "name", "?"))
+        raise ValidationError({"profile_photo": "Image dimensions are too large."})
+    except (UnidentifiedImageError, OSError, ValueError):
+        logger.warning("Could not process uploaded photo %s", getattr(upload, "name", "?"))
+        return None
+    limit = settings.PROFILE_PHOTO_MAX_DIMENSION
+    image.thumbnail((limit, limit), Image.Resampling.LANCZOS)
+
+    if image_format not in KEEP_FORMATS:
+        image_format = "JPEG"
+    stem = os.path.splitext(os.path.basename(upload.name))[0]
+    return ContentFile(_encode(image, image_format), name=stem + KEEP_FORMATS[image_format])
+
+
+def derivative_name(name, kind):
+    suffix, _, extension, _ = DERIVATIVES[kind]
+    # keep the original extension in the name so a.png and a.jpg don't share derivatives
+    stem, original_extension = os.path.splitext(name)
+    return f"{DERIVATIVES_DIR}/{stem}{original_extension.replace('.', '_')}{suffix}{extension}"
+
+
+def generate_derivatives(name, storage=None, force=False):
+    """
+    Write every derivative of the stored photo `name`.
+
+    Returns the number of files written (0 if they all existed and not `force`).
+    """
+    storage = storage or default_storage
+    kinds = [kind for kind in DERIVATIVES if force or not storage.exists(derivative_name(name, kind))]
+    if not kinds:
+        mark_derivatives_built(name)
+        return 0
+    with storage.open(name, "rb") as original:
+        image, _ = _load(original)
+        image.load()
+
+    size = settings.PROFILE_PHOTO_THUMBNAIL_SIZE
+    for kind in kinds:
+        _, image_format, _, square = DERIVATIVES[kind]
+        variant = ImageOps.fit(image, (size, size), Image.Resampling.LANCZOS) if square else image
+        target = derivative_name(name, kind)
+        if storage.exists(target):
+            storage.delete(target)
+        storage.save(target, ContentFile(_encode(variant, image_format)))
+    mark_derivatives_built(name)
+    return len(kinds)
+
+
+def mark_derivatives_built(name):
+    """Flag the rows holding photo `name` (uploads are deduplicated, so maybe several)."""
+    from .models import CustomUser, UserProfile
+    from .profile_cache import bump_profile_versions
+    user_ids = []
+    for model, user_field in ((CustomUser, "pk"), (UserProfile, "user_id")):
+        rows = model.objects.filter(profile_photo=name, profile_photo_derivatives=False)
+        user_ids += rows.values_list(user_field, flat=True)
+        rows.update(profile_photo_derivatives=True)  # no signals: the photo itself didn't change
+    bump_profile_versions(user_ids)  # cached shared profiles were rendered without the URLs
+
+
+def derivative_urls(field_file, built, request=None):
+    """``{kind: url}`` for a photo's derivatives, or None if there's no photo or they aren't `built` yet."""
+    if not field_file or not built:
+        return None
+    storage = field_file.storage
+    urls = {kind: storage.url(derivative_name(field_file.name, kind)) for kind in DERIVATIVES}
+    if request is not None:
+        urls = {kind: request.build_absolute_uri(url) for kind, url in urls.items()}
+    return urls
+
+
+def init_worker():
+    """ProcessPoolExecutor initializer: make sure Django is usable under the spawn start method too."""
+    import django
+    django.setup()
+
+
+def process_stored_photo(name, force=False):
+    """Process-pool entry point for the backfill. Returns ``(name, files written, error)``."""
+    try:
+        return name, generate_derivatives(name, force=force), None
+    except Exception as exc:
+        return name, 0, f"{type(exc).__name__}: {exc}"
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from users.rollups import aggregate_views
+
+
+class Command(BaseCommand):
+    help = "Fold new ProfileViewLog rows into the daily/hourly share link rollups."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=10000)
+
+    def handle(self, *args, **options):
+        consumed, pruned = aggregate_views(options["batch_size"])
+        self.stdout.write(f"Aggregated {consumed} view(s); pruned {pruned} old hourly row(s).")
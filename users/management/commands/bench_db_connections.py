@@ -0,0 +1,59 @@
+import statistics
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.core.signals import request_finished, request_started
+from django.db import connections
+
+from socrp_backend.database import MODES, POSTGRES_ENGINES, apply_connection_mode
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure per-request database latency under each DB_CONNECTION_MODE. Every iteration "
+        "goes through the same request_started/request_finished cycle Django runs around a "
+        "request, so connection setup, health checks and pool checkout are all counted."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", "-n", type=int, default=200)
+        parser.add_argument("--queries", type=int, default=3, help="Queries per simulated request.")
+        parser.add_argument("--mode", action="append", choices=MODES, help="Repeat to pick modes (default: all).")
+
+    def handle(self, *args, **options):
+        base = settings.DATABASES["default"]
+        for mode in options["mode"] or MODES:
+            if mode == "pool" and base["ENGINE"] not in POSTGRES_ENGINES:
+                self.stdout.write(f"{mode:>10}: skipped (connection pools need PostgreSQL)")
+                continue
+            alias = f"bench_{mode}"
+            connections.settings[alias] = apply_connection_mode(
+                base, mode, conn_max_age=settings.DB_CONN_MAX_AGE, pool=settings.DB_POOL)
+            connections.configure_settings(connections.settings)
+            try:
+                timings = self.run_mode(connections[alias], options["requests"], options["queries"])
+            finally:
+                connections[alias].close()
+                if hasattr(connections[alias], "close_pool"):
+                    connections[alias].close_pool()
+                del connections[alias]
+                del connections.settings[alias]
+            timings.sort()
+            self.stdout.write(
+                f"{mode:>10}: mean {statistics.mean(timings):7.2f} ms  p50 {timings[len(timings) // 2]:7.2f} ms  "
+                f"p95 {timings[int(len(timings) * 0.95)]:7.2f} ms  max {timings[-1]:7.2f} ms"
+            )
+
+    def run_mode(self, connection, requests, queries):
+        timings = []
+        for _ in range(requests + 1):
+            start = time.perf_counter()
+            request_started.send(sender=self.__class__)
+            with connection.cursor() as cursor:
+                for _ in range(queries):
+                    cursor.execute("SELECT 1")
+                    cursor.fetchone()
+            request_finished.send(sender=self.__class__)  # close_old_connections() runs here
+            timings.append((time.perf_counter() - start) * 1000)
+        return timings[1:]  # the first request always connects
@@ -0,0 +1,79 @@
+import statistics
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from http.client import HTTPConnection, HTTPSConnection
+from urllib.parse import urlsplit
+
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = (
+        "Load-test a running server: N keep-alive clients hammer one URL and report throughput "
+        "and latency percentiles. Run it against the WSGI and the ASGI deployment to compare them."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("url")
+        parser.add_argument("--concurrency", "-c", type=int, default=20)
+        parser.add_argument("--requests", "-n", type=int, default=1000)
+        parser.add_argument("--header", "-H", action="append", default=[], help='e.g. "Authorization: Bearer ..."')
+        parser.add_argument("--timeout", type=float, default=30)
+
+    def handle(self, *args, **options):
+        url = urlsplit(options["url"])
+        if url.scheme not in ("http", "https"):
+            raise CommandError("URL must start with http:// or https://")
+        headers = dict(h.split(":", 1) for h in options["header"])
+        headers = {k.strip(): v.strip() for k, v in headers.items()}
+        path = url.path + (f"?{url.query}" if url.query else "")
+        connection_class = HTTPSConnection if url.scheme == "https" else HTTPConnection
+
+        remaining = [options["requests"]]
+        lock = threading.Lock()
+        latencies, statuses = [], Counter()
+
+        def client():
+            conn = connection_class(url.netloc, timeout=options["timeout"])
+            while True:
+                with lock:
+                    if remaining[0] <= 0:
+                        break
+                    remaining[0] -= 1
+                start = time.perf_counter()
+                try:
+                    conn.request("GET", path, headers=headers)
+                    response = conn.getresponse()
+                    response.read()
+                    outcome = response.status
+                except OSError as exc:
+                    outcome = type(exc).__name__
+                    conn.close()
+                    conn = connection_class(url.netloc, timeout=options["timeout"])
+                elapsed = time.perf_counter() - start
+                with lock:
+                    latencies.append(elapsed)
+                    statuses[outcome] += 1
+            conn.close()
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options["concurrency"]) as pool:
+            for _ in range(options["concurrency"]):
+                pool.submit(client)
+        duration = time.perf_counter() - started
+
+        latencies.sort()
+
+        def percentile(p):
+            return latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1000
+
+        self.stdout.write(f"{len(latencies)} requests, concurrency {options['concurrency']}, {duration:.2f} s")
+        self.stdout.write(f"throughput: {len(latencies) / duration:.1f} req/s")
+        if latencies:
+            self.stdout.write(
+                f"latency ms: mean {statistics.mean(latencies) * 1000:.1f}  p50 {percentile(0.5):.1f}  "
+                f"p95 {percentile(0.95):.1f}  p99 {percentile(0.99):.1f}  max {latencies[-1] * 1000:.1f}"
+            )
+        self.stdout.write("responses: " + ", ".join(f"{status}: {count}" for status, count in sorted(statuses.items(), key=str)))
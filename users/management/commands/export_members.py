@@ -0,0 +1,45 @@
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.exceptions import ValidationError
+
+from users.exports import EXPORT_CHUNK_SIZE, EXPORT_FORMATS, export_queryset, iter_export
+from users.filters import TAG_MATCHES
+
+
+class Command(BaseCommand):
+    help = "Stream all members (profile, education and experience rows) as CSV or NDJSON."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--format", choices=EXPORT_FORMATS, default="csv", dest="export_format")
+        parser.add_argument("--output", "-o", help="File to write to (defaults to stdout).")
+        parser.add_argument("--chunk-size", type=int, default=EXPORT_CHUNK_SIZE)
+        # same filters as /api/admin/users/
+        parser.add_argument("--status", choices=["all", "active", "blocked", "pending"])
+        parser.add_argument("--verified")
+        parser.add_argument("--blocked")
+        parser.add_argument("--joined-after")
+        parser.add_argument("--joined-before")
+        parser.add_argument("--skills", help="Comma-separated skills, e.g. python,django.")
+        parser.add_argument("--skills-match", choices=TAG_MATCHES)
+        parser.add_argument("--languages", help="Comma-separated languages.")
+        parser.add_argument("--languages-match", choices=TAG_MATCHES)
+
+    def handle(self, *args, **options):
+        params = {
+            key: options[key]
+            for key in ("status", "verified", "blocked", "joined_after", "joined_before",
+                        "skills", "skills_match", "languages", "languages_match")
+            if options[key] is not None
+        }
+        try:
+            queryset = export_queryset(params)
+        except ValidationError as exc:
+            raise CommandError(exc.detail)
+
+        chunks = iter_export(queryset, options["export_format"], options["chunk_size"])
+        if not options["output"]:
+            for chunk in chunks:
+                self.stdout.write(chunk, ending="")
+            return
+        with open(options["output"], "w", newline="", encoding="utf-8") as output:
+            for chunk in chunks:
+                output.write(chunk)
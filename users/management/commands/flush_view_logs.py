@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from users import viewlog
+
+
+class Command(BaseCommand):
+    help = "Load spooled profile view events into ProfileViewLog with bulk inserts."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=None)
+        parser.add_argument(
+            "--include-current", action="store_true",
+            help="Also load segments that may still be written to (use when the web workers are stopped).",
+        )
+
+    def handle(self, *args, **options):
+        segments, rows = viewlog.ingest_spool(options["include_current"], options["batch_size"])
+        self.stdout.write(f"Loaded {rows} view(s) from {segments} spool segment(s).")
@@ -0,0 +1,21 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from users.blobs import collect_garbage
+
+
+class Command(BaseCommand):
+    help = "Delete content-addressed media files that no user or profile references any more."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--grace-hours", type=float, default=24,
+                            help="Only delete blobs unreferenced (and unwritten) for at least this long.")
+        parser.add_argument("--dry-run", action="store_true")
+
+    def handle(self, *args, **options):
+        removed = collect_garbage(timedelta(hours=options["grace_hours"]), options["dry_run"])
+        verb = "Would delete" if options["dry_run"] else "Deleted"
+        for name in removed:
+            self.stdout.write(f"  {name}")
+        self.stdout.write(f"{verb} {len(removed)} blob(s).")
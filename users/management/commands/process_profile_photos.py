@@ -0,0 +1,37 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from users.images import init_worker, process_stored_photo
+from users.models import CustomUser, UserProfile
+
+
+class Command(BaseCommand):
+    help = ("Build thumbnail/WebP derivatives for profile photos that are already stored, in parallel, "
+            "and flag the rows whose derivatives exist (run once for photos stored before that flag).")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+        parser.add_argument("--force", action="store_true", help="Rebuild derivatives that already exist.")
+
+    def handle(self, *args, **options):
+        names = set()
+        for model in (CustomUser, UserProfile):
+            names.update(model.objects.exclude(profile_photo="").exclude(profile_photo__isnull=True)
+                         .values_list("profile_photo", flat=True).distinct())
+        names = sorted(names)
+        self.stdout.write(f"{len(names)} photo(s) to check with {options['workers']} worker(s).")
+
+        # workers only touch files; don't let forked children inherit DB sockets
+        connections.close_all()
+        written = failed = 0
+        with ProcessPoolExecutor(max_workers=options["workers"], initializer=init_worker) as pool:
+            results = pool.map(process_stored_photo, names, [options["force"]] * len(names), chunksize=16)
+            for name, files, error in results:
+                if error:
+                    failed += 1
+                    self.stderr.write(f"{name}: {error}")
+                written += files
+        self.stdout.write(f"Wrote {written} derivative file(s); {failed} photo(s) failed.")
@@ -0,0 +1,47 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from users.retention import POLICIES, policy_days, purge
+
+
+class Command(BaseCommand):
+    help = "Delete expired share links, old view logs, never-verified accounts and old change records in small batches."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--dry-run", action="store_true", help="Only count what would be deleted.")
+        parser.add_argument("--only", action="append", choices=list(POLICIES), help="Run just these policies.")
+        parser.add_argument("--batch-size", type=int)
+        parser.add_argument("--pause", type=float, help="Seconds to sleep between batches.")
+        parser.add_argument("--share-link-days", type=int, help="Days after expiry before a share link is removed.")
+        parser.add_argument("--view-log-days", type=int, help="Age in days after which view logs are removed.")
+        parser.add_argument("--unverified-days", type=int, help="Age in days after which unverified accounts are removed.")
+        parser.add_argument("--tombstone-days", type=int, help="Age in days after which deleted-user records are removed.")
+        parser.add_argument("--change-event-days", type=int, help="Age in days after which change stream events are removed.")
+
+    def handle(self, *args, **options):
+        overrides = {
+            "SHARE_LINK_GRACE_DAYS": options["share_link_days"],
+            "VIEW_LOG_DAYS": options["view_log_days"],
+            "UNVERIFIED_USER_DAYS": options["unverified_days"],
+            "USER_TOMBSTONE_DAYS": options["tombstone_days"],
+            "CHANGE_EVENT_DAYS": options["change_event_days"],
+        }
+        for name, (_, queryset_for) in POLICIES.items():
+            if options["only"] and name not in options["only"]:
+                continue
+            days = policy_days(name, overrides)
+            if not days:
+                self.stdout.write(f"{name}: disabled")
+                continue
+            if days < 0:
+                raise CommandError(f"{name}: age must be positive, got {days}")
+
+            rows, batches, seconds = purge(
+                queryset_for(days), options["batch_size"], options["pause"], options["dry_run"]
+            )
+            if options["dry_run"]:
+                self.stdout.write(f"{name}: {rows} row(s) older than {days} day(s) would be deleted")
+            else:
+                rate = rows / seconds if seconds else 0
+                self.stdout.write(
+                    f"{name}: deleted {rows} row(s) in {batches} batch(es), {seconds:.1f}s ({rate:.0f} rows/s)"
+                )
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from users import tags
+
+
+class Command(BaseCommand):
+    help = "Re-derive the Skill/Language tag links of every profile from its skills/languages text."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500)
+
+    def handle(self, *args, **options):
+        done = tags.rebuild(batch_size=options["batch_size"])
+        self.stdout.write(f"Tagged {done} profiles")
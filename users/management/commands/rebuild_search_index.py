@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from users import search
+
+
+class Command(BaseCommand):
+    help = "Rewrite every member's search document (the database index follows automatically)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500)
+
+    def handle(self, *args, **options):
+        written = search.rebuild(batch_size=options["batch_size"])
+        self.stdout.write(f"Indexed {written} members")
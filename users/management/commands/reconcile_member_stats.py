@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from users import stats
+
+
+class Command(BaseCommand):
+    help = "Recount users and overwrite the MemberStats counters with exact values."
+
+    def handle(self, *args, **options):
+        before = stats.current()
+        after = stats.reconcile()
+        for field, old in before.items():
+            new = getattr(after, field)
+            drift = f" (was {old})" if new != old else ""
+            self.stdout.write(f"{field}: {new}{drift}")
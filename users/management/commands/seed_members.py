@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from users.seeding import seed_members
+
+
+class Command(BaseCommand):
+    help = "Bulk-create deterministic synthetic members (with profiles, share links and view logs) for benchmarking."
+
+    def add_arguments(self, parser):
+        parser.add_argument("count", type=int)
+        parser.add_argument("--seed", type=int, default=1)
+        parser.add_argument("--start", type=int, default=0, help="Number of the first member (to add more later).")
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument("--educations", type=int, default=2)
+        parser.add_argument("--experiences", type=int, default=2)
+        parser.add_argument("--share-links", type=int, default=1)
+        parser.add_argument("--views", type=int, default=5, help="View log rows per share link.")
+
+    def handle(self, *args, **options):
+        created = seed_members(
+            options["count"], seed=options["seed"], start=options["start"], batch_size=options["batch_size"],
+            educations=options["educations"], experiences=options["experiences"],
+            share_links=options["share_links"], views=options["views"],
+        )
+        self.stdout.write(f"Created {created} members")
@@ -0,0 +1,39 @@
+import time
+
+from django.conf import settings
+from django.core.mail import get_connection
+from django.core.management.base import BaseCommand
+
+from users.outbox import drain, send_batch
+
+
+class Command(BaseCommand):
+    help = "Send queued outbox emails in batches over one reused mail connection."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=settings.OUTBOX_BATCH_SIZE)
+        parser.add_argument("--max-attempts", type=int, default=settings.OUTBOX_MAX_ATTEMPTS)
+        parser.add_argument("--loop", action="store_true", help="Keep polling instead of exiting once the outbox is empty.")
+        parser.add_argument("--interval", type=float, default=settings.OUTBOX_POLL_INTERVAL,
+                            help="Seconds to sleep between polls when idle (with --loop).")
+
+    def handle(self, *args, **options):
+        if not options["loop"]:
+            sent, failed = drain(options["batch_size"], options["max_attempts"])
+            self.stdout.write(f"Sent {sent} email(s), {failed} failed.")
+            return
+
+        connection = get_connection()
+        try:
+            while True:
+                sent, failed = send_batch(connection, options["batch_size"], options["max_attempts"])
+                if sent or failed:
+                    self.stdout.write(f"Sent {sent} email(s), {failed} failed.")
+                    continue
+                # idle: don't hold the SMTP session open while nothing is queued
+                connection.close()
+                time.sleep(options["interval"])
+        except KeyboardInterrupt:
+            pass
+        finally:
+            connection.close()
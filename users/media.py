@@ -0,0 +1,217 @@
+"""
+Production serving of MEDIA_ROOT.
+
+Django decides *whether* a file may be served (MEDIA_ACCESS_POLICY) and
+computes the caching headers; the bytes are either streamed from here (with
+single-range support for resume PDFs) or, with MEDIA_ACCEL set, handed to
+the reverse proxy through X-Accel-Redirect (nginx) or X-Sendfile
+(Apache/lighttpd) so no worker is tied up sending them.
+
+The default policy serves photos and their derivatives to anyone, but a
+resume only to its owner, staff, or a visitor with a valid share link of
+the owner (``?share=<token>``, which shared pages add to the resume URL);
+the owner and staff can send their access token as ``?token=`` from a link.
+Those answers are ``private``, so CDNs and proxies never keep a resume.
+"""
+import mimetypes
+import os
+import re
+import uuid
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import Http404, HttpResponse, HttpResponseNotModified, StreamingHttpResponse
+from django.utils import timezone
+from django.utils.http import http_date, parse_etags, parse_http_date_safe
+from django.utils.module_loading import import_string
+from django.utils._os import safe_join
+from django.views.decorators.http import require_safe
+from rest_framework.exceptions import APIException
+
+from . import profile_cache
+from .authentication import QueryTokenJWTAuthentication
+from .models import CustomUser, UserProfile
+
+# names written by ContentAddressedStorage: the content can never change
+HASHED_NAME = re.compile(r"(^|/)[0-9a-f]{64}\.[a-z0-9]+$")
+RANGE_HEADER = re.compile(r"^bytes=(\d*)-(\d*)$")
+CHUNK_SIZE = 64 * 1024
+IMMUTABLE_MAX_AGE = "max-age=31536000, immutable"
+IMMUTABLE_CACHE_CONTROL = f"public, {IMMUTABLE_MAX_AGE}"
+
+
+PUBLIC = "public"
+PRIVATE = "private"
+PRIVATE_PREFIXES = ("resumes/",)
+
+
+def member_media_policy(request, name):
+    """
+    Default MEDIA_ACCESS_POLICY: PUBLIC, PRIVATE, or None to answer 404.
+
+    Dot-directories (upload scratch space) are never served.
+    """
+    if any(part.startswith(".") for part in name.split("/")):
+        return None
+    if not name.startswith(PRIVATE_PREFIXES):
+        return PUBLIC
+    return PRIVATE if _may_see_resume(request, name) else None
+
+
+def _requester(request):
+    user = getattr(request, "user", None)
+    if user is not None and user.is_authenticated and user.is_active and not user.is_blocked:
+        return user
+    try:
+        result = QueryTokenJWTAuthentication().authenticate(request)  # plain links carry ?token=
+    except APIException:
+        return None
+    return result[0] if result else None
+
+
+def _shared_by(token):
+    """Owner id of a valid share link, or None."""
+    try:
+        token = uuid.UUID(token)
+    except ValueError:
+        return None
+    link = profile_cache.get_share_link(token)
+    if link is None or link[2] <= timezone.now():
+        return None
+    return link[1]
+
+
+def _may_see_resume(request, name):
+    # blobs are shared, so identical uploads can have several owners
+    owners = set(CustomUser.objects.filter(resume=name).values_list("pk", flat=True))
+    owners |= set(UserProfile.objects.filter(resume=name).values_list("user_id", flat=True))
+    if not owners:
+        return False
+    token = request.GET.get("share")
+    if token and _shared_by(token) in owners:
+        return True
+    user = _requester(request)
+    return user is not None and (user.is_staff or user.pk in owners)
+
+
+def share_url(url, token):
+    """A resume URL that works for visitors of the share link `token`."""
+    return f"{url}{'&' if '?' in url else '?'}share={token}"
+
+
+def _etag(name, stat):
+    if HASHED_NAME.search(name):
+        return '"%s"' % os.path.splitext(os.path.basename(name))[0]
+    return '"%x-%x"' % (stat.st_size, stat.st_mtime_ns)
+
+
+def _not_modified(request, etag, mtime):
+    if_none_match = request.headers.get("If-None-Match")
+    if if_none_match is not None:
+        tags = parse_etags(if_none_match)
+        return "*" in tags or etag in tags
+    since = parse_http_date_safe(request.headers.get("If-Modified-Since", ""))
+    return since is not None and int(mtime) <= since
+
+
+def _requested_range(request, size, etag, mtime):
+    """``(start, end)`` inclusive for a satisfiable single range, None for a full response, False if unsatisfiable."""
+    header = request.headers.get("Range")
+    if not header:
+        return None
+    if_range = request.headers.get("If-Range")
+    if if_range and if_range != etag and parse_http_date_safe(if_range) != int(mtime):
+        return None  # the client's copy is stale: send the whole file
+    match = RANGE_HEADER.match(header.strip())
+    if not match or not any(match.groups()):
+        return None  # multi-range or malformed: ignore it, as RFC 9110 allows
+    first, last = match.groups()
+    if first:
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+    else:
+        start, end = max(size - int(last), 0), size - 1
+    if start >= size or start > end:
+        return False
+    return start, end
+
+
+def _read_range(path, start, length):
+    with open(path, "rb") as fh:
+        fh.seek(start)
+        while length > 0:
+            chunk = fh.read(min(CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+
+
+@require_safe
+def serve_media(request, path):
+    try:
+        full_path = safe_join(settings.MEDIA_ROOT, path)
+    except SuspiciousFileOperation:
+        raise Http404
+    name = os.path.relpath(full_path, settings.MEDIA_ROOT).replace(os.sep, "/")
+    scope = import_string(settings.MEDIA_ACCESS_POLICY)(request, name)
+    if not scope:
+        raise Http404
+    scope = PUBLIC if scope is True else scope
+    try:
+        stat = os.stat(full_path)
+    except OSError:
+        raise Http404
+    if not os.path.isfile(full_path):
+        raise Http404
+
+    etag = _etag(name, stat)
+    headers = {
+        "ETag": etag,
+        "Last-Modified": http_date(stat.st_mtime),
+        "Cache-Control": f"{scope}, {IMMUTABLE_MAX_AGE}" if HASHED_NAME.search(name)
+        else f"{scope}, max-age={settings.MEDIA_CACHE_MAX_AGE}",
+        "Accept-Ranges": "bytes",
+    }
+    if _not_modified(request, etag, stat.st_mtime):
+        response = HttpResponseNotModified()
+        for header, value in headers.items():
+            response[header] = value
+        return response
+
+    content_type, encoding = mimetypes.guess_type(full_path)
+    content_type = content_type or "application/octet-stream"
+
+    if settings.MEDIA_ACCEL == "x-accel-redirect":
+        # nginx serves the bytes (and any Range) from an `internal` location
+        response = HttpResponse(content_type=content_type, headers=headers)
+        response["X-Accel-Redirect"] = settings.MEDIA_ACCEL_PREFIX + quote(name)
+        return response
+    if settings.MEDIA_ACCEL == "x-sendfile":
+        response = HttpResponse(content_type=content_type, headers=headers)
+        response["X-Sendfile"] = full_path
+        return response
+
+    byte_range = _requested_range(request, stat.st_size, etag, stat.st_mtime)
+    if byte_range is False:
+        response = HttpResponse(status=416, headers=headers)
+        response["Content-Range"] = f"bytes */{stat.st_size}"
+        return response
+    if byte_range is None:
+        start, end, status_code = 0, stat.st_size - 1, 200
+    else:
+        (start, end), status_code = byte_range, 206
+        headers["Content-Range"] = f"bytes {start}-{end}/{stat.st_size}"
+
+    length = end - start + 1
+    if request.method == "HEAD":
+        response = HttpResponse(status=status_code, content_type=content_type, headers=headers)
+    else:
+        response = StreamingHttpResponse(
+            _read_range(full_path, start, length), status=status_code, content_type=content_type, headers=headers
+        )
+    response["Content-Length"] = str(max(length, 0))
+    if encoding:
+        response["Content-Encoding"] = encoding
+    return response
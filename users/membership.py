@@ -0,0 +1,92 @@
+"""
+Membership ID allocation: ``SOCRP-<year>-<sequence>``.
+
+Each year has a MembershipSequence row. A worker reserves a block of
+numbers with a single atomic increment of that row and then serves IDs
+from the block in memory, so most registrations don't touch the sequence
+at all and no two workers can ever get the same number. Registration
+reserves its block up front (``prefetch_block``), so the sequence row is
+never locked for the length of a registration.
+
+Sequence numbers are zero-padded to six digits. The old random IDs have
+exactly five, so the two formats can never collide.
+"""
+import threading
+from collections import defaultdict, deque
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import MembershipSequence
+
+_lock = threading.Lock()
+# year -> deque of [start, end) ranges this process has reserved and not used yet
+_blocks = defaultdict(deque)
+
+
+def format_membership_id(year, number):
+    return f"SOCRP-{year}-{number:06d}"
+
+
+def reserve_block(year, size):
+    """Atomically take `size` numbers from the year's sequence. Returns ``(start, end)``."""
+    with transaction.atomic():
+        MembershipSequence.objects.bulk_create([MembershipSequence(year=year)], ignore_conflicts=True)
+        # the UPDATE takes the row lock; the read below sees our own increment
+        MembershipSequence.objects.filter(year=year).update(next_value=F("next_value") + size)
+        end = MembershipSequence.objects.filter(year=year).values_list("next_value", flat=True).get()
+    return end - size, end
+
+
+def _keep(year, start, end):
+    if start < end:
+        with _lock:
+            _blocks[year].append((start, end))
+
+
+def prefetch_block(year=None):
+    """
+    Make sure this process holds unused numbers, reserving a block if not.
+
+    Call it before opening a transaction that will allocate an ID: the
+    reservation then commits on its own right away, instead of keeping the
+    year's sequence row locked (and every other registration waiting) until
+    the caller's transaction ends. Inside a transaction it does nothing.
+    """
+    year = year or timezone.now().year
+    with _lock:
+        if _blocks[year]:
+            return
+    if connection.in_atomic_block:
+        return
+    _keep(year, *reserve_block(year, settings.MEMBERSHIP_ID_BLOCK_SIZE))
+
+
+def next_membership_id(year=None):
+    year = year or timezone.now().year
+    with _lock:
+        ranges = _blocks[year]
+        if ranges:
+            start, end = ranges.popleft()
+            if start + 1 < end:
+                ranges.appendleft((start + 1, end))
+            return format_membership_id(year, start)
+
+    start, end = reserve_block(year, settings.MEMBERSHIP_ID_BLOCK_SIZE)
+    if connection.in_atomic_block:
+        # the reservation rolls back with the caller's transaction, after which
+        # another worker may be handed the same block, so only keep the rest
+        # of it once the reservation is committed
+        transaction.on_commit(lambda: _keep(year, start + 1, end))
+    else:
+        _keep(year, start + 1, end)
+    return format_membership_id(year, start)
+
+
+def allocate_membership_ids(count, year=None):
+    """`count` consecutive IDs in one reservation, for bulk imports."""
+    year = year or timezone.now().year
+    start, end = reserve_block(year, count)
+    return [format_membership_id(year, number) for number in range(start, end)]
@@ -0,0 +1,126 @@
+import logging
+import random
+import time
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+
+from .metrics import registry
+
+logger = logging.getLogger(__name__)
+
+# the sampled request's recorder; contextvars follow sync_to_async into its thread
+_current_recorder = ContextVar("query_recorder", default=None)
+
+
+class QueryRecorder:
+    """``connection.execute_wrapper`` that counts and times queries and logs slow ones."""
+
+    def __init__(self, request):
+        self.request = request
+        self.count = 0
+        self.seconds = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - start
+            self.count += 1
+            self.seconds += elapsed
+            if elapsed * 1000 >= settings.METRICS_SLOW_QUERY_MS:
+                view = _view_name(self.request)  # resolved by the time the view runs queries
+                registry.inc("db_slow_queries_total", {"view": view})
+                logger.warning("Slow query (%.0f ms) in %s: %s", elapsed * 1000, view, sql[:2000])
+
+
+def record_queries(execute, sql, params, many, context):
+    recorder = _current_recorder.get()
+    if recorder is None:
+        return execute(sql, params, many, context)
+    return recorder(execute, sql, params, many, context)
+
+
+def install_query_recorder(connection):
+    """
+    Put ``record_queries`` on a new connection, in whatever thread opened it.
+    Wrapping per request would only cover the request thread's connections,
+    and async views run their queries in sync_to_async's thread.
+    """
+    if record_queries not in connection.execute_wrappers:
+        # first, so execute_wrapper() blocks that were open when it connected still pop their own wrapper
+        connection.execute_wrappers.insert(0, record_queries)
+
+
+def _view_name(request):
+    match = getattr(request, "resolver_match", None)
+    if match is None:
+        return "<unmatched>"
+    return match.view_name or match.route
+
+
+class RequestMetricsMiddleware:
+    """
+    Record latency, status and response size of every request, plus query
+    count/time for a METRICS_SAMPLE_RATE fraction of them (wrapping every
+    query is the only part with real overhead). Works in both sync and async
+    middleware chains.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def _query_recorder(self, request):
+        if random.random() >= settings.METRICS_SAMPLE_RATE:
+            return None, None
+        recorder = QueryRecorder(request)
+        return recorder, _current_recorder.set(recorder)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not settings.METRICS_ENABLED:
+            return self.get_response(request)
+        start = time.perf_counter()
+        recorder, token = self._query_recorder(request)
+        try:
+            response = self.get_response(request)
+        finally:
+            if token is not None:
+                _current_recorder.reset(token)
+        self.record(request, response, time.perf_counter() - start, recorder)
+        return response
+
+    async def __acall__(self, request):
+        if not settings.METRICS_ENABLED:
+            return await self.get_response(request)
+        start = time.perf_counter()
+        recorder, token = self._query_recorder(request)
+        try:
+            response = await self.get_response(request)
+        finally:
+            if token is not None:
+                _current_recorder.reset(token)
+        self.record(request, response, time.perf_counter() - start, recorder)
+        return response
+
+    def record(self, request, response, elapsed, recorder):
+        view = _view_name(request)
+        registry.inc("http_requests_total", {"view": view, "method": request.method, "status": str(response.status_code)})
+        registry.observe("http_request_duration_seconds", {"view": view}, elapsed)
+        if not response.streaming:
+            registry.observe("http_response_size_bytes", {"view": view}, len(response.content))
+        if recorder is not None:
+            registry.observe("http_request_db_queries", {"view": view}, recorder.count)
+            registry.observe("http_request_db_seconds", {"view": view}, recorder.seconds)
+        if elapsed * 1000 >= settings.METRICS_SLOW_REQUEST_MS:
+            registry.inc("http_slow_requests_total", {"view": view})
+            queries = f"{recorder.count} queries, {recorder.seconds * 1000:.0f} ms in DB" if recorder else "queries not sampled"
+            logger.warning("Slow request %s %s (%s) took %.0f ms, status %s, %s",
+                           request.method, request.path, view, elapsed * 1000, response.status_code, queries)
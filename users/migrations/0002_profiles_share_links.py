@@ -0,0 +1,95 @@
+# Generated by Django 5.2.6 on 2026-10-18 11:27
+
+import django.db.models.deletion
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customuser',
+            name='is_blocked',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.CreateModel(
+            name='ProfileShareLink',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('token', models.UUIDField(default=uuid.uuid4, editable=False, unique=True)),
+                ('expiry_date', models.DateTimeField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='share_links', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ProfileViewLog',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('viewer_ip', models.GenericIPAddressField(blank=True, null=True)),
+                ('user_agent', models.TextField(blank=True, null=True)),
+                ('viewed_at', models.DateTimeField(auto_now_add=True)),
+                ('share_link', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='logs', to='users.profilesharelink')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='UserProfile',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('dob', models.DateField(blank=True, null=True)),
+                ('gender', models.CharField(blank=True, choices=[('M', 'Male'), ('F', 'Female'), ('O', 'Other')], max_length=10)),
+                ('contact', models.CharField(blank=True, max_length=15)),
+                ('address', models.TextField(blank=True)),
+                ('profile_photo', models.ImageField(blank=True, null=True, upload_to='profiles/')),
+                ('skills', models.TextField(blank=True)),
+                ('languages', models.TextField(blank=True)),
+                ('resume', models.FileField(blank=True, null=True, upload_to='resumes/')),
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='profile', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Education',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('degree', models.CharField(max_length=255)),
+                ('university', models.CharField(max_length=255)),
+                ('year_of_completion', models.IntegerField()),
+                ('marks_cgpa', models.CharField(max_length=50)),
+                ('user_profile', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='educations', to='users.userprofile')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='WorkExperience',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('company_name', models.CharField(max_length=255)),
+                ('designation', models.CharField(max_length=255)),
+                ('start_date', models.DateField()),
+                ('end_date', models.DateField(blank=True, null=True)),
+                ('responsibilities', models.TextField()),
+                ('user_profile', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='experiences', to='users.userprofile')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='profilesharelink',
+            index=models.Index(fields=['token'], name='users_profi_token_f228bf_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='profilesharelink',
+            index=models.Index(fields=['expiry_date'], name='users_profi_expiry__ba3c26_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='profileviewlog',
+            index=models.Index(fields=['share_link'], name='users_profi_share_l_ee2e44_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='profileviewlog',
+            index=models.Index(fields=['viewed_at'], name='users_profi_viewed__c7802f_idx'),
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 5.2.6 on 2026-10-18 11:31
+
+from django.db import migrations, models
+from django.db.models import Count, Q
+
+
+def count_members(apps, schema_editor):
+    CustomUser = apps.get_model("users", "CustomUser")
+    MemberStats = apps.get_model("users", "MemberStats")
+    # explicit alias, otherwise the replica router sends this to "default"
+    db = schema_editor.connection.alias
+    MemberStats.objects.using(db).create(pk=1, **CustomUser.objects.using(db).aggregate(
+        total_users=Count("id"),
+        active_users=Count("id", filter=Q(is_active=True, is_blocked=False)),
+        blocked_users=Count("id", filter=Q(is_blocked=True)),
+        pending_users=Count("id", filter=Q(is_active=False, is_blocked=False)),
+    ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0005_profileviewlog_viewed_at_default'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MemberStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('total_users', models.PositiveBigIntegerField(default=0)),
+                ('active_users', models.PositiveBigIntegerField(default=0)),
+                ('blocked_users', models.PositiveBigIntegerField(default=0)),
+                ('pending_users', models.PositiveBigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name_plural': 'member stats',
+            },
+        ),
+        migrations.RunPython(count_members, migrations.RunPython.noop),
+    ]
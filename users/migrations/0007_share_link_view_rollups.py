@@ -0,0 +1,50 @@
+# Generated by Django 5.2.6 on 2026-10-18 11:32
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0006_memberstats'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RollupWatermark',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True)),
+                ('last_id', models.BigIntegerField(default=0)),
+                ('gap_seen_at', models.DateTimeField(blank=True, null=True)),
+                ('gap_horizon_id', models.BigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ShareLinkDailyViews',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('views', models.PositiveIntegerField(default=0)),
+                ('share_link', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_views', to='users.profilesharelink')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('share_link', 'day'), name='unique_share_link_day')],
+            },
+        ),
+        migrations.CreateModel(
+            name='ShareLinkHourlyViews',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('hour', models.DateTimeField()),
+                ('views', models.PositiveIntegerField(default=0)),
+                ('share_link', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='hourly_views', to='users.profilesharelink')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['hour'], name='users_share_hour_d4d530_idx')],
+                'constraints': [models.UniqueConstraint(fields=('share_link', 'hour'), name='unique_share_link_hour')],
+            },
+        ),
+    ]
@@ -0,0 +1,117 @@
+# Generated by Django 5.2.6 on 2026-10-18 11:40
+
+import re
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+# frozen copies of users.search as of this migration, so later changes there can't change what it does
+FTS_TABLE = "users_membersearch_fts"
+
+POSTGRES_SQL = [
+    # weighted vector kept up to date by the database itself
+    """ALTER TABLE users_membersearchdocument ADD COLUMN search_vector tsvector
+       GENERATED ALWAYS AS (
+           setweight(to_tsvector('simple', coalesce(title, '')), 'A') ||
+           setweight(to_tsvector('simple', coalesce(body, '')), 'B')
+       ) STORED""",
+    "CREATE INDEX users_membersearch_vector_gin ON users_membersearchdocument USING GIN (search_vector)",
+]
+POSTGRES_REVERSE_SQL = [
+    "DROP INDEX IF EXISTS users_membersearch_vector_gin",
+    "ALTER TABLE users_membersearchdocument DROP COLUMN IF EXISTS search_vector",
+]
+
+SQLITE_SQL = [
+    # external-content FTS5 table: stores only the index, rows live in the document table
+    f"""CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5(
+           title, body, content='users_membersearchdocument', content_rowid='user_id',
+           tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+       )""",
+    f"""CREATE TRIGGER {FTS_TABLE}_ai AFTER INSERT ON users_membersearchdocument BEGIN
+           INSERT INTO {FTS_TABLE}(rowid, title, body) VALUES (new.user_id, new.title, new.body);
+       END""",
+    f"""CREATE TRIGGER {FTS_TABLE}_ad AFTER DELETE ON users_membersearchdocument BEGIN
+           INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, body) VALUES ('delete', old.user_id, old.title, old.body);
+       END""",
+    f"""CREATE TRIGGER {FTS_TABLE}_au AFTER UPDATE ON users_membersearchdocument BEGIN
+           INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, body) VALUES ('delete', old.user_id, old.title, old.body);
+           INSERT INTO {FTS_TABLE}(rowid, title, body) VALUES (new.user_id, new.title, new.body);
+       END""",
+]
+SQLITE_REVERSE_SQL = [
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_ai",
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_ad",
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_au",
+    f"DROP TABLE IF EXISTS {FTS_TABLE}",
+]
+
+
+def _run(schema_editor, statements):
+    for statement in statements.get(schema_editor.connection.vendor, []):
+        schema_editor.execute(statement)
+
+
+def create_search_index(apps, schema_editor):
+    _run(schema_editor, {"postgresql": POSTGRES_SQL, "sqlite": SQLITE_SQL})
+
+
+def drop_search_index(apps, schema_editor):
+    _run(schema_editor, {"postgresql": POSTGRES_REVERSE_SQL, "sqlite": SQLITE_REVERSE_SQL})
+
+
+def _words(*values):
+    return " ".join(str(v) for v in values if v)
+
+
+def _document(user):
+    profile = getattr(user, "profile", None)
+    title = _words(user.full_name, user.email, re.sub(r"[@.\-_+]", " ", user.email or ""),
+                   user.membership_id, (user.membership_id or "").replace("-", " "))
+    if profile is None:
+        return title, ""
+    body = _words(
+        profile.skills,
+        profile.languages,
+        *(_words(e.degree, e.university) for e in profile.educations.all()),
+        *(_words(w.company_name, w.designation) for w in profile.experiences.all()),
+    )
+    return title, body
+
+
+def index_existing_members(apps, schema_editor):
+    CustomUser = apps.get_model("users", "CustomUser")
+    MemberSearchDocument = apps.get_model("users", "MemberSearchDocument")
+    db = schema_editor.connection.alias
+    users = (CustomUser.objects.using(db).order_by("pk").select_related("profile")
+             .prefetch_related("profile__educations", "profile__experiences").iterator(chunk_size=500))
+    documents = []
+    for user in users:
+        title, body = _document(user)
+        documents.append(MemberSearchDocument(user_id=user.pk, title=title, body=body))
+        if len(documents) == 500:
+            MemberSearchDocument.objects.using(db).bulk_create(documents)
+            documents = []
+    MemberSearchDocument.objects.using(db).bulk_create(documents)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0010_mediablob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MemberSearchDocument',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='search_document', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('title', models.TextField(blank=True)),
+                ('body', models.TextField(blank=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+        migrations.RunPython(index_existing_members, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,96 @@
+# Generated by Django 5.2.6 on 2026-10-18 11:41
+
+import re
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+# frozen copy of users.tags.split_tags as of this migration
+SEPARATORS = re.compile(r"[,;|/\n]+")
+
+
+def _split(text):
+    seen = []
+    for part in SEPARATORS.split(text or ""):
+        name = " ".join(part.split()).lower()[:100]
+        if name and name not in seen:
+            seen.append(name)
+    return seen
+
+
+def tag_existing_profiles(apps, schema_editor):
+    db = schema_editor.connection.alias
+    UserProfile = apps.get_model("users", "UserProfile")
+    # text field -> (tag model, link model, link FK to the tag); the link tables are new, so only inserts
+    for field, tag_model, link_model, fk in [("skills", "Skill", "ProfileSkill", "skill"),
+                                             ("languages", "Language", "ProfileLanguage", "language")]:
+        Tag, Link = apps.get_model("users", tag_model), apps.get_model("users", link_model)
+        wanted = {profile_id: _split(text)
+                  for profile_id, text in UserProfile.objects.using(db).values_list("pk", field).iterator()}
+        names = sorted({name for names in wanted.values() for name in names})
+        Tag.objects.using(db).bulk_create([Tag(name=name) for name in names], batch_size=500)
+        ids = dict(Tag.objects.using(db).values_list("name", "id"))
+        Link.objects.using(db).bulk_create(
+            [Link(profile_id=profile_id, **{f"{fk}_id": ids[name]})
+             for profile_id, names in wanted.items() for name in names],
+            batch_size=500,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0011_member_search'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Language',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Skill',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ProfileLanguage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('language', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='profile_links', to='users.language')),
+                ('profile', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='language_links', to='users.userprofile')),
+            ],
+        ),
+        migrations.AddField(
+            model_name='userprofile',
+            name='language_tags',
+            field=models.ManyToManyField(blank=True, related_name='profiles', through='users.ProfileLanguage', to='users.language'),
+        ),
+        migrations.CreateModel(
+            name='ProfileSkill',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('profile', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='skill_links', to='users.userprofile')),
+                ('skill', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='profile_links', to='users.skill')),
+            ],
+        ),
+        migrations.AddField(
+            model_name='userprofile',
+            name='skill_tags',
+            field=models.ManyToManyField(blank=True, related_name='profiles', through='users.ProfileSkill', to='users.skill'),
+        ),
+        migrations.AddConstraint(
+            model_name='profilelanguage',
+            constraint=models.UniqueConstraint(fields=('language', 'profile'), name='unique_language_profile'),
+        ),
+        migrations.AddConstraint(
+            model_name='profileskill',
+            constraint=models.UniqueConstraint(fields=('skill', 'profile'), name='unique_skill_profile'),
+        ),
+        migrations.RunPython(tag_existing_profiles, migrations.RunPython.noop),
+    ]
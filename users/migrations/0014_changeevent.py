@@ -0,0 +1,24 @@
+# Generated by Django 5.2.6 on 2026-10-18 11:57
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0013_change_tracking'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChangeEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('registered', 'Registered'), ('verified', 'Verified'), ('blocked', 'Blocked'), ('unblocked', 'Unblocked'), ('updated', 'Account updated'), ('profile_updated', 'Profile updated'), ('deleted', 'Deleted')], max_length=20)),
+                ('user_id', models.BigIntegerField()),
+                ('data', models.JSONField(default=dict)),
+                ('created_at', models.DateTimeField(db_index=True, default=django.utils.timezone.now)),
+            ],
+        ),
+    ]
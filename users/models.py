@@ -1,9 +1,7 @@
 # Create your models here.
 from django.contrib.auth.models import AbstractBaseUser, BaseUserManager, PermissionsMixin
-from django.db import models
-from datetime import datetime
+from django.db import models, transaction
 from django.conf import settings
-import random
 import uuid
 from datetime import timedelta
 from django.utils import timezone
@@ -16,8 +14,10 @@ class CustomUserManager(BaseUserManager):
         email = self.normalize_email(email)
         user = self.model(email=email, full_name=full_name, **extra_fields)
         user.set_password(password)  # encrypt password
-        # auto-generate membership ID
-        user.membership_id = f"SOCRP-{datetime.now().year}-{random.randint(10000,99999)}"
+        # auto-generate membership ID from the per-year sequence (never collides)
+        if not user.membership_id:
+            from .membership import next_membership_id
+            user.membership_id = next_membership_id()
         user.save()
         return user
 
@@ -33,20 +33,44 @@ class CustomUser(AbstractBaseUser, PermissionsMixin):
     email = models.EmailField(unique=True)
     phone = models.CharField(max_length=15, blank=True)
     profile_photo = models.ImageField(upload_to='profiles/', blank=True, null=True)
+    profile_photo_derivatives = models.BooleanField(default=False)  # thumbnails built (users.images)
     resume = models.FileField(upload_to='resumes/', blank=True, null=True)
     membership_id = models.CharField(max_length=20, unique=True, blank=True)
     is_verified = models.BooleanField(default=False)
     is_active = models.BooleanField(default=True)
     is_staff = models.BooleanField(default=False)
     is_blocked = models.BooleanField(default=False)
+    date_joined = models.DateTimeField(default=timezone.now)
+    # also moved forward when the profile or its education/work rows change (see users.changes)
+    updated_at = models.DateTimeField(auto_now=True)
 
     objects = CustomUserManager()
 
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = ['full_name']
 
+    class Meta:
+        indexes = [
+            # backs the admin list's keyset pagination (newest first, id tie-break)
+            models.Index(fields=["date_joined", "id"]),
+            # backs ?updated_since= delta syncs, in the same (value, id) order
+            models.Index(fields=["updated_at", "id"]),
+        ]
+
     def __str__(self):
         return self.email
+
+    # save/delete run in a transaction so the MemberStats counters updated by
+    # the post_save/post_delete signals commit (or roll back) with the row. No
+    # savepoint inside an outer transaction: like Django's own save(), an error
+    # here dooms the outer transaction anyway
+    def save(self, *args, **kwargs):
+        with transaction.atomic(using=kwargs.get("using"), savepoint=False):
+            super().save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        with transaction.atomic(using=kwargs.get("using"), savepoint=False):
+            return super().delete(*args, **kwargs)
     
 # users/models.py
 class UserProfile(models.Model):
@@ -58,14 +82,51 @@ class UserProfile(models.Model):
     contact = models.CharField(max_length=15, blank=True)
     address = models.TextField(blank=True)
     profile_photo = models.ImageField(upload_to="profiles/", blank=True, null=True)
+    profile_photo_derivatives = models.BooleanField(default=False)  # thumbnails built (users.images)
 
     # Extra info
     skills = models.TextField(blank=True)
     languages = models.TextField(blank=True)
     resume = models.FileField(upload_to="resumes/", blank=True, null=True)
 
+    # normalised copies of skills / languages for indexed filtering (users.tags keeps them in sync)
+    skill_tags = models.ManyToManyField("Skill", through="ProfileSkill", related_name="profiles", blank=True)
+    language_tags = models.ManyToManyField("Language", through="ProfileLanguage", related_name="profiles", blank=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
     def __str__(self):
         return f"{self.user.full_name}'s Profile"
+
+class Skill(models.Model):
+    name = models.CharField(max_length=100, unique=True)  # normalised: lower-case, single spaces
+
+    def __str__(self):
+        return self.name
+
+class Language(models.Model):
+    name = models.CharField(max_length=100, unique=True)
+
+    def __str__(self):
+        return self.name
+
+class ProfileSkill(models.Model):
+    profile = models.ForeignKey(UserProfile, on_delete=models.CASCADE, related_name="skill_links")
+    skill = models.ForeignKey(Skill, on_delete=models.CASCADE, related_name="profile_links")
+
+    class Meta:
+        constraints = [
+            # (skill, profile) order: "who has skill X" is an index range scan
+            models.UniqueConstraint(fields=["skill", "profile"], name="unique_skill_profile"),
+        ]
+
+class ProfileLanguage(models.Model):
+    profile = models.ForeignKey(UserProfile, on_delete=models.CASCADE, related_name="language_links")
+    language = models.ForeignKey(Language, on_delete=models.CASCADE, related_name="profile_links")
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["language", "profile"], name="unique_language_profile"),
+        ]
 #education model
 class Education(models.Model):
     user_profile = models.ForeignKey(UserProfile, on_delete=models.CASCADE, related_name="educations")
@@ -73,6 +134,7 @@ class Education(models.Model):
     university = models.CharField(max_length=255)
     year_of_completion = models.IntegerField()
     marks_cgpa = models.CharField(max_length=50)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
 
     def __str__(self):
         return f"{self.degree} - {self.university} ({self.year_of_completion})"
@@ -84,10 +146,68 @@ class WorkExperience(models.Model):
     start_date = models.DateField()
     end_date = models.DateField(null=True, blank=True)
     responsibilities = models.TextField()
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
 
     def __str__(self):
         return f"{self.company_name} - {self.designation} ({self.start_date} to {self.end_date or 'Present'})"
 
+class UserTombstone(models.Model):
+    """A deleted user, kept so ``?updated_since=`` syncs can report it (purged by `purge_stale_data`)."""
+    user_id = models.BigIntegerField()
+    deleted_at = models.DateTimeField(default=timezone.now, db_index=True)
+
+    def __str__(self):
+        return f"user {self.user_id} deleted {self.deleted_at}"
+
+class ChangeEvent(models.Model):
+    """An admin-relevant change to a member, pushed to dashboards by users.events (the id is the SSE event id)."""
+    KIND_REGISTERED = "registered"
+    KIND_VERIFIED = "verified"
+    KIND_BLOCKED = "blocked"
+    KIND_UNBLOCKED = "unblocked"
+    KIND_UPDATED = "updated"
+    KIND_PROFILE_UPDATED = "profile_updated"
+    KIND_DELETED = "deleted"
+    KIND_CHOICES = [
+        (KIND_REGISTERED, "Registered"),
+        (KIND_VERIFIED, "Verified"),
+        (KIND_BLOCKED, "Blocked"),
+        (KIND_UNBLOCKED, "Unblocked"),
+        (KIND_UPDATED, "Account updated"),
+        (KIND_PROFILE_UPDATED, "Profile updated"),
+        (KIND_DELETED, "Deleted"),
+    ]
+
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    user_id = models.BigIntegerField()  # no FK: a deleted user's events are still delivered
+    data = models.JSONField(default=dict)
+    created_at = models.DateTimeField(default=timezone.now, db_index=True)
+
+    def __str__(self):
+        return f"#{self.pk} {self.kind} user {self.user_id}"
+
+class MemberSearchDocument(models.Model):
+    """
+    Denormalised search text for one member, rebuilt by users.search on save.
+
+    The migration adds the engine-side index over it: a generated, weighted
+    ``tsvector`` column with a GIN index on PostgreSQL, an FTS5 table kept in
+    step by triggers on SQLite.
+    """
+    user = models.OneToOneField(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, primary_key=True,
+                                related_name="search_document")
+    title = models.TextField(blank=True)  # name, email, membership id (ranked higher)
+    body = models.TextField(blank=True)   # skills, languages, education, work history
+    updated_at = models.DateTimeField(auto_now=True)
+
+class MembershipSequence(models.Model):
+    """Next free membership number per year; handed out in blocks by users.membership."""
+    year = models.PositiveIntegerField(unique=True)
+    next_value = models.BigIntegerField(default=1)
+
+    def __str__(self):
+        return f"{self.year}: next {self.next_value}"
+
 class ProfileShareLink(models.Model):
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="share_links")
     token = models.UUIDField(default=uuid.uuid4, unique=True, editable=False)
@@ -105,10 +225,124 @@ class ProfileViewLog(models.Model):
     share_link = models.ForeignKey(ProfileShareLink, on_delete=models.CASCADE, related_name="logs")
     viewer_ip = models.GenericIPAddressField(null=True, blank=True)
     user_agent = models.TextField(null=True, blank=True)
-    viewed_at = models.DateTimeField(auto_now_add=True)
+    viewed_at = models.DateTimeField(default=timezone.now)  # set by the request, not at (batched) insert time
     class Meta:
         indexes = [
             models.Index(fields=["share_link"]),
             models.Index(fields=["viewed_at"]),
         ]
    
+
+class LoadedSpoolSegment(models.Model):
+    """A view-log spool file whose rows are committed but which may not be deleted yet (see users.viewlog)."""
+    name = models.CharField(max_length=255, unique=True)
+    loaded_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return self.name
+
+class ShareLinkDailyViews(models.Model):
+    """Views per share link per day, rolled up from ProfileViewLog by `aggregate_view_logs`."""
+    share_link = models.ForeignKey(ProfileShareLink, on_delete=models.CASCADE, related_name="daily_views")
+    day = models.DateField()
+    views = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["share_link", "day"], name="unique_share_link_day"),
+        ]
+
+class ShareLinkHourlyViews(models.Model):
+    """Views per share link per hour; only the last few days are kept (see VIEW_ROLLUP_HOURLY_RETENTION_DAYS)."""
+    share_link = models.ForeignKey(ProfileShareLink, on_delete=models.CASCADE, related_name="hourly_views")
+    hour = models.DateTimeField()
+    views = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["share_link", "hour"], name="unique_share_link_hour"),
+        ]
+        indexes = [
+            models.Index(fields=["hour"]),
+        ]
+
+class RollupWatermark(models.Model):
+    """Highest source row id an incremental aggregation has already folded in."""
+    name = models.CharField(max_length=50, unique=True)
+    last_id = models.BigIntegerField(default=0)
+    # when the aggregation first stopped at a gap (None: no gap), and the highest id
+    # visible then: once VIEW_ROLLUP_GAP_SECONDS have passed, every gap below it is settled
+    gap_seen_at = models.DateTimeField(null=True, blank=True)
+    gap_horizon_id = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.name} @ {self.last_id}"
+
+class MediaBlob(models.Model):
+    """Reference count of a content-addressed media file (see users.storage / users.blobs)."""
+    name = models.CharField(max_length=255, unique=True)
+    refcount = models.IntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["refcount", "updated_at"]),
+        ]
+
+    def __str__(self):
+        return f"{self.name} ({self.refcount} refs)"
+
+class OutboxEmail(models.Model):
+    """An email queued inside the request's transaction and sent later by `send_outbox_emails`."""
+    STATUS_PENDING = "pending"
+    STATUS_SENT = "sent"
+    STATUS_FAILED = "failed"
+    STATUS_CHOICES = [
+        (STATUS_PENDING, "Pending"),
+        (STATUS_SENT, "Sent"),
+        (STATUS_FAILED, "Failed"),
+    ]
+
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    from_email = models.CharField(max_length=255)
+    recipients = models.JSONField(default=list)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # the worker only ever asks for "pending and due, oldest first"
+            models.Index(fields=["status", "next_attempt_at"]),
+        ]
+
+    def __str__(self):
+        return f"{self.subject} -> {', '.join(self.recipients)} ({self.status})"
+
+
+class MemberStats(models.Model):
+    """
+    Single-row counters behind /api/admin/stats/.
+
+    Kept in step with CustomUser by signals (see users.stats); rebuild with
+    `manage.py reconcile_member_stats` if they ever drift.
+    """
+    SINGLETON_ID = 1
+
+    total_users = models.PositiveBigIntegerField(default=0)
+    active_users = models.PositiveBigIntegerField(default=0)
+    blocked_users = models.PositiveBigIntegerField(default=0)
+    pending_users = models.PositiveBigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name_plural = "member stats"
+
+    def __str__(self):
+        return f"{self.total_users} users ({self.active_users} active, {self.blocked_users} blocked, {self.pending_users} pending)"
@@ -0,0 +1,114 @@
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.utils import timezone
+
+from .models import OutboxEmail
+
+logger = logging.getLogger(__name__)
+
+# how long a claimed row stays invisible to other workers while we send it
+CLAIM_LEASE = timedelta(minutes=5)
+
+
+def enqueue_email(subject, message, recipient_list, from_email=None):
+    """
+    Queue an email instead of sending it.
+
+    Call this inside the transaction that produced the email: the row commits
+    (or rolls back) together with the data it talks about, and the request
+    never waits on the mail server.
+    """
+    return OutboxEmail.objects.create(
+        subject=subject,
+        body=message,
+        from_email=from_email or settings.DEFAULT_FROM_EMAIL,
+        recipients=list(recipient_list),
+    )
+
+
+def retry_delay(attempts):
+    """Exponential backoff: base, 2*base, 4*base ... capped at OUTBOX_MAX_BACKOFF seconds."""
+    delay = settings.OUTBOX_BACKOFF_SECONDS * (2 ** max(attempts - 1, 0))
+    return timedelta(seconds=min(delay, settings.OUTBOX_MAX_BACKOFF))
+
+
+def claim_batch(batch_size):
+    """Lease up to `batch_size` due emails so concurrent workers never send the same row twice."""
+    now = timezone.now()
+    with transaction.atomic():
+        batch = list(
+            OutboxEmail.objects.select_for_update(skip_locked=True)
+            .filter(status=OutboxEmail.STATUS_PENDING, next_attempt_at__lte=now)
+            .order_by("next_attempt_at", "id")[:batch_size]
+        )
+        if batch:
+            OutboxEmail.objects.filter(pk__in=[email.pk for email in batch]).update(
+                next_attempt_at=now + CLAIM_LEASE
+            )
+    return batch
+
+
+def _mark_failed(email, exc, max_attempts):
+    email.attempts += 1
+    email.last_error = f"{type(exc).__name__}: {exc}"
+    if email.attempts >= max_attempts:
+        email.status = OutboxEmail.STATUS_FAILED
+        logger.error("Giving up on outbox email %s after %s attempts: %s", email.pk, email.attempts, exc)
+    else:
+        email.next_attempt_at = timezone.now() + retry_delay(email.attempts)
+        logger.warning("Outbox email %s failed (attempt %s), retrying: %s", email.pk, email.attempts, exc)
+    email.save(update_fields=["attempts", "last_error", "status", "next_attempt_at"])
+
+
+def send_batch(connection, batch_size=None, max_attempts=None):
+    """
+    Send one batch of due emails over `connection` (kept open by the caller).
+
+    Returns ``(sent, failed)``. A message that fails is rescheduled with
+    backoff; a broken connection is closed so the next message reopens it.
+    """
+    batch_size = batch_size or settings.OUTBOX_BATCH_SIZE
+    max_attempts = max_attempts or settings.OUTBOX_MAX_ATTEMPTS
+    sent = failed = 0
+    for email in claim_batch(batch_size):
+        message = EmailMessage(
+            subject=email.subject,
+            body=email.body,
+            from_email=email.from_email,
+            to=email.recipients,
+            connection=connection,
+        )
+        try:
+            connection.open()
+            message.send()
+        except Exception as exc:
+            failed += 1
+            _mark_failed(email, exc, max_attempts)
+            connection.close()
+            continue
+        sent += 1
+        email.status = OutboxEmail.STATUS_SENT
+        email.attempts += 1
+        email.sent_at = timezone.now()
+        email.last_error = ""
+        email.save(update_fields=["status", "attempts", "sent_at", "last_error"])
+    return sent, failed
+
+
+def drain(batch_size=None, max_attempts=None):
+    """Send everything that is currently due over one connection. Returns ``(sent, failed)``."""
+    connection = get_connection()
+    total_sent = total_failed = 0
+    try:
+        while True:
+            sent, failed = send_batch(connection, batch_size, max_attempts)
+            total_sent += sent
+            total_failed += failed
+            if not sent and not failed:
+                return total_sent, total_failed
+    finally:
+        connection.close()
@@ -0,0 +1,54 @@
+from rest_framework.pagination import CursorPagination, LimitOffsetPagination
+
+
+class AdminUserCursorPagination(CursorPagination):
+    """
+    Keyset pagination for the admin user list.
+
+    The cursor encodes the position on the (indexed) ordering column, so every
+    page costs the same no matter how deep into the table the admin scrolls.
+    """
+    page_size = 50
+    page_size_query_param = "page_size"
+    max_page_size = 200
+    ordering = ("-date_joined", "-id")
+
+    def get_ordering(self, request, queryset, view):
+        ordering = list(super().get_ordering(request, queryset, view))
+        # always finish on the primary key so rows sharing a value
+        # (same name, same signup second) never repeat or vanish between pages
+        if not any(field.lstrip("-") in ("id", "pk") for field in ordering):
+            ordering.append("-id" if ordering[0].startswith("-") else "id")
+        return tuple(ordering)
+
+
+class AdminUserDeltaPagination(AdminUserCursorPagination):
+    """
+    Pages of a ``?updated_since=`` sync, oldest change first.
+
+    Always walks the (updated_at, id) index; the list's ?ordering= doesn't
+    apply, so a row changed mid-sync moves to a later page instead of being
+    skipped.
+    """
+    ordering = ("updated_at", "id")
+
+    def get_ordering(self, request, queryset, view):
+        return self.ordering
+
+
+class MemberSearchPagination(LimitOffsetPagination):
+    """
+    limit/offset pages over ranked search hits.
+
+    Hits come from the search index rather than a queryset, so the search
+    function reports the total itself instead of a COUNT over the table.
+    """
+    default_limit = 20
+    max_limit = 100
+
+    def paginate_search(self, search, query, request):
+        self.request = request
+        self.limit = self.get_limit(request)
+        self.offset = self.get_offset(request)
+        self.count, hits = search(query, limit=self.limit, offset=self.offset)
+        return hits
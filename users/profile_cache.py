@@ -0,0 +1,145 @@
+"""
+Response cache for public shared-profile pages.
+
+Entries are keyed by share token *and* the owner's profile version. Saving or
+deleting anything that appears on the page bumps the version (see
+``users.signals``), so stale entries are simply never read again and age out
+on their own. Every entry also expires no later than its link.
+
+Nothing is cached unless CACHE_SHARED says all workers see the same cache
+(users.caching): a bump in one worker can't reach another's LocMemCache.
+"""
+import hashlib
+import json
+import time
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.utils import timezone
+
+from .caching import shared_cache
+from .models import ProfileShareLink
+from .routers import pin_primaries
+
+
+def _version_key(user_id):
+    return f"profile-version:{user_id}"
+
+
+def _link_key(token):
+    return f"share-link:{token}"
+
+
+def profile_version(user_id):
+    version = shared_cache().get(_version_key(user_id))
+    if version is None:
+        # never reuse an old value after eviction, or an old entry could come back
+        shared_cache().add(_version_key(user_id), time.time_ns(), timeout=None)
+        version = shared_cache().get(_version_key(user_id))
+    return version
+
+
+async def aprofile_version(user_id):
+    version = await shared_cache().aget(_version_key(user_id))
+    if version is None:
+        await shared_cache().aadd(_version_key(user_id), time.time_ns(), timeout=None)
+        version = await shared_cache().aget(_version_key(user_id))
+    return version
+
+
+def bump_profile_version(user_id):
+    """Invalidate every cached page of `user_id` once the current transaction commits."""
+    bump_profile_versions([user_id])
+
+
+def bump_profile_versions(user_ids):
+    user_ids = list(user_ids)
+    transaction.on_commit(lambda: shared_cache().set_many(
+        {_version_key(user_id): time.time_ns() for user_id in user_ids}, timeout=None))
+    # and read the pages from the primary until replicas have the change, so a
+    # lagging replica can't be cached under the new version
+    pin_primaries(user_ids)
+
+
+def forget_share_link(token):
+    shared_cache().delete(_link_key(token))
+
+
+def get_share_link(token):
+    """
+    ``(link_id, user_id, expiry_date)`` for a share token, or None if it doesn't exist.
+
+    Cached until the link expires so hot links skip the ProfileShareLink lookup.
+    """
+    cached = shared_cache().get(_link_key(token))
+    if cached is not None:
+        return cached
+    link = ProfileShareLink.objects.filter(token=token).values_list("id", "user_id", "expiry_date").first()
+    if link is None:
+        return None
+    remaining = (link[2] - timezone.now()).total_seconds()
+    if remaining > 0:
+        shared_cache().set(_link_key(token), link, timeout=remaining)
+    return link
+
+
+async def aget_share_link(token):
+    cached = await shared_cache().aget(_link_key(token))
+    if cached is not None:
+        return cached
+    link = await ProfileShareLink.objects.filter(token=token).values_list("id", "user_id", "expiry_date").afirst()
+    if link is None:
+        return None
+    remaining = (link[2] - timezone.now()).total_seconds()
+    if remaining > 0:
+        await shared_cache().aset(_link_key(token), link, timeout=remaining)
+    return link
+
+
+def _response_key(token, version):
+    return f"shared-profile:{token}:{version}"
+
+
+def get_cached_response(token, version):
+    """``(etag, data)`` for this version of the page, or None."""
+    return shared_cache().get(_response_key(token, version))
+
+
+async def aget_cached_response(token, version):
+    return await shared_cache().aget(_response_key(token, version))
+
+
+def _entry(expiry_date, data):
+    payload = json.dumps(data, cls=DjangoJSONEncoder, sort_keys=True).encode()
+    etag = f'"{hashlib.sha1(payload).hexdigest()}"'
+    remaining = (expiry_date - timezone.now()).total_seconds()
+    return (etag, data), min(settings.SHARED_PROFILE_CACHE_TTL, remaining)
+
+
+def cache_response(token, version, expiry_date, data):
+    """
+    Store serialized page data and return ``(etag, data)``.
+
+    `version` must be read *before* the data was loaded: if the profile
+    changed in between, the entry lands under a version nobody asks for.
+    """
+    entry, timeout = _entry(expiry_date, data)
+    if timeout > 0:
+        shared_cache().set(_response_key(token, version), entry, timeout=timeout)
+    return entry
+
+
+async def acache_response(token, version, expiry_date, data):
+    entry, timeout = _entry(expiry_date, data)
+    if timeout > 0:
+        await shared_cache().aset(_response_key(token, version), entry, timeout=timeout)
+    return entry
+
+
+def response_headers(etag, remaining):
+    return {
+        "ETag": etag,
+        # browsers revalidate (cheap 304s) and never keep the page past the link's expiry
+        "Cache-Control": f"private, max-age={int(min(settings.SHARED_PROFILE_BROWSER_MAX_AGE, remaining))}, must-revalidate",
+    }
@@ -0,0 +1,104 @@
+"""
+Retention policies for rows that are never read again.
+
+Each policy is a queryset of deletable rows. ``purge`` removes them in
+primary-key batches (each its own short transaction) and sleeps between
+batches so the deletes never hold long locks or starve live traffic.
+"""
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from .models import ChangeEvent, CustomUser, ProfileShareLink, ProfileViewLog, UserTombstone
+from .rollups import watermark
+
+
+def _counted_up_to():
+    mark = watermark()
+    return mark.last_id if mark else 0
+
+
+def expired_link_logs(days):
+    # cleared before the links themselves so each link delete cascades over nothing;
+    # like every purge of view logs, never past what the rollups have counted
+    cutoff = timezone.now() - timedelta(days=days)
+    return ProfileViewLog.objects.filter(share_link__expiry_date__lt=cutoff, id__lte=_counted_up_to())
+
+
+def expired_share_links(days):
+    # a link whose views aren't all counted yet waits for the next run
+    cutoff = timezone.now() - timedelta(days=days)
+    return ProfileShareLink.objects.filter(expiry_date__lt=cutoff).exclude(logs__id__gt=_counted_up_to())
+
+
+def old_view_logs(days):
+    cutoff = timezone.now() - timedelta(days=days)
+    return ProfileViewLog.objects.filter(viewed_at__lt=cutoff, id__lte=_counted_up_to())
+
+
+def unverified_users(days):
+    cutoff = timezone.now() - timedelta(days=days)
+    return CustomUser.objects.filter(
+        is_active=False, is_verified=False, is_blocked=False, is_staff=False,
+        last_login__isnull=True, date_joined__lt=cutoff,
+    )
+
+
+def old_user_tombstones(days):
+    cutoff = timezone.now() - timedelta(days=days)
+    return UserTombstone.objects.filter(deleted_at__lt=cutoff)
+
+
+def old_change_events(days):
+    cutoff = timezone.now() - timedelta(days=days)
+    return ChangeEvent.objects.filter(created_at__lt=cutoff)
+
+
+# name -> (settings key holding the age in days, queryset factory); run in this order
+POLICIES = {
+    "expired_link_logs": ("SHARE_LINK_GRACE_DAYS", expired_link_logs),
+    "expired_share_links": ("SHARE_LINK_GRACE_DAYS", expired_share_links),
+    "view_logs": ("VIEW_LOG_DAYS", old_view_logs),
+    "unverified_users": ("UNVERIFIED_USER_DAYS", unverified_users),
+    "user_tombstones": ("USER_TOMBSTONE_DAYS", old_user_tombstones),
+    "change_events": ("CHANGE_EVENT_DAYS", old_change_events),
+}
+
+
+def policy_days(name, overrides=None):
+    """Age threshold for a policy; 0 or None means the policy is disabled."""
+    key, _ = POLICIES[name]
+    if overrides and overrides.get(key) is not None:
+        return overrides[key]
+    return settings.RETENTION[key]
+
+
+def purge(queryset, batch_size=None, pause=None, dry_run=False):
+    """
+    Delete everything in `queryset` in pk-ordered batches.
+
+    Returns ``(rows, batches, seconds)``; ``rows`` counts cascaded deletes too.
+    With ``dry_run`` nothing is deleted and ``rows`` is the number of
+    matching top-level rows.
+    """
+    batch_size = batch_size or settings.RETENTION["BATCH_SIZE"]
+    pause = settings.RETENTION["PAUSE_SECONDS"] if pause is None else pause
+    started = time.monotonic()
+    if dry_run:
+        return queryset.count(), 0, time.monotonic() - started
+
+    model = queryset.model
+    rows = batches = 0
+    while True:
+        ids = list(queryset.order_by("pk").values_list("pk", flat=True)[:batch_size])
+        if not ids:
+            break
+        deleted, _ = model.objects.filter(pk__in=ids).delete()
+        rows += deleted
+        batches += 1
+        if len(ids) < batch_size:
+            break
+        time.sleep(pause)
+    return rows, batches, time.monotonic() - started
@@ -0,0 +1,131 @@
+"""
+Incremental share-link view rollups.
+
+``aggregate_views`` folds ProfileViewLog rows newer than the stored
+watermark into per-day and per-hour counters, one bounded id range per
+transaction. The watermark row is locked for the whole batch, so concurrent
+runs queue up instead of double counting.
+
+Ids are handed out at insert but become visible at commit, so a slow flush
+can commit id N after N+1 was already aggregated. The watermark therefore
+only moves over a contiguous run of ids. When it stops at a gap, the time
+and the highest id visible at that moment are recorded: every missing id
+below that one was handed out before then, so once VIEW_ROLLUP_GAP_SECONDS
+have passed they are all taken to be rollbacks (or rows deleted with their
+user) and skipped together. However many holes there are, the rollups lag
+by at most about two windows. Retention only deletes rows at or below the
+watermark, so nothing is purged before it was counted.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count
+from django.db.models.functions import TruncDate, TruncHour
+from django.utils import timezone
+
+from .models import ProfileViewLog, RollupWatermark, ShareLinkDailyViews, ShareLinkHourlyViews
+
+WATERMARK_NAME = "profile_views"
+
+
+def _upsert(model, bucket_field, counts):
+    """Add ``{(share_link_id, bucket): views}`` onto existing rollup rows."""
+    if not counts:
+        return
+    link_ids = {link_id for link_id, _ in counts}
+    buckets = {bucket for _, bucket in counts}
+    existing = {
+        (row.share_link_id, getattr(row, bucket_field)): row
+        for row in model.objects.filter(share_link_id__in=link_ids, **{f"{bucket_field}__in": buckets})
+    }
+    to_update, to_create = [], []
+    for key, views in counts.items():
+        row = existing.get(key)
+        if row is None:
+            to_create.append(model(share_link_id=key[0], views=views, **{bucket_field: key[1]}))
+        else:
+            row.views += views
+            to_update.append(row)
+    model.objects.bulk_update(to_update, ["views"])
+    model.objects.bulk_create(to_create)
+
+
+def _ready_ids(ids, after, horizon=0):
+    """The ids that can be counted: all those up to `horizon` (its gaps are settled), then a run without gaps."""
+    ready = []
+    for id_ in ids:
+        if id_ > horizon and id_ != max(after, horizon) + 1:
+            break
+        ready.append(id_)
+        after = id_
+    return ready
+
+
+def aggregate_batch(batch_size):
+    """
+    Fold up to `batch_size` log rows into the rollups.
+
+    Returns the number of rows consumed; fewer than `batch_size` means the
+    log is caught up (or waiting on a gap).
+    """
+    now = timezone.now()
+    hourly_cutoff = now - timedelta(days=settings.VIEW_ROLLUP_HOURLY_RETENTION_DAYS)
+    with transaction.atomic():
+        mark, _ = RollupWatermark.objects.select_for_update().get_or_create(name=WATERMARK_NAME)
+        ids = list(
+            ProfileViewLog.objects.filter(id__gt=mark.last_id).order_by("id").values_list("id", flat=True)[:batch_size]
+        )
+        settled = (mark.gap_seen_at is not None
+                   and now - mark.gap_seen_at >= timedelta(seconds=settings.VIEW_ROLLUP_GAP_SECONDS))
+        ids_ready = _ready_ids(ids, mark.last_id, mark.gap_horizon_id if settled else 0)
+        gap = (mark.gap_seen_at, mark.gap_horizon_id)
+        if len(ids_ready) == len(ids):
+            if not ids or ids[-1] >= mark.gap_horizon_id:  # else the rest of the horizon is in the next batch
+                mark.gap_seen_at, mark.gap_horizon_id = None, 0
+        elif mark.gap_seen_at is None or settled:
+            # stopped at a gap nobody is waiting on yet: start its clock
+            mark.gap_seen_at, mark.gap_horizon_id = now, ids[-1]
+        if not ids_ready:
+            if (mark.gap_seen_at, mark.gap_horizon_id) != gap:
+                mark.save()
+            return 0
+        ids = ids_ready
+        rows = ProfileViewLog.objects.filter(id__gt=mark.last_id, id__lte=ids[-1])
+
+        daily = rows.annotate(day=TruncDate("viewed_at")).values("share_link_id", "day").annotate(n=Count("id"))
+        _upsert(ShareLinkDailyViews, "day", {(r["share_link_id"], r["day"]): r["n"] for r in daily})
+
+        hourly = (
+            rows.filter(viewed_at__gte=hourly_cutoff)
+            .annotate(hour=TruncHour("viewed_at"))
+            .values("share_link_id", "hour")
+            .annotate(n=Count("id"))
+        )
+        _upsert(ShareLinkHourlyViews, "hour", {(r["share_link_id"], r["hour"]): r["n"] for r in hourly})
+
+        mark.last_id = ids[-1]
+        mark.save()
+    return len(ids)
+
+
+def prune_hourly():
+    cutoff = timezone.now() - timedelta(days=settings.VIEW_ROLLUP_HOURLY_RETENTION_DAYS)
+    deleted, _ = ShareLinkHourlyViews.objects.filter(hour__lt=cutoff).delete()
+    return deleted
+
+
+def aggregate_views(batch_size=10000):
+    """Catch the rollups up with the log. Returns ``(rows_consumed, hourly_rows_pruned)``."""
+    total = 0
+    while True:
+        consumed = aggregate_batch(batch_size)
+        total += consumed
+        if consumed < batch_size:
+            break
+    return total, prune_hourly()
+
+
+def watermark():
+    """The aggregation watermark; log rows with an id above ``last_id`` aren't counted yet."""
+    return RollupWatermark.objects.filter(name=WATERMARK_NAME).first()
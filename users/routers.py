@@ -0,0 +1,165 @@
+"""
+Primary/replica routing for read-heavy endpoints.
+
+Writes always go to ``default``. Reads go to ``default`` too unless the view
+opted in for the current request with ``use_replica()`` (the admin list and
+detail, admin stats, shared profiles and profile/me do), in which case they
+go to one of the DATABASE_REPLICA_URLS databases.
+
+Read-your-writes: after a user writes (any unsafe request, or a change to
+their profile from anywhere) their id is pinned to the primary for
+READ_YOUR_WRITES_SECONDS, and views pass that user to ``use_replica`` so
+the pinned reads stay on the primary while the replica catches up. The pin
+has to be seen by whichever worker serves the next read, so it's kept in
+two places:
+
+* a signed cookie on the response to the unsafe request, which pins the
+  writer's own follow-up reads from any worker, cache or not;
+* the shared cache (users.caching), which also covers readers who didn't
+  write themselves, like visitors of a profile an admin just edited. With a
+  per-process cache this half is off and only the cookie pins.
+"""
+import random
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import transaction
+from django.utils.functional import SimpleLazyObject, empty
+
+from .caching import shared_cache
+
+PIN_COOKIE = "db_pin"
+_PIN_SALT = "users.routers.pin"
+
+_replica = ContextVar("replica_alias", default=None)
+_cookie_pin = ContextVar("cookie_pin", default=None)  # user id pinned by the request's cookie
+
+
+def replica_aliases():
+    return [alias for alias in settings.DATABASES if alias.startswith("replica")]
+
+
+def _pin_key(user_id):
+    return f"db-pin:{user_id}"
+
+
+def pin_primary(user_id):
+    """Keep `user_id`'s reads on the primary for a while, starting once the current transaction commits."""
+    if user_id is not None:
+        pin_primaries([user_id])
+
+
+def pin_primaries(user_ids):
+    user_ids = list(user_ids)
+    if user_ids and settings.READ_YOUR_WRITES_SECONDS > 0:
+        transaction.on_commit(lambda: shared_cache().set_many(
+            {_pin_key(user_id): True for user_id in user_ids}, timeout=settings.READ_YOUR_WRITES_SECONDS))
+
+
+def _choose(pinned):
+    aliases = replica_aliases()
+    alias = random.choice(aliases) if aliases and not pinned else None
+    _replica.set(alias)
+    return alias
+
+
+def _cookie_pins(user_id):
+    return user_id is not None and _cookie_pin.get() == str(user_id)
+
+
+def use_replica(user_id=None):
+    """Send this request's reads to a replica unless `user_id` wrote recently. Returns the alias (or None)."""
+    if not replica_aliases():
+        return _choose(True)  # nothing to route: skip the pin lookups
+    pinned = _cookie_pins(user_id) or (user_id is not None and bool(shared_cache().get(_pin_key(user_id))))
+    return _choose(pinned)
+
+
+async def ause_replica(user_id=None):
+    if not replica_aliases():
+        return _choose(True)
+    pinned = _cookie_pins(user_id) or (user_id is not None and bool(await shared_cache().aget(_pin_key(user_id))))
+    return _choose(pinned)
+
+
+def current_replica():
+    return _replica.get()
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        # None lets Django fall back to the related instance's database, so
+        # prefetches follow a queryset that was pinned with .using()
+        return _replica.get()
+
+    def db_for_write(self, model, **hints):
+        return "default"
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True  # replicas hold the same data as the primary
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Scopes ``use_replica()`` to a single request, reads the pin cookie and
+    pins the user to the primary after an unsafe request. Runs in sync and
+    async chains.
+    """
+    sync_capable = True
+    async_capable = True
+    SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def _writer(self, request):
+        """Id of the authenticated user behind an unsafe request, else None."""
+        if request.method in self.SAFE_METHODS or settings.READ_YOUR_WRITES_SECONDS <= 0 or not replica_aliases():
+            return None
+        # DRF copies the user it authenticated onto the Django request; a lazy
+        # user nobody looked at isn't resolved here (that could mean a query)
+        user = getattr(request, "user", None)
+        if user is None or (isinstance(user, SimpleLazyObject) and user._wrapped is empty):
+            return None
+        return user.pk if user.is_authenticated else None
+
+    def _cookie_pin(self, request):
+        # the signature's timestamp enforces the pin's lifetime, whatever the client keeps
+        return request.get_signed_cookie(
+            PIN_COOKIE, default=None, salt=_PIN_SALT, max_age=settings.READ_YOUR_WRITES_SECONDS)
+
+    def _set_cookie(self, response, writer):
+        response.set_signed_cookie(
+            PIN_COOKIE, str(writer), salt=_PIN_SALT, max_age=settings.READ_YOUR_WRITES_SECONDS,
+            secure=settings.SESSION_COOKIE_SECURE, httponly=True, samesite="Lax")
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        tokens = _replica.set(None), _cookie_pin.set(self._cookie_pin(request))
+        try:
+            response = self.get_response(request)
+        finally:
+            _replica.reset(tokens[0])
+            _cookie_pin.reset(tokens[1])
+        writer = self._writer(request)
+        if writer is not None:
+            shared_cache().set(_pin_key(writer), True, timeout=settings.READ_YOUR_WRITES_SECONDS)
+            self._set_cookie(response, writer)
+        return response
+
+    async def __acall__(self, request):
+        tokens = _replica.set(None), _cookie_pin.set(self._cookie_pin(request))
+        try:
+            response = await self.get_response(request)
+        finally:
+            _replica.reset(tokens[0])
+            _cookie_pin.reset(tokens[1])
+        writer = self._writer(request)
+        if writer is not None:
+            await shared_cache().aset(_pin_key(writer), True, timeout=settings.READ_YOUR_WRITES_SECONDS)
+            self._set_cookie(response, writer)
+        return response
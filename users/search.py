@@ -0,0 +1,197 @@
+"""
+Ranked member search over MemberSearchDocument.
+
+Each member has one document row: ``title`` holds name, email and
+membership id, ``body`` the profile's skills, languages, education and work
+history. The engine-side index is created by migration 0010 and maintained
+by the database itself (generated column / triggers), so keeping it fresh
+only means rewriting the document row, which the signals do on commit.
+
+Queries are split into words and every word must match as a prefix, so
+"jo sm" finds "John Smith" on both PostgreSQL and SQLite.
+"""
+import re
+from itertools import islice
+
+from django.db import connections, router, transaction
+from django.db.models import Prefetch, Q
+from django.db.models.expressions import RawSQL
+
+FTS_TABLE = "users_membersearch_fts"
+MAX_TERMS = 8
+
+
+def _words(*values):
+    return " ".join(str(v) for v in values if v)
+
+
+def document_for(user):
+    """``(title, body)`` for a user loaded with its profile, educations and experiences."""
+    profile = getattr(user, "profile", None)
+    title = _words(
+        user.full_name,
+        user.email,
+        # split on punctuation too: the tsvector parser keeps an email as one token
+        re.sub(r"[@.\-_+]", " ", user.email or ""),
+        user.membership_id,
+        (user.membership_id or "").replace("-", " "),
+    )
+    if profile is None:
+        return title, ""
+    body = _words(
+        profile.skills,
+        profile.languages,
+        *(_words(e.degree, e.university) for e in profile.educations.all()),
+        *(_words(w.company_name, w.designation) for w in profile.experiences.all()),
+    )
+    return title, body
+
+
+def index_users(users, Document, batch_size=500):
+    """Upsert the search documents of ``users`` (an iterable of loaded users) in batches."""
+    users, written = iter(users), 0
+    while True:
+        documents = [Document(user_id=user.pk, title=title, body=body)
+                     for user in islice(users, batch_size) for title, body in [document_for(user)]]
+        if not documents:
+            return written
+        Document.objects.bulk_create(documents, update_conflicts=True, unique_fields=["user"],
+                                     update_fields=["title", "body", "updated_at"])
+        written += len(documents)
+
+
+def users_for_indexing(queryset):
+    return queryset.select_related("profile").prefetch_related(
+        Prefetch("profile__educations"), Prefetch("profile__experiences"))
+
+
+def reindex(user_ids):
+    from .models import CustomUser, MemberSearchDocument
+    users = users_for_indexing(CustomUser.objects.filter(pk__in=user_ids))
+    return index_users(users, MemberSearchDocument)
+
+
+class _ReindexBatch(set):
+    """Members to re-index when one transaction commits; registered with on_commit once."""
+
+    def __init__(self, connection):
+        super().__init__()
+        self.connection = connection
+
+    def __call__(self):
+        self.connection.reindex_batch = None
+        reindex(sorted(self))
+
+
+def schedule_reindex(user_id):
+    """
+    Rebuild a member's document once the current transaction commits.
+
+    A registration or a nested profile edit saves the user, the profile and
+    several education / work rows, each of which asks for this; the members
+    are collected per transaction and indexed in one pass at commit.
+    """
+    if user_id is None:
+        return
+    connection = transaction.get_connection()
+    if not connection.in_atomic_block:
+        reindex([user_id])
+        return
+    batch = getattr(connection, "reindex_batch", None)
+    # a rolled-back (savepoint of the) transaction drops the callback: start over then
+    if batch is None or not any(func is batch for _, func, _ in connection.run_on_commit):
+        batch = connection.reindex_batch = _ReindexBatch(connection)
+        transaction.on_commit(batch)
+    batch.add(user_id)
+
+
+def rebuild(batch_size=500):
+    """Re-index every member; returns the number of documents written."""
+    from .models import CustomUser, MemberSearchDocument
+    users = users_for_indexing(CustomUser.objects.order_by("pk")).iterator(chunk_size=batch_size)
+    return index_users(users, MemberSearchDocument, batch_size)
+
+
+def terms(query):
+    return re.findall(r"\w+", (query or "").lower())[:MAX_TERMS]
+
+
+def _connection():
+    from .models import MemberSearchDocument
+    return connections[router.db_for_read(MemberSearchDocument)]  # a replica when the view asked for one
+
+
+def _tsquery(words):
+    return " & ".join(f"{word}:*" for word in words)
+
+
+def _fts_match(words):
+    return " ".join('"%s"*' % word.replace('"', "") for word in words)
+
+
+def _fallback_documents(words):
+    from .models import MemberSearchDocument
+    queryset = MemberSearchDocument.objects.all()
+    for word in words:
+        queryset = queryset.filter(Q(title__icontains=word) | Q(body__icontains=word))
+    return queryset
+
+
+def _postgres_search(words, limit, offset):
+    tsquery = _tsquery(words)
+    base = (f"FROM users_membersearchdocument, to_tsquery('simple', %s) AS q "
+            f"WHERE search_vector @@ q")
+    with _connection().cursor() as cursor:
+        cursor.execute(f"SELECT count(*) {base}", [tsquery])
+        total = cursor.fetchone()[0]
+        cursor.execute(f"SELECT user_id, ts_rank_cd(search_vector, q) AS rank {base} "
+                       f"ORDER BY rank DESC, user_id LIMIT %s OFFSET %s", [tsquery, limit, offset])
+        return total, cursor.fetchall()
+
+
+def _sqlite_search(words, limit, offset):
+    match = _fts_match(words)
+    with _connection().cursor() as cursor:
+        cursor.execute(f"SELECT count(*) FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s", [match])
+        total = cursor.fetchone()[0]
+        # bm25 is lower-is-better; title matches weigh 10x body matches
+        cursor.execute(f"SELECT rowid, -bm25({FTS_TABLE}, 10.0, 1.0) AS rank FROM {FTS_TABLE} "
+                       f"WHERE {FTS_TABLE} MATCH %s ORDER BY rank DESC, rowid LIMIT %s OFFSET %s",
+                       [match, limit, offset])
+        return total, cursor.fetchall()
+
+
+def _fallback_search(words, limit, offset):
+    queryset = _fallback_documents(words)
+    total = queryset.count()
+    rows = queryset.order_by("user_id").values_list("user_id", flat=True)[offset:offset + limit]
+    return total, [(user_id, 0.0) for user_id in rows]
+
+
+def search_members(query, limit=20, offset=0):
+    """``(total_matches, [(user_id, rank), ...])`` best match first."""
+    words = terms(query)
+    if not words:
+        return 0, []
+    vendor = _connection().vendor
+    if vendor == "postgresql":
+        return _postgres_search(words, limit, offset)
+    if vendor == "sqlite":
+        return _sqlite_search(words, limit, offset)
+    return _fallback_search(words, limit, offset)
+
+
+def filter_matching(queryset, query):
+    """``queryset`` of users narrowed to the ones ``search_members(query)`` finds, unranked; for list filters."""
+    words = terms(query)
+    if not words:
+        return queryset
+    vendor = connections[queryset.db].vendor
+    if vendor == "postgresql":
+        matches = RawSQL("SELECT user_id FROM users_membersearchdocument "
+                         "WHERE search_vector @@ to_tsquery('simple', %s)", [_tsquery(words)])
+    elif vendor == "sqlite":
+        matches = RawSQL(f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s", [_fts_match(words)])
+    else:
+        matches = _fallback_documents(words).values("user_id")
+    return queryset.filter(pk__in=matches)
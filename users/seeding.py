@@ -0,0 +1,129 @@
+"""
+Deterministic synthetic members for benchmarks and local load testing.
+
+``seed_members`` writes everything with bulk inserts, so none of the model
+signals run; it does their work itself afterwards (profiles, tags, search
+documents, MemberStats). The same ``seed`` and ``start`` always produce the
+same rows (dates are relative to the time of seeding), and every seeded email ends in ``@seed.example`` so they are easy
+to find and delete.
+"""
+import random
+from datetime import date, timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+from django.utils import timezone
+
+from . import search, stats, tags
+from .membership import allocate_membership_ids
+from .models import (
+    CustomUser, Education, MemberSearchDocument, ProfileShareLink, ProfileViewLog, UserProfile, WorkExperience,
+)
+
+SEED_DOMAIN = "seed.example"
+FIRST_NAMES = ["Aarav", "Priya", "Rohan", "Ananya", "Vikram", "Meera", "Arjun", "Kavya", "Rahul", "Sneha",
+               "Karan", "Divya", "Amit", "Pooja", "Nikhil", "Isha"]
+LAST_NAMES = ["Sharma", "Patel", "Reddy", "Iyer", "Nair", "Gupta", "Das", "Singh", "Kulkarni", "Menon"]
+SKILLS = ["Python", "Django", "React", "SQL", "Java", "AWS", "Docker", "Excel", "Accounting", "Sales",
+          "Marketing", "Design", "Go", "Kubernetes", "Data Analysis"]
+LANGUAGES = ["English", "Hindi", "Tamil", "Telugu", "Marathi", "Bengali", "Kannada", "Malayalam"]
+DEGREES = ["BSc", "BCom", "BTech", "BA", "MSc", "MBA", "MTech", "PhD"]
+UNIVERSITIES = ["Delhi University", "Mumbai University", "IIT Madras", "Anna University", "Pune University"]
+COMPANIES = ["Infosys", "TCS", "Wipro", "Acme Corp", "Globex", "Initech", "Zoho", "Freshworks"]
+DESIGNATIONS = ["Engineer", "Senior Engineer", "Analyst", "Manager", "Consultant", "Designer"]
+USER_AGENTS = ["Mozilla/5.0 (X11; Linux x86_64)", "Mozilla/5.0 (iPhone; CPU iPhone OS 17_0)",
+               "Mozilla/5.0 (Windows NT 10.0; Win64; x64)"]
+
+
+def _member(rng, index, password, now):
+    name = f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+    roll = rng.random()
+    return CustomUser(
+        email=f"member{index}@{SEED_DOMAIN}",
+        full_name=name,
+        phone=f"9{rng.randrange(10 ** 9):09d}",
+        password=password,
+        is_active=roll > 0.1,         # ~10% still waiting for verification
+        is_verified=roll > 0.3,
+        is_blocked=0.1 < roll < 0.13,  # ~3% blocked
+        date_joined=now - timedelta(seconds=rng.randrange(365 * 86400)),
+    )
+
+
+def _profile_rows(rng, user, educations, experiences):
+    profile = UserProfile(
+        user=user,
+        dob=date(1970, 1, 1) + timedelta(days=rng.randrange(30 * 365)),
+        gender=rng.choice("MFO"),
+        contact=user.phone,
+        address=f"{rng.randrange(1, 500)} Main Road",
+        skills=", ".join(rng.sample(SKILLS, rng.randint(1, 5))),
+        languages=", ".join(rng.sample(LANGUAGES, rng.randint(1, 3))),
+    )
+    edu = [Education(degree=rng.choice(DEGREES), university=rng.choice(UNIVERSITIES),
+                     year_of_completion=rng.randint(1990, 2024), marks_cgpa=f"{rng.uniform(5, 10):.1f}")
+           for _ in range(educations)]
+    work = []
+    for _ in range(experiences):
+        start = date(2000, 1, 1) + timedelta(days=rng.randrange(8000))
+        work.append(WorkExperience(company_name=rng.choice(COMPANIES), designation=rng.choice(DESIGNATIONS),
+                                   start_date=start, end_date=rng.choice([None, start + timedelta(days=700)]),
+                                   responsibilities="Delivered projects and mentored the team."))
+    return profile, edu, work
+
+
+def _seed_batch(rng, indices, password, now, options):
+    users = [_member(rng, index, password, now) for index in indices]
+    for user, membership_id in zip(users, allocate_membership_ids(len(users), year=now.year)):
+        user.membership_id = membership_id
+    CustomUser.objects.bulk_create(users)
+
+    profiles, educations, experiences = [], [], []
+    for user in users:
+        profile, edu, work = _profile_rows(rng, user, options["educations"], options["experiences"])
+        profiles.append(profile)
+        educations.append(edu)
+        experiences.append(work)
+    UserProfile.objects.bulk_create(profiles)
+    for profile, edu, work in zip(profiles, educations, experiences):
+        for row in edu + work:
+            row.user_profile = profile
+    Education.objects.bulk_create([row for rows in educations for row in rows])
+    WorkExperience.objects.bulk_create([row for rows in experiences for row in rows])
+    tags.sync_profile_tags(profiles)
+
+    links = [ProfileShareLink(user=user, expiry_date=now + timedelta(days=rng.randint(-10, 30)))
+             for user in users for _ in range(options["share_links"])]
+    ProfileShareLink.objects.bulk_create(links)
+    ProfileViewLog.objects.bulk_create([
+        ProfileViewLog(share_link=link, viewer_ip=f"10.{rng.randrange(256)}.{rng.randrange(256)}.{rng.randrange(256)}",
+                       user_agent=rng.choice(USER_AGENTS), viewed_at=now - timedelta(minutes=rng.randrange(20000)))
+        for link in links for _ in range(options["views"])
+    ])
+
+    for user, profile, edu, work in zip(users, profiles, educations, experiences):
+        # hand the rows we already have to the search document builder
+        profile._prefetched_objects_cache = {"educations": edu, "experiences": work}
+        user.profile = profile
+    search.index_users(users, MemberSearchDocument)
+
+
+def seed_members(count, seed=1, start=0, batch_size=1000, password="password123",
+                 educations=2, experiences=2, share_links=1, views=5):
+    """
+    Create ``count`` members numbered ``start`` .. ``start + count - 1``.
+
+    Each batch is one transaction; returns the number of members created.
+    """
+    options = {"educations": educations, "experiences": experiences, "share_links": share_links, "views": views}
+    password = make_password(password)  # hashed once, shared by every seeded member
+    now = timezone.now()
+    created = 0
+    for offset in range(start, start + count, batch_size):
+        indices = range(offset, min(offset + batch_size, start + count))
+        rng = random.Random(f"{seed}:{offset}")  # batches are reproducible on their own
+        with transaction.atomic():
+            _seed_batch(rng, indices, password, now, options)
+        created += len(indices)
+    stats.reconcile()
+    return created
@@ -1,6 +1,72 @@
 from rest_framework import serializers
 from .models import CustomUser,UserProfile,Education,WorkExperience
+from .models import ProfileShareLink, ShareLinkDailyViews, ShareLinkHourlyViews
+from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.db import router, transaction
+from django.db.models.deletion import Collector
+from django.utils import timezone
+from . import changes
+from .bulk import ACTIONS as BULK_ACTIONS
+from .images import derivative_urls
+from .media import share_url
+from .tags import sync_profile_tags
+
+
+def sync_children(parent, related_name, items, match_on):
+    """
+    Make ``parent.<related_name>`` match ``items`` with a fixed number of queries.
+
+    Existing rows are loaded once and paired with incoming items on the
+    ``match_on`` fields (first unpaired row wins). Paired rows are changed
+    with one ``bulk_update``, unpaired items inserted with one
+    ``bulk_create``, and rows no longer listed are deleted in one statement.
+    When matching on ``("id",)``, an item without an id is new and an item
+    whose id isn't one of the parent's rows is ignored. Call inside a
+    transaction.
+    """
+    manager = getattr(parent, related_name)
+    model = manager.model
+    fk_name = manager.field.name
+    by_id = tuple(match_on) == ("id",)
+
+    existing = {}
+    for row in manager.all():
+        existing.setdefault(tuple(getattr(row, field) for field in match_on), []).append(row)
+
+    to_create, to_update, keep, update_fields = [], [], set(), set()
+    for item in items:
+        key = tuple(item.get(field) for field in match_on)
+        values = {field: value for field, value in item.items() if field not in ("id", fk_name)}
+        if existing.get(key):
+            row = existing[key].pop(0)
+            for field, value in values.items():
+                setattr(row, field, value)
+            update_fields.update(values)
+            to_update.append(row)
+            keep.add(row.pk)
+        elif not by_id or key == (None,):
+            to_create.append(model(**{fk_name: parent}, **values))
+
+    stale = [row for rows in existing.values() for row in rows if row.pk not in keep]
+    if stale:
+        # collect the loaded rows (parent already attached) so delete signals
+        # don't fetch it again row by row; still a single DELETE
+        collector = Collector(using=router.db_for_write(model, instance=parent))
+        collector.collect(stale)
+        collector.delete()
+    if to_update and update_fields:
+        # bulk_update skips auto_now, so stamp the rows here
+        now = timezone.now()
+        for row in to_update:
+            row.updated_at = now
+        model.objects.bulk_update(to_update, sorted(update_fields | {"updated_at"}))
+    if to_create:
+        model.objects.bulk_create(to_create)
+    # a prefetched copy of the old list would otherwise be serialized back
+    getattr(parent, "_prefetched_objects_cache", {}).pop(related_name, None)
+
+
 class UserRegisterSerializer(serializers.ModelSerializer):
     confirm_password = serializers.CharField(write_only=True)
 
@@ -22,6 +88,7 @@ class UserRegisterSerializer(serializers.ModelSerializer):
         phone=validated_data.get('phone', ''),
         profile_photo=validated_data.get('profile_photo', None),
         resume=validated_data.get('resume', None),
+        is_active=validated_data.get('is_active', True),
         )
         return user
 
@@ -34,17 +101,20 @@ class EducationSerializer(serializers.ModelSerializer):
     class Meta:
         model = Education
         fields = "__all__"
+        read_only_fields = ["user_profile"]  # always the profile being saved; skips a lookup per item
 
 class WorkExperienceSerializer(serializers.ModelSerializer):
     class Meta:
         model = WorkExperience
         fields = "__all__"
+        read_only_fields = ["user_profile"]  # always the profile being saved; skips a lookup per item
 
 class UserProfileSerializer(serializers.ModelSerializer):
     # Nested serializers
     user = UserSerializer(read_only=True)  # ✅ show full user object instead of just ID
     educations = EducationSerializer(many=True, required=False)
     experiences = WorkExperienceSerializer(many=True, required=False)
+    profile_photo_variants = serializers.SerializerMethodField()
 
     class Meta:
         model = UserProfile
@@ -56,6 +126,7 @@ class UserProfileSerializer(serializers.ModelSerializer):
             "contact",
             "address",
             "profile_photo",
+            "profile_photo_variants",  # thumbnail / webp URLs for avatars
             "resume",
             "skills",
             "languages",
@@ -64,20 +135,36 @@ class UserProfileSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = ["user"]
 
+    def get_profile_photo_variants(self, obj):
+        return derivative_urls(obj.profile_photo, obj.profile_photo_derivatives, self.context.get("request"))
+
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        token = self.context.get("share_token")
+        if token and data.get("resume"):
+            # resumes are private (users.media); the link lets the page's visitors open it
+            data["resume"] = share_url(data["resume"], token)
+        return data
+
+    @transaction.atomic
     def create(self, validated_data):
         educations_data = validated_data.pop("educations", [])
         experiences_data = validated_data.pop("experiences", [])
 
         profile = UserProfile.objects.create(**validated_data)
+        sync_profile_tags([profile])
 
-        for edu in educations_data:
-            Education.objects.create(user_profile=profile, **edu)
-
-        for exp in experiences_data:
-            WorkExperience.objects.create(user_profile=profile, **exp)
+        Education.objects.bulk_create(
+            [Education(**{**edu, "user_profile": profile}) for edu in educations_data]
+        )
+        WorkExperience.objects.bulk_create(
+            [WorkExperience(**{**exp, "user_profile": profile}) for exp in experiences_data]
+        )
+        changes.touch_users([profile.user_id])  # bulk_create sends no signals
 
         return profile
 
+    @transaction.atomic
     def update(self, instance, validated_data):
         # Update basic profile info
         instance.dob = validated_data.get("dob", instance.dob)
@@ -89,35 +176,30 @@ class UserProfileSerializer(serializers.ModelSerializer):
         instance.skills = validated_data.get("skills", instance.skills)
         instance.languages = validated_data.get("languages", instance.languages)
         instance.save()
+        if {"skills", "languages"} & set(validated_data):
+            sync_profile_tags([instance])
 
-        # Handle nested education
-        educations_data = validated_data.get("educations", [])
-        for edu in educations_data:
-            Education.objects.update_or_create(
-                user_profile=instance,
-                degree=edu.get("degree"),
-                defaults=edu
-            )
-
-        # Handle nested work experience
-        experiences_data = validated_data.get("experiences", [])
-        for exp in experiences_data:
-            WorkExperience.objects.update_or_create(
-                user_profile=instance,
-                company_name=exp.get("company_name"),
-                designation=exp.get("designation"),
-                defaults=exp
-            )
+        # Nested lists replace what's stored (matched on the same natural keys
+        # as before); a list that isn't sent is left alone
+        if "educations" in validated_data:
+            sync_children(instance, "educations", validated_data["educations"], match_on=("degree",))
+        if "experiences" in validated_data:
+            sync_children(instance, "experiences", validated_data["experiences"],
+                          match_on=("company_name", "designation"))
 
         return instance
     
 class AdminEducationSerializer(serializers.ModelSerializer):
+    id = serializers.IntegerField(required=False)  # writable so nested updates can match rows
+
     class Meta:
         model = Education
         fields = ["id", "degree", "university", "year_of_completion", "marks_cgpa"]
         read_only_fields = []  # admin can edit
 
 class AdminWorkExperienceSerializer(serializers.ModelSerializer):
+    id = serializers.IntegerField(required=False)  # writable so nested updates can match rows
+
     class Meta:
         model = WorkExperience
         fields = ["id", "company_name", "designation", "start_date", "end_date", "responsibilities"]
@@ -127,6 +209,7 @@ class AdminUserProfileSerializer(serializers.ModelSerializer):
     membership_id = serializers.CharField(source="user.membership_id", read_only=True)
     educations = AdminEducationSerializer(many=True, required=False)
     experiences = AdminWorkExperienceSerializer(many=True, required=False)
+    profile_photo_variants = serializers.SerializerMethodField()
 
     class Meta:
         model = UserProfile
@@ -135,46 +218,36 @@ class AdminUserProfileSerializer(serializers.ModelSerializer):
             
         fields = [
             "id","membership_id", "dob", "gender", "contact", "address",
-            "profile_photo", "resume", "skills", "languages",
+            "profile_photo", "profile_photo_variants", "resume", "skills", "languages",
             "educations", "experiences"
         ]
         read_only_fields = []
+
+    def get_profile_photo_variants(self, obj):
+        return derivative_urls(obj.profile_photo, obj.profile_photo_derivatives, self.context.get("request"))
+
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        token = self.context.get("share_token")
+        if token and data.get("resume"):
+            # resumes are private (users.media); the link lets the page's visitors open it
+            data["resume"] = share_url(data["resume"], token)
+        return data
+
+    @transaction.atomic
     def update(self, instance, validated_data):
         # --- Update profile fields ---
-        if "profile_photo" in validated_data:
-            instance.profile_photo = validated_data.pop("profile_photo")
-        if "resume" in validated_data:
-            instance.resume = validated_data.pop("resume")
-            
         for field in ["dob", "gender", "contact", "address", "profile_photo", "resume", "skills", "languages"]:
             setattr(instance, field, validated_data.get(field, getattr(instance, field)))
         instance.save()
+        if {"skills", "languages"} & set(validated_data):
+            sync_profile_tags([instance])
 
-        # --- Update educations ---
-        educations_data = validated_data.get("educations", [])
-        for edu in educations_data:
-            edu_id = edu.get("id")
-            if edu_id:
-                edu_instance = instance.educations.filter(id=edu_id).first()
-                if edu_instance:
-                    edu_serializer = AdminEducationSerializer(edu_instance, data=edu, partial=True)
-                    edu_serializer.is_valid(raise_exception=True)
-                    edu_serializer.save()
-            else:
-                Education.objects.create(user_profile=instance, **edu)
-
-        # --- Update experiences ---
-        experiences_data = validated_data.get("experiences", [])
-        for exp in experiences_data:
-            exp_id = exp.get("id")
-            if exp_id:
-                exp_instance = instance.experiences.filter(id=exp_id).first()
-                if exp_instance:
-                    exp_serializer = AdminWorkExperienceSerializer(exp_instance, data=exp, partial=True)
-                    exp_serializer.is_valid(raise_exception=True)
-                    exp_serializer.save()
-            else:
-                WorkExperience.objects.create(user_profile=instance, **exp)
+        # --- Sync educations / experiences by id (one diff per list) ---
+        if "educations" in validated_data:
+            sync_children(instance, "educations", validated_data["educations"], match_on=("id",))
+        if "experiences" in validated_data:
+            sync_children(instance, "experiences", validated_data["experiences"], match_on=("id",))
 
         return instance
 
@@ -183,27 +256,71 @@ class AdminUserSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = CustomUser
-        fields = ["id", "full_name", "email", "phone", "is_blocked", "profile"]
+        fields = [
+            "id", "membership_id", "full_name", "email", "phone",
+            "is_active", "is_verified", "is_blocked", "date_joined", "updated_at", "profile",
+        ]
+        read_only_fields = ["membership_id", "is_active", "is_verified", "date_joined", "updated_at"]
 
+    @transaction.atomic
     def update(self, instance, validated_data):
         # --- Update CustomUser fields ---
-        for field in ["full_name", "email", "phone", "is_blocked"]:
-            setattr(instance, field, validated_data.get(field, getattr(instance, field)))
-        instance.save()
+        # only the fields that were sent, so the status counters only lock the row for a block/unblock
+        fields = [field for field in ["full_name", "email", "phone", "is_blocked"] if field in validated_data]
+        for field in fields:
+            setattr(instance, field, validated_data[field])
+        if fields:
+            instance.save(update_fields=fields + ["updated_at"])
 
         # --- Handle profile update ---
         profile_data = validated_data.get("profile")
         if profile_data:
             profile_instance = getattr(instance, "profile", None)
-            if profile_instance:
-                serializer = AdminUserProfileSerializer(profile_instance, data=profile_data, partial=True)
-                serializer.is_valid(raise_exception=True)
-                serializer.save()
-            else:
-                profile_instance = UserProfile.objects.create(user=instance, **profile_data)
+            if profile_instance is None:
+                # a bare row first: the nested update below handles tags and education / work rows
+                profile_instance = UserProfile.objects.create(user=instance)
+            # profile_data is already validated by the nested field
+            self.fields["profile"].update(profile_instance, profile_data)
 
         return instance
 class AdminUserStatusSerializer(serializers.ModelSerializer):
     class Meta:
         model = CustomUser
-        fields = ["is_active", "is_verified", "is_blocked"]
\ No newline at end of file
+        fields = ["is_active", "is_verified", "is_blocked"]
+
+class AdminBulkActionSerializer(serializers.Serializer):
+    """Body of POST /api/admin/users/bulk/: an action plus either explicit ids or admin list filters."""
+    action = serializers.ChoiceField(choices=list(BULK_ACTIONS))
+    ids = serializers.ListField(child=serializers.IntegerField(min_value=1), required=False, allow_empty=False,
+                                max_length=settings.BULK_ACTION_MAX_USERS)
+    filter = serializers.DictField(required=False)  # same parameters as the list, e.g. {"status": "pending"}
+
+    def validate_filter(self, value):
+        # query-string values, as filter_users expects them
+        return {key: str(item).lower() if isinstance(item, bool) else str(item) for key, item in value.items()}
+
+    def validate(self, data):
+        if ("ids" in data) == ("filter" in data):
+            raise serializers.ValidationError("Send either ids or filter.")
+        return data
+
+class ShareLinkDailyViewsSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = ShareLinkDailyViews
+        fields = ["day", "views"]
+
+class ShareLinkHourlyViewsSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = ShareLinkHourlyViews
+        fields = ["hour", "views"]
+
+class ShareLinkStatsSerializer(serializers.ModelSerializer):
+    # total_views is annotated by the view; daily/hourly are prefetched windows
+    total_views = serializers.IntegerField(read_only=True)
+    is_valid = serializers.BooleanField(read_only=True)
+    daily = ShareLinkDailyViewsSerializer(source="daily_views", many=True, read_only=True)
+    hourly = ShareLinkHourlyViewsSerializer(source="hourly_views", many=True, read_only=True)
+
+    class Meta:
+        model = ProfileShareLink
+        fields = ["token", "created_at", "expiry_date", "is_valid", "total_views", "daily", "hourly"]
@@ -1,8 +1,179 @@
-from django.db.models.signals import post_save
+from django.db.models.signals import post_delete, post_init, post_save, pre_delete, pre_save
+from django.db.backends.signals import connection_created
 from django.dispatch import receiver
-from .models import CustomUser, UserProfile
+from .models import ChangeEvent, CustomUser, UserProfile, Education, WorkExperience, ProfileShareLink
+from . import authentication, blobs, changes, events, images, middleware, profile_cache, search, stats
+from django.db import transaction
+
+@receiver(connection_created)
+def install_query_recorder(sender, connection, **kwargs):
+    middleware.install_query_recorder(connection)
+
 
 @receiver(post_save, sender=CustomUser)
 def create_user_profile(sender, instance, created, **kwargs):
     if created:
         UserProfile.objects.create(user=instance)
+
+
+# --- shared profile cache invalidation ---
+@receiver([post_save, post_delete], sender=CustomUser)
+def invalidate_user_profile_cache(sender, instance, **kwargs):
+    update_fields = kwargs.get("update_fields")
+    if update_fields and set(update_fields) <= {"last_login"}:
+        return  # logins don't change what a shared profile shows
+    profile_cache.bump_profile_version(instance.pk)
+
+@receiver([post_save, post_delete], sender=UserProfile)
+def invalidate_profile_cache(sender, instance, **kwargs):
+    profile_cache.bump_profile_version(instance.user_id)
+
+@receiver([post_save, post_delete], sender=Education)
+@receiver([post_save, post_delete], sender=WorkExperience)
+def invalidate_profile_item_cache(sender, instance, **kwargs):
+    profile_cache.bump_profile_version(instance.user_profile.user_id)
+
+@receiver(post_delete, sender=ProfileShareLink)
+def forget_share_link(sender, instance, **kwargs):
+    profile_cache.forget_share_link(instance.token)
+
+
+# --- cached JWT users ---
+@receiver([post_save, post_delete], sender=CustomUser)
+def invalidate_cached_auth_user(sender, instance, **kwargs):
+    update_fields = kwargs.get("update_fields")
+    if update_fields and set(update_fields) <= {"last_login"}:
+        return
+    authentication.invalidate_user(instance.pk)
+
+
+# --- member search index ---
+@receiver(post_save, sender=CustomUser)
+def reindex_user(sender, instance, **kwargs):
+    update_fields = kwargs.get("update_fields")
+    if update_fields and not {"full_name", "email", "membership_id"} & set(update_fields):
+        return
+    search.schedule_reindex(instance.pk)
+
+@receiver(post_save, sender=UserProfile)
+def reindex_profile(sender, instance, **kwargs):
+    search.schedule_reindex(instance.user_id)
+
+@receiver([post_save, post_delete], sender=Education)
+@receiver([post_save, post_delete], sender=WorkExperience)
+def reindex_profile_item(sender, instance, **kwargs):
+    search.schedule_reindex(instance.user_profile.user_id)
+
+
+# --- change tracking (admin list delta sync) ---
+@receiver([post_save, post_delete], sender=UserProfile)
+def touch_user_of_profile(sender, instance, created=False, **kwargs):
+    if not created:  # a new profile comes with a new user (UserProfileSerializer.create touches its own)
+        changes.touch_users([instance.user_id])
+
+@receiver([post_save, post_delete], sender=Education)
+@receiver([post_save, post_delete], sender=WorkExperience)
+def touch_user_of_profile_item(sender, instance, **kwargs):
+    changes.touch_profile_user(instance.user_profile_id)
+
+@receiver(post_delete, sender=CustomUser)
+def record_deleted_user(sender, instance, **kwargs):
+    changes.record_deletion(instance.pk)
+
+
+# --- admin change stream (before the stats receivers replace the old bucket) ---
+@receiver(post_save, sender=CustomUser)
+def record_user_change(sender, instance, created, **kwargs):
+    update_fields = kwargs.get("update_fields")
+    if update_fields and set(update_fields) <= {"last_login"}:
+        return
+    if update_fields and not {"is_active", "is_blocked"} & set(update_fields):
+        kind = ChangeEvent.KIND_UPDATED
+    else:
+        new_bucket = stats.status_bucket(instance.is_active, instance.is_blocked)
+        kind = events.user_change_kind(instance._stats_bucket, new_bucket, created)
+    if kind:
+        events.record(kind, instance)
+
+@receiver(post_save, sender=UserProfile)
+def record_profile_change(sender, instance, created, **kwargs):
+    if not created:
+        events.record(ChangeEvent.KIND_PROFILE_UPDATED, instance.user)
+
+@receiver(post_delete, sender=CustomUser)
+def record_user_deletion(sender, instance, **kwargs):
+    events.record(ChangeEvent.KIND_DELETED, instance)
+
+
+# --- member stats counters ---
+# CustomUser.save()/delete() are atomic, so the row stays locked until the counters are updated
+@receiver(pre_save, sender=CustomUser)
+def lock_status_bucket(sender, instance, using, update_fields=None, **kwargs):
+    writes_status = not update_fields or {"is_active", "is_blocked"} & set(update_fields)
+    if instance._state.adding or not writes_status:
+        instance._stats_bucket = None
+    else:
+        instance._stats_bucket = stats.locked_bucket(instance, using)
+
+@receiver(pre_delete, sender=CustomUser)
+def lock_deleted_status_bucket(sender, instance, using, **kwargs):
+    instance._stats_bucket = stats.locked_bucket(instance, using)
+
+@receiver(post_save, sender=CustomUser)
+def count_status_change(sender, instance, created, **kwargs):
+    update_fields = kwargs.get("update_fields")
+    if update_fields and not {"is_active", "is_blocked"} & set(update_fields):
+        return
+    new_bucket = stats.status_bucket(instance.is_active, instance.is_blocked)
+    stats.move(instance._stats_bucket, new_bucket, created=created)
+    instance._stats_bucket = new_bucket
+
+@receiver(post_delete, sender=CustomUser)
+def count_deleted_user(sender, instance, **kwargs):
+    if instance._stats_bucket is not None:
+        stats.move(instance._stats_bucket, None, deleted=True)
+
+
+# --- profile photo processing ---
+@receiver(pre_save, sender=CustomUser)
+@receiver(pre_save, sender=UserProfile)
+def sanitize_profile_photo(sender, instance, **kwargs):
+    photo = instance.profile_photo
+    instance._new_profile_photo = bool(photo) and not photo._committed
+    if instance._new_profile_photo:
+        instance.profile_photo_derivatives = False  # until build_photo_derivatives has run for it
+        cleaned = images.sanitize_upload(photo.file)
+        if cleaned is not None:
+            instance.profile_photo = cleaned
+
+@receiver(post_save, sender=CustomUser)
+@receiver(post_save, sender=UserProfile)
+def build_photo_derivatives(sender, instance, **kwargs):
+    if getattr(instance, "_new_profile_photo", False):
+        instance._new_profile_photo = False
+        name = instance.profile_photo.name
+        transaction.on_commit(lambda: images.generate_derivatives(name))
+
+
+# --- media blob reference counts ---
+@receiver(post_init, sender=CustomUser)
+@receiver(post_init, sender=UserProfile)
+def remember_blob_names(sender, instance, **kwargs):
+    instance._blob_names = blobs.loaded_names(instance)
+
+@receiver(post_save, sender=CustomUser)
+@receiver(post_save, sender=UserProfile)
+def count_blob_references(sender, instance, **kwargs):
+    current = blobs.loaded_names(instance)
+    for field, name in current.items():
+        old = instance._blob_names.get(field, "")
+        if name != old:
+            blobs.retain(name)
+            blobs.release(old)
+    instance._blob_names = current
+
+@receiver(post_delete, sender=CustomUser)
+@receiver(post_delete, sender=UserProfile)
+def release_blob_references(sender, instance, **kwargs):
+    for name in blobs.loaded_names(instance).values():
+        blobs.release(name)
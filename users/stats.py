@@ -0,0 +1,120 @@
+"""
+Incrementally maintained member counters (MemberStats).
+
+Every user is in exactly one status bucket, using the same definitions the
+admin dashboard always used:
+
+* active  - is_active and not is_blocked
+* blocked - is_blocked
+* pending - not is_active and not is_blocked
+
+The signal handlers in users.signals move users between buckets as rows are
+created, saved and deleted, so the stats endpoint is a single-row read. The
+old bucket is read from the locked row inside the save's transaction (see
+``locked_bucket``), never from what the instance was loaded with.
+"""
+from asgiref.sync import sync_to_async
+from django.db import transaction
+from django.db.models import Count, F, Q, Value
+from django.db.models.functions import Greatest
+
+from .models import CustomUser, MemberStats
+
+BUCKET_FIELDS = {
+    "active": "active_users",
+    "blocked": "blocked_users",
+    "pending": "pending_users",
+}
+
+
+def status_bucket(is_active, is_blocked):
+    if is_blocked:
+        return "blocked"
+    return "active" if is_active else "pending"
+
+
+def locked_bucket(user, using=None):
+    """
+    Bucket of the row as committed, or None if it's gone.
+
+    Locks the row until the caller's transaction ends, so a concurrent save of
+    the same user waits and then sees this save's status: each transition is
+    counted once, whatever the instances in memory were loaded with.
+    """
+    row = (CustomUser.objects.using(using).select_for_update().filter(pk=user.pk)
+           .values_list("is_active", "is_blocked").first())
+    return status_bucket(*row) if row else None
+
+
+def apply_delta(deltas):
+    """
+    Add ``{"total_users": 1, "pending_users": -1, ...}`` to the counters.
+
+    Uses F() expressions so concurrent writers never lose updates; if the
+    row doesn't exist yet it is built from scratch instead. Counters stop at
+    zero rather than failing the save that drove them negative (they're
+    unsigned); that only happens if they had drifted already, which
+    ``reconcile()`` repairs.
+    """
+    deltas = {field: delta for field, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    updated = MemberStats.objects.filter(pk=MemberStats.SINGLETON_ID).update(
+        **{field: Greatest(F(field) + delta, Value(0)) for field, delta in deltas.items()}
+    )
+    if not updated:
+        reconcile()
+
+
+def move(old_bucket, new_bucket, created=False, deleted=False):
+    if old_bucket is None and not created:
+        return  # the row was already deleted by someone else, who counted it
+    deltas = {}
+    if created:
+        deltas["total_users"] = 1
+        deltas[BUCKET_FIELDS[new_bucket]] = 1
+    elif deleted:
+        deltas["total_users"] = -1
+        deltas[BUCKET_FIELDS[old_bucket]] = -1
+    elif old_bucket != new_bucket:
+        deltas[BUCKET_FIELDS[old_bucket]] = -1
+        deltas[BUCKET_FIELDS[new_bucket]] = 1
+    apply_delta(deltas)
+
+
+def compute():
+    return CustomUser.objects.aggregate(
+        total_users=Count("id"),
+        active_users=Count("id", filter=Q(is_active=True, is_blocked=False)),
+        blocked_users=Count("id", filter=Q(is_blocked=True)),
+        pending_users=Count("id", filter=Q(is_active=False, is_blocked=False)),
+    )
+
+
+def reconcile():
+    """Recount everything exactly and store it. Returns the new MemberStats."""
+    with transaction.atomic():
+        # lock the counters first: writers that race with the recount queue up
+        # behind us and apply their delta on top of the fresh numbers
+        stats, _ = MemberStats.objects.select_for_update().get_or_create(pk=MemberStats.SINGLETON_ID)
+        for field, value in compute().items():
+            setattr(stats, field, value)
+        stats.save()
+    return stats
+
+
+COUNTERS = ("total_users", "active_users", "blocked_users", "pending_users")
+
+
+def current():
+    stats = MemberStats.objects.filter(pk=MemberStats.SINGLETON_ID).first()
+    if stats is None:
+        stats = reconcile()
+    return {field: getattr(stats, field) for field in COUNTERS}
+
+
+async def acurrent():
+    stats = await MemberStats.objects.filter(pk=MemberStats.SINGLETON_ID).afirst()
+    if stats is None:
+        stats = await sync_to_async(reconcile)()
+    return {field: getattr(stats, field) for field in COUNTERS}
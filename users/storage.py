@@ -0,0 +1,75 @@
+import hashlib
+import os
+import tempfile
+
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    File system storage that keeps one copy of each distinct upload.
+
+    Files saved under one of ``hashed_prefixes`` are hashed (SHA-256) while
+    they are streamed to a temporary file in chunks, then moved to
+    ``<prefix><aa>/<digest><ext>``. If that blob already exists the temporary
+    copy is simply dropped, so uploading the same resume twice (or to both
+    the user and the profile) costs one hash pass and no extra disk. Other
+    paths (derivatives, anything outside the prefixes) behave exactly like
+    FileSystemStorage.
+
+    Blobs are shared, so deleting one is left to ``manage.py gc_media_blobs``,
+    which uses the reference counts kept in users.blobs.
+    """
+
+    INCOMING_DIR = ".incoming"
+
+    def __init__(self, *args, hashed_prefixes=("profiles/", "resumes/"), **kwargs):
+        super().__init__(*args, **kwargs)
+        self.hashed_prefixes = tuple(hashed_prefixes)
+
+    def is_hashed(self, name):
+        return name.replace("\\", "/").startswith(self.hashed_prefixes)
+
+    def blob_name(self, name, digest):
+        prefix = next(p for p in self.hashed_prefixes if name.replace("\\", "/").startswith(p))
+        extension = os.path.splitext(name)[1].lower()
+        return f"{prefix}{digest[:2]}/{digest}{extension}"
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not self.is_hashed(name):
+            return super().save(name, content, max_length=max_length)
+        if not hasattr(content, "chunks"):
+            content = File(content, name)
+
+        incoming = self.path(self.INCOMING_DIR)
+        os.makedirs(incoming, exist_ok=True)
+        digest = hashlib.sha256()
+        fd, temp_path = tempfile.mkstemp(dir=incoming)
+        try:
+            with os.fdopen(fd, "wb") as temp:
+                if hasattr(content, "seek"):
+                    content.seek(0)
+                for chunk in content.chunks():
+                    digest.update(chunk)
+                    temp.write(chunk)
+
+            final_name = self.blob_name(name, digest.hexdigest())
+            final_path = self.path(final_name)
+            if os.path.exists(final_path):
+                # already stored: keep the old copy and mark it as recently used
+                # so a concurrent garbage collection pass leaves it alone
+                os.utime(final_path)
+                os.remove(temp_path)
+            else:
+                os.makedirs(os.path.dirname(final_path), exist_ok=True)
+                if self.file_permissions_mode is not None:
+                    os.chmod(temp_path, self.file_permissions_mode)
+                os.replace(temp_path, final_path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+        return final_name
@@ -0,0 +1,94 @@
+"""
+Normalised skill / language tags parsed from the free-text profile fields.
+
+``UserProfile.skills`` and ``languages`` stay the source of truth (that's
+what the forms edit); ``sync_profile_tags`` re-derives the Skill/Language
+rows and through-table links from them, and the admin filters query the
+through tables instead of LIKE-scanning the text.
+"""
+import re
+
+from django.apps import apps
+from django.db.models import Count
+
+# profile text field -> (tag model, through model, through FK to the tag)
+TAG_FIELDS = {
+    "skills": ("Skill", "ProfileSkill", "skill"),
+    "languages": ("Language", "ProfileLanguage", "language"),
+}
+SEPARATORS = re.compile(r"[,;|/\n]+")
+MAX_TAG_LENGTH = 100
+
+
+def split_tags(text):
+    """``"Python, Django ; python"`` -> ``["python", "django"]``."""
+    seen = []
+    for part in SEPARATORS.split(text or ""):
+        name = " ".join(part.split()).lower()[:MAX_TAG_LENGTH]
+        if name and name not in seen:
+            seen.append(name)
+    return seen
+
+
+def tag_ids(Tag, names):
+    """Ids of the named tags, creating the missing ones."""
+    if not names:
+        return {}
+    Tag.objects.bulk_create([Tag(name=name) for name in names], ignore_conflicts=True)
+    return dict(Tag.objects.filter(name__in=names).values_list("name", "id"))
+
+
+def sync_profile_tags(profiles, fields=tuple(TAG_FIELDS)):
+    """Make the tag links of ``profiles`` match their text fields: one diff per field, not per profile."""
+    profiles = [profile for profile in profiles if profile.pk]
+    for field in fields:
+        tag_model, through_model, fk = TAG_FIELDS[field]
+        Tag = apps.get_model("users", tag_model)
+        Through = apps.get_model("users", through_model)
+
+        wanted = {profile.pk: split_tags(getattr(profile, field)) for profile in profiles}
+        ids = tag_ids(Tag, sorted({name for names in wanted.values() for name in names}))
+        wanted = {pk: {ids[name] for name in names} for pk, names in wanted.items()}
+
+        current = {}
+        for link_id, profile_id, tag_id in Through.objects.filter(profile_id__in=wanted).values_list(
+                "id", "profile_id", f"{fk}_id"):
+            current[(profile_id, tag_id)] = link_id
+
+        stale = [link_id for (profile_id, tag_id), link_id in current.items() if tag_id not in wanted[profile_id]]
+        if stale:
+            Through.objects.filter(id__in=stale).delete()
+        Through.objects.bulk_create([
+            Through(profile_id=profile_id, **{f"{fk}_id": tag_id})
+            for profile_id, tag_ids_ in wanted.items() for tag_id in tag_ids_
+            if (profile_id, tag_id) not in current
+        ])
+
+
+def rebuild(batch_size=500):
+    """Re-derive the tags of every profile; returns the number of profiles processed."""
+    UserProfile = apps.get_model("users", "UserProfile")
+    done, last_id = 0, 0
+    while True:
+        batch = list(UserProfile.objects.filter(pk__gt=last_id).order_by("pk")
+                     .only("pk", *TAG_FIELDS)[:batch_size])
+        if not batch:
+            return done
+        sync_profile_tags(batch)
+        done += len(batch)
+        last_id = batch[-1].pk
+
+
+def filter_by_tags(queryset, field, names, match="all"):
+    """
+    Restrict a CustomUser queryset to members tagged with ``names`` (already split).
+
+    The through table is looked up by its (tag, profile) unique index and
+    only profile ids come back, so there's no join fan-out to DISTINCT away.
+    """
+    tag_model, through_model, fk = TAG_FIELDS[field]
+    Through = apps.get_model("users", through_model)
+    links = Through.objects.filter(**{f"{fk}__name__in": names})
+    if match == "all":
+        links = links.values("profile_id").annotate(matched=Count("id")).filter(matched=len(names))
+    return queryset.filter(profile__in=links.values("profile_id"))
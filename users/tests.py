@@ -1,3 +1,1104 @@
-from django.test import TestCase
+import asyncio
+import io
+import json
+import os
+import statistics
+import tempfile
+import threading
+import time
+from datetime import timedelta
+from pathlib import Path
+from unittest import mock, skipUnless
+
+from asgiref.sync import async_to_sync, sync_to_async
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import DatabaseError, connection, connections, transaction
+from django.db.models.signals import post_save
+from django.http import Http404, HttpResponse
+from django.test import RequestFactory, TestCase, TransactionTestCase, override_settings, skipUnlessDBFeature
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from PIL import Image
+from rest_framework.exceptions import ValidationError
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from . import async_views, authentication, events, images, membership, rollups, routers, search, stats, viewlog
+from .models import (
+    ChangeEvent, CustomUser, Education, LoadedSpoolSegment, MembershipSequence, MemberStats, ProfileShareLink, ProfileViewLog,
+    RollupWatermark, ShareLinkDailyViews, UserProfile, UserTombstone,
+)
+from .media import IMMUTABLE_CACHE_CONTROL, serve_media
+from .metrics import registry
+from .middleware import RequestMetricsMiddleware
+from .seeding import SEED_DOMAIN, seed_members
+from .serializers import UserProfileSerializer
+from .storage import ContentAddressedStorage
+from .tags import split_tags, sync_profile_tags
 
 # Create your tests here.
+
+
+class ConcurrencyTestCase(TransactionTestCase):
+    def setUp(self):
+        if connection.vendor == "sqlite" and connection.is_in_memory_db():
+            # threads can't share an in-memory SQLite database without "table is locked" errors
+            self.skipTest("needs PostgreSQL or a file-backed test database")
+
+    def run_threads(self, target, threads=8):
+        errors = []
+
+        def worker(index):
+            try:
+                target(index)
+            except Exception as exc:  # surfaced in the main thread below
+                errors.append(exc)
+            finally:
+                connection.close()
+
+        pool = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+        for thread in pool:
+            thread.start()
+        for thread in pool:
+            thread.join()
+        self.assertEqual(errors, [])
+
+
+@override_settings(
+    MEMBERSHIP_ID_BLOCK_SIZE=5,
+    PASSWORD_HASHERS=["django.contrib.auth.hashers.MD5PasswordHasher"],
+)
+class MembershipIdConcurrencyTests(ConcurrencyTestCase):
+    def setUp(self):
+        super().setUp()
+        membership._blocks.clear()
+
+    def test_concurrent_allocation_never_collides(self):
+        issued = []
+        lock = threading.Lock()
+
+        def allocate(index):
+            ids = [membership.next_membership_id(2030) for _ in range(25)]
+            ids += membership.allocate_membership_ids(10, year=2030)
+            with lock:
+                issued.extend(ids)
+
+        self.run_threads(allocate)
+        self.assertEqual(len(issued), 8 * 35)
+        self.assertEqual(len(set(issued)), len(issued))
+        # every number came out of the sequence, none was handed out twice
+        self.assertLessEqual(len(issued), MembershipSequence.objects.get(year=2030).next_value - 1)
+
+    def test_concurrent_registrations_get_unique_ids(self):
+        def register(index):
+            for n in range(5):
+                CustomUser.objects.create_user(f"member{index}-{n}@example.com", "Member", "pw")
+
+        self.run_threads(register)
+        ids = list(CustomUser.objects.values_list("membership_id", flat=True))
+        self.assertEqual(len(ids), 40)
+        self.assertEqual(len(set(ids)), 40)
+
+    @skipUnlessDBFeature("has_select_for_update_nowait")  # SQLite locks the whole database anyway
+    def test_registration_does_not_hold_the_sequence_lock(self):
+        year = timezone.now().year
+        MembershipSequence.objects.create(year=year)
+        lock_free = []
+
+        def try_lock(sender, instance, created, **kwargs):
+            # runs inside the registration transaction; probe the row from another connection
+            def probe(index):
+                with transaction.atomic():
+                    try:
+                        list(MembershipSequence.objects.select_for_update(nowait=True).filter(year=year))
+                        lock_free.append(True)
+                    except DatabaseError:
+                        lock_free.append(False)
+            self.run_threads(probe, threads=1)
+
+        post_save.connect(try_lock, sender=CustomUser, dispatch_uid="probe-sequence-lock")
+        try:
+            response = APIClient().post("/api/register/", {
+                "full_name": "New Member", "email": "new@example.com", "password": "pw", "confirm_password": "pw",
+            })
+        finally:
+            post_save.disconnect(dispatch_uid="probe-sequence-lock", sender=CustomUser)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(lock_free, [True])
+
+
+class MembershipIdFormatTests(TestCase):
+    def test_rolled_back_reservation_is_not_reused(self):
+        membership._blocks.clear()
+        first = membership.next_membership_id(2031)
+        # inside the test transaction the rest of the block is never cached,
+        # so the next call reserves again instead of reusing an uncommitted block
+        second = membership.next_membership_id(2031)
+        self.assertEqual(first, "SOCRP-2031-000001")
+        self.assertNotEqual(first, second)
+        self.assertEqual(membership._blocks[2031], type(membership._blocks[2031])())
+
+
+BUDGETS_FILE = Path(__file__).with_name("benchmark_budgets.json")
+
+
+@override_settings(
+    PASSWORD_HASHERS=["django.contrib.auth.hashers.MD5PasswordHasher"],
+    LOGIN_THROTTLE_ENABLED=False,
+    PROFILE_VIEW_LOG_MODE="sync",
+    METRICS_SAMPLE_RATE=0,
+    CACHE_SHARED=True,  # the test run is a single process, so LocMemCache is shared
+)
+class EndpointBudgetTests(TestCase):
+    """
+    Query-count and latency budgets for the hot endpoints, on a seeded dataset.
+
+    Each scenario runs once to warm caches, then ``repeat`` more times; the
+    highest query count and the median latency are checked against
+    ``benchmark_budgets.json``. Run with BENCHMARK_REPORT=1 to print the
+    measurements (e.g. before tightening a budget). A change that raises a
+    budget says in its commit message which queries it adds and why they
+    can't be avoided.
+    """
+    members = 40
+    repeat = 5
+
+    @classmethod
+    def setUpTestData(cls):
+        seed_members(cls.members, seed=7, batch_size=20)
+        cls.budgets = json.loads(BUDGETS_FILE.read_text())
+        cls.admin = CustomUser.objects.create_superuser("bench-admin@example.com", "Bench Admin", "pw")
+        cls.member = CustomUser.objects.filter(
+            email__endswith=SEED_DOMAIN, is_active=True, is_blocked=False).order_by("pk").first()
+        cls.link = ProfileShareLink.objects.create(user=cls.member, expiry_date=timezone.now() + timedelta(days=7))
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+
+    def as_user(self, user):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f"Bearer {RefreshToken.for_user(user).access_token}")
+        return client
+
+    def check_budget(self, scenario, call, expected_status=200, before_each=None):
+        call(-1)  # warm-up: caches, lazy imports
+        queries, timings = [], []
+        for i in range(self.repeat):
+            if before_each:
+                before_each()
+            # on-commit work (search index, cache bumps) counts too: it runs after every real request
+            with CaptureQueriesContext(connection) as captured, self.captureOnCommitCallbacks(execute=True):
+                start = time.perf_counter()
+                response = call(i)
+            timings.append((time.perf_counter() - start) * 1000)
+            self.assertEqual(response.status_code, expected_status, getattr(response, "data", response))
+            queries.append(len(captured))
+
+        budget = self.budgets[scenario]
+        worst, median = max(queries), statistics.median(timings)
+        if os.environ.get("BENCHMARK_REPORT"):
+            print(f"\n{scenario:24} {worst:4d} queries (budget {budget['queries']})"
+                  f" {median:8.1f} ms (budget {budget['latency_ms']})")
+        self.assertLessEqual(worst, budget["queries"], f"{scenario}: {worst} queries, budget {budget['queries']}")
+        self.assertLessEqual(median, budget["latency_ms"],
+                             f"{scenario}: median {median:.1f} ms, budget {budget['latency_ms']} ms")
+
+    def test_registration(self):
+        self.check_budget("registration", lambda i: self.client.post("/api/register/", {
+            "full_name": "New Member", "email": f"new{i + 1}@example.com", "phone": "9000000000",
+            "password": "pw", "confirm_password": "pw",
+        }), expected_status=201)
+
+    def test_token(self):
+        self.check_budget("token", lambda i: self.client.post(
+            "/api/token/", {"email": self.member.email, "password": "password123"}))
+
+    def test_profile_me(self):
+        client = self.as_user(self.member)
+        self.check_budget("profile_me", lambda i: client.get("/api1/profile/me/"))
+
+    def test_shared_profile(self):
+        self.check_budget("shared_profile", lambda i: self.client.get(f"/api/profile/share/{self.link.token}/"),
+                          before_each=cache.clear)
+
+    def test_shared_profile_cached(self):
+        self.check_budget("shared_profile_cached",
+                          lambda i: self.client.get(f"/api/profile/share/{self.link.token}/"))
+
+    def test_admin_list(self):
+        client = self.as_user(self.admin)
+        self.check_budget("admin_list", lambda i: client.get("/api/admin/users/", {"status": "active"}))
+
+    def test_admin_detail(self):
+        client = self.as_user(self.admin)
+        self.check_budget("admin_detail", lambda i: client.get(f"/api/admin/users/{self.member.pk}/"))
+
+    def test_admin_stats(self):
+        client = self.as_user(self.admin)
+        self.check_budget("admin_stats", lambda i: client.get("/api/admin/stats/"))
+
+    def test_admin_nested_update(self):
+        client = self.as_user(self.admin)
+        profile = self.member.profile
+        educations = [{"id": e.pk, "degree": e.degree, "university": e.university,
+                       "year_of_completion": e.year_of_completion, "marks_cgpa": e.marks_cgpa}
+                      for e in profile.educations.all()]
+
+        def update(i):
+            educations[0]["marks_cgpa"] = f"{8 + i % 2}.0"
+            return client.patch(f"/api/admin/users/{self.member.pk}/", {
+                "full_name": f"Updated {i}",
+                "profile": {"skills": "Python, SQL", "educations": educations + [{
+                    "degree": f"Cert {i}", "university": "Online", "year_of_completion": 2024, "marks_cgpa": "A"}]},
+            }, format="json")
+
+        self.check_budget("admin_nested_update", update)
+
+
+class ViewLogTests(TestCase):
+    def setUp(self):
+        spool = tempfile.TemporaryDirectory()
+        self.addCleanup(spool.cleanup)
+        self.enterContext(override_settings(PROFILE_VIEW_LOG_SPOOL_DIR=spool.name))
+        user = CustomUser.objects.create_user("owner@example.com", "Owner", "pw")
+        self.link = ProfileShareLink.objects.create(user=user, expiry_date=timezone.now() + timedelta(days=1))
+
+    def event(self, link_id=None, age=0):
+        event = viewlog._event(link_id or self.link.pk, "10.0.0.1", "test")
+        event["viewed_at"] -= timedelta(seconds=age)
+        return event
+
+    def spool_segment(self, events, minutes_ago=5):
+        segment = int(time.time()) // viewlog.SEGMENT_SECONDS - minutes_ago
+        path = viewlog.spool_dir() / f"views-{segment}-1.ndjson"
+        path.write_text("".join(json.dumps(dict(e, viewed_at=e["viewed_at"].isoformat())) + "\n" for e in events))
+        return path
+
+    @override_settings(PROFILE_VIEW_LOG_BATCH_SIZE=1)
+    def test_full_buffer_is_written_by_the_flusher_not_the_request(self):
+        buffer = viewlog.ViewLogBuffer()
+        buffer.flusher = threading.Thread()  # stand-in, so no real flusher starts
+        with CaptureQueriesContext(connection) as captured:
+            buffer.add(self.event())
+        self.assertEqual(len(captured), 0)
+        self.assertTrue(buffer.wake.is_set())
+        self.assertEqual(buffer.flush(), 1)
+        self.assertEqual(ProfileViewLog.objects.count(), 1)
+
+    def test_spool_segment_is_loaded_once(self):
+        path = self.spool_segment([self.event(), self.event()])
+        self.assertEqual(viewlog.ingest_spool(), (1, 2))
+        self.assertFalse(path.exists())
+        self.assertFalse(LoadedSpoolSegment.objects.exists())
+
+        # a run that committed but died before deleting the file
+        path = self.spool_segment([self.event()], minutes_ago=4)
+        LoadedSpoolSegment.objects.create(name=path.name)
+        self.assertEqual(viewlog.ingest_spool(), (1, 0))
+        self.assertFalse(path.exists())
+        self.assertEqual(ProfileViewLog.objects.count(), 2)
+
+    @override_settings(PROFILE_VIEW_LOG_RETRY_SECONDS=600)
+    def test_views_of_unknown_links_are_retried_then_dropped(self):
+        missing = self.link.pk + 1000
+        self.spool_segment([self.event(), self.event(missing), self.event(missing, age=3600)])
+        self.assertEqual(viewlog.ingest_spool(), (1, 1))
+        retried = [event for path in viewlog.spool_dir().glob("views-*.ndjson") for event in viewlog._read_segment(path)]
+        self.assertEqual([event["share_link_id"] for event in retried], [missing])
+
+        ProfileShareLink.objects.create(pk=missing, user=self.link.user, expiry_date=self.link.expiry_date)  # shows up
+        self.assertEqual(viewlog.ingest_spool(include_current=True), (1, 1))
+        self.assertEqual(ProfileViewLog.objects.filter(share_link_id=missing).count(), 1)
+
+
+@override_settings(PASSWORD_HASHERS=["django.contrib.auth.hashers.MD5PasswordHasher"])
+class SharedProfileCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = CustomUser.objects.create_user("shared@example.com", "Shared Member", "pw", is_active=True)
+        self.link = ProfileShareLink.objects.create(user=self.user, expiry_date=timezone.now() + timedelta(days=1))
+        self.url = f"/api/profile/share/{self.link.token}/"
+
+    def get(self):
+        with CaptureQueriesContext(connection) as captured:
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        return response, len(captured)
+
+    @override_settings(CACHE_SHARED=True)
+    def test_page_is_cached_until_the_profile_changes(self):
+        _, first = self.get()
+        _, cached = self.get()
+        self.assertLess(cached, first)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            profile = UserProfile.objects.get(user=self.user)
+            profile.skills = "Rust"
+            profile.save()
+        response, _ = self.get()
+        self.assertEqual(response.data["skills"], "Rust")
+
+    @override_settings(CACHE_SHARED=False)
+    def test_nothing_is_cached_in_a_per_process_cache(self):
+        _, first = self.get()
+        response, second = self.get()
+        self.assertEqual(second, first)
+        self.assertIn("ETag", response)
+        self.assertFalse([key for key in cache._cache if "shared-profile" in key or "share-link" in key])
+
+
+@override_settings(PASSWORD_HASHERS=["django.contrib.auth.hashers.MD5PasswordHasher"])
+class MemberStatsConcurrencyTests(ConcurrencyTestCase):
+    def test_concurrent_saves_count_a_transition_once(self):
+        user = CustomUser.objects.create_user("racer@example.com", "Racer", "pw", is_active=False)
+        # every thread saves its own copy, loaded while the user was still pending
+        copies = [CustomUser.objects.get(pk=user.pk) for _ in range(6)]
+        barrier = threading.Barrier(len(copies))
+
+        def verify(index):
+            copy = copies[index]
+            copy.is_active = True
+            barrier.wait()
+            copy.save()
+
+        self.run_threads(verify, threads=len(copies))
+        self.assertEqual(stats.current(), stats.compute())
+
+    def test_concurrent_deletes_count_once(self):
+        user = CustomUser.objects.create_user("gone@example.com", "Gone", "pw")
+        copies = [CustomUser.objects.get(pk=user.pk) for _ in range(4)]
+        barrier = threading.Barrier(len(copies))
+
+        def delete(index):
+            barrier.wait()
+            copies[index].delete()
+
+        self.run_threads(delete, threads=len(copies))
+        self.assertEqual(stats.current(), stats.compute())
+
+
+@override_settings(PASSWORD_HASHERS=["django.contrib.auth.hashers.MD5PasswordHasher"])
+class MemberStatsTests(TestCase):
+    def test_counters_follow_status_changes(self):
+        user = CustomUser.objects.create_user("member@example.com", "Member", "pw", is_active=False)
+        stale = CustomUser.objects.get(pk=user.pk)
+        user.is_active = True
+        user.save()
+        stale.is_blocked = True  # loaded as pending, but the row is active by now
+        stale.save()
+        self.assertEqual(stats.current(), stats.compute())
+        user.delete()
+        self.assertEqual(stats.current(), stats.compute())
+
+    def test_drifted_counters_stop_at_zero_and_reconcile(self):
+        CustomUser.objects.create_user("member@example.com", "Member", "pw", is_active=False)
+        MemberStats.objects.filter(pk=MemberStats.SINGLETON_ID).update(pending_users=0, total_users=0)
+        stats.apply_delta({"pending_users": -1, "active_users": 1})
+        self.assertEqual(stats.current()["pending_users"], 0)
+        stats.reconcile()
+        self.assertEqual(stats.current(), stats.compute())
+
+
+@override_settings(PASSWORD_HASHERS=["django.contrib.auth.hashers.MD5PasswordHasher"])
+class ViewRollupTests(TestCase):
+    def setUp(self):
+        user = CustomUser.objects.create_user("viewed@example.com", "Viewed", "pw")
+        self.link = ProfileShareLink.objects.create(user=user, expiry_date=timezone.now() + timedelta(days=1))
+        self.first = self.log()
+        RollupWatermark.objects.create(name=rollups.WATERMARK_NAME, last_id=self.first.pk - 1)
+
+    def log(self, pk=None):
+        return ProfileViewLog.objects.create(pk=pk, share_link=self.link)
+
+    def counted(self):
+        return sum(ShareLinkDailyViews.objects.values_list("views", flat=True))
+
+    def test_id_committed_after_a_higher_one_is_still_counted(self):
+        self.log(pk=self.first.pk + 2)
+        rollups.aggregate_views()
+        self.assertEqual(self.counted(), 1)
+        self.assertEqual(rollups.watermark().last_id, self.first.pk)  # held back at the gap
+
+        self.log(pk=self.first.pk + 1)  # the slow transaction commits
+        rollups.aggregate_views()
+        self.assertEqual(self.counted(), 3)
+        self.assertEqual(rollups.watermark().last_id, self.first.pk + 2)
+
+    @override_settings(VIEW_ROLLUP_GAP_SECONDS=0)
+    def test_gap_that_never_fills_is_skipped(self):
+        self.log(pk=self.first.pk + 2)
+        rollups.aggregate_views()  # starts the gap's clock
+        rollups.aggregate_views()
+        self.assertEqual(self.counted(), 2)
+        self.assertEqual(rollups.watermark().last_id, self.first.pk + 2)
+        self.assertIsNone(rollups.watermark().gap_seen_at)
+
+    def test_all_gaps_seen_together_settle_together(self):
+        for step in (2, 4, 6):
+            self.log(pk=self.first.pk + step)
+        rollups.aggregate_views()  # stops at first + 1 and starts the clock
+        self.log(pk=self.first.pk + 8)  # only committed after that
+        self.assertEqual(rollups.watermark().gap_horizon_id, self.first.pk + 6)
+
+        RollupWatermark.objects.update(gap_seen_at=timezone.now() - timedelta(seconds=601))
+        rollups.aggregate_views()
+        self.assertEqual(self.counted(), 4)
+        mark = rollups.watermark()
+        self.assertEqual(mark.last_id, self.first.pk + 6)
+        # the newer gap gets its own clock, already covering first + 8
+        self.assertEqual(mark.gap_horizon_id, self.first.pk + 8)
+        self.assertGreater(mark.gap_seen_at, timezone.now() - timedelta(seconds=5))
+
+
+@override_settings(PASSWORD_HASHERS=["django.contrib.auth.hashers.MD5PasswordHasher"])
+class RetentionTests(TestCase):
+    def purge(self, *args):
+        out = io.StringIO()
+        call_command("purge_stale_data", "--pause", "0", *args, stdout=out)
+        return out.getvalue()
+
+    def test_view_logs_are_only_purged_once_counted(self):
+        user = CustomUser.objects.create_user("viewed@example.com", "Viewed", "pw")
+        link = ProfileShareLink.objects.create(user=user, expiry_date=timezone.now() + timedelta(days=1))
+        old = timezone.now() - timedelta(days=400)
+        counted = ProfileViewLog.objects.create(share_link=link, viewed_at=old)
+        pending = ProfileViewLog.objects.create(share_link=link, viewed_at=old)
+        RollupWatermark.objects.create(name=rollups.WATERMARK_NAME, last_id=counted.pk)
+
+        self.purge("--only", "view_logs", "--view-log-days", "180")
+        self.assertEqual(list(ProfileViewLog.objects.values_list("pk", flat=True)), [pending.pk])
+
+    def test_expired_links_wait_for_their_views_to_be_counted(self):
+        user = CustomUser.objects.create_user("viewed@example.com", "Viewed", "pw")
+        link = ProfileShareLink.objects.create(user=user, expiry_date=timezone.now() - timedelta(days=60))
+        log = ProfileViewLog.objects.create(share_link=link)
+        mark = RollupWatermark.objects.create(name=rollups.WATERMARK_NAME, last_id=log.pk - 1)
+
+        self.purge("--only", "expired_link_logs", "--only", "expired_share_links", "--share-link-days", "30")
+        self.assertTrue(ProfileViewLog.objects.filter(pk=log.pk).exists())
+        self.assertTrue(ProfileShareLink.objects.filter(pk=link.pk).exists())
+
+        RollupWatermark.objects.filter(pk=mark.pk).update(last_id=log.pk)
+        self.purge("--only", "expired_link_logs", "--only", "expired_share_links", "--share-link-days", "30")
+        self.assertFalse(ProfileShareLink.objects.filter(pk=link.pk).exists())
+
+    def test_old_unverified_accounts_are_purged_in_batches(self):
+        joined = timezone.now() - timedelta(days=60)
+        for n in range(5):
+            CustomUser.objects.create_user(f"stale{n}@example.com", "Stale", "pw", is_active=False, date_joined=joined)
+        CustomUser.objects.create_user("staff@example.com", "Staff", "pw", is_active=False, is_staff=True,
+                                       date_joined=joined)
+        CustomUser.objects.create_user("recent@example.com", "Recent", "pw", is_active=False)
+
+        self.assertIn("5 row(s)", self.purge("--only", "unverified_users", "--dry-run"))
+        self.assertEqual(CustomUser.objects.count(), 7)
+
+        output = self.purge("--only", "unverified_users", "--batch-size", "2")
+        self.assertIn("3 batch(es)", output)
+        self.assertEqual(set(CustomUser.objects.values_list("email", flat=True)),
+                         {"staff@example.com", "recent@example.com"})
+        self.assertEqual(stats.current(), stats.compute())  # deletes go through the signals
+
+    def test_zero_days_disables_a_policy(self):
+        self.assertIn("change_events: disabled", self.purge("--only", "change_events", "--change-event-days", "0"))
+
+
+@override_settings(PASSWORD_HASHERS=["django.contrib.auth.hashers.MD5PasswordHasher"])
+class AdminUserUpdateTests(TestCase):
+    def setUp(self):
+        admin = CustomUser.objects.create_superuser("admin@example.com", "Admin", "pw")
+        self.client.force_login(admin)
+        self.user = CustomUser.objects.create_user("member@example.com", "Member", "pw")
+
+    def test_nested_update_creates_a_missing_profile(self):
+        UserProfile.objects.filter(user=self.user).delete()
+        response = self.client.patch(f"/api/admin/users/{self.user.pk}/", {"profile": {
+            "skills": "Python, SQL",
+            "educations": [{"degree": "BSc", "university": "State", "year_of_completion": 2020, "marks_cgpa": "8.1"}],
+        }}, content_type="application/json")
+
+        self.assertEqual(response.status_code, 200, response.content)
+        profile = UserProfile.objects.get(user=self.user)
+        self.assertEqual(list(profile.educations.values_list("degree", flat=True)), ["BSc"])
+        self.assertEqual(sorted(profile.skill_tags.values_list("name", flat=True)), ["python", "sql"])
+
+
+@override_settings(PASSWORD_HASHERS=["django.contrib.auth.hashers.MD5PasswordHasher"])
+class ProfilePhotoTests(TestCase):
+    def png(self, size=(30, 30), name="photo.png"):
+        buffer = io.BytesIO()
+        Image.new("RGB", size, "red").save(buffer, "PNG")
+        return SimpleUploadedFile(name, buffer.getvalue(), content_type="image/png")
+
+    @override_settings(PROFILE_PHOTO_MAX_PIXELS=100)
+    def test_oversized_photo_is_rejected_at_registration(self):
+        response = self.client.post("/api/register/", {
+            "full_name": "Big Photo", "email": "big@example.com", "password": "pw", "confirm_password": "pw",
+            "profile_photo": self.png(),
+        })
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("profile_photo", response.json())
+        self.assertFalse(CustomUser.objects.filter(email="big@example.com").exists())
+
+    def test_decompression_bomb_is_a_validation_error(self):
+        with mock.patch.object(Image, "MAX_IMAGE_PIXELS", 100), self.assertRaises(ValidationError):
+            images.sanitize_upload(self.png())
+
+    def test_built_derivatives_are_flagged_on_every_row_holding_the_photo(self):
+        self.enterContext(override_settings(MEDIA_ROOT=self.enterContext(tempfile.TemporaryDirectory())))
+        profiles = []
+        for name in ("ana", "ben"):  # the same picture twice: one stored blob, built once
+            profile = CustomUser.objects.create_user(f"{name}@example.com", name, "pw").profile
+            with self.captureOnCommitCallbacks(execute=True):
+                profile.profile_photo = self.png()
+                profile.save()
+            profile.refresh_from_db()
+            profiles.append(profile)
+        self.assertEqual(profiles[0].profile_photo.name, profiles[1].profile_photo.name)
+
+        with mock.patch.object(ContentAddressedStorage, "exists", side_effect=AssertionError("derivative_urls asked the storage")):
+            for profile in profiles:
+                self.assertTrue(profile.profile_photo_derivatives)
+                variants = UserProfileSerializer(profile).data["profile_photo_variants"]
+                self.assertEqual(set(variants), set(images.DERIVATIVES))
+
+
+@override_settings(PASSWORD_HASHERS=["django.contrib.auth.hashers.MD5PasswordHasher"])
+class ProfileTagTests(TestCase):
+    def setUp(self):
+        admin = CustomUser.objects.create_superuser("admin@example.com", "Admin", "pw")
+        self.client.force_login(admin)
+        self.members = {}
+        for name, skills in [("ana", "Python, Django"), ("ben", "python ; Go"), ("cy", "Rust")]:
+            user = CustomUser.objects.create_user(f"{name}@example.com", name, "pw")
+            profile = user.profile
+            profile.skills = skills
+            profile.save()
+            sync_profile_tags([profile])
+            self.members[name] = user
+
+    def listed(self, **params):
+        response = self.client.get("/api/admin/users/", params)
+        self.assertEqual(response.status_code, 200, response.content)
+        return sorted(row["full_name"] for row in response.json()["results"])
+
+    def test_split_tags_normalises_and_dedupes(self):
+        self.assertEqual(split_tags(" Python,  django ; PYTHON|Machine   Learning\n"),
+                         ["python", "django", "machine learning"])
+
+    def test_filter_matches_all_or_any(self):
+        self.assertEqual(self.listed(skills="python"), ["ana", "ben"])
+        self.assertEqual(self.listed(skills="Python, Django"), ["ana"])
+        self.assertEqual(self.listed(skills="django,go", skills_match="any"), ["ana", "ben"])
+
+    def test_edit_replaces_stale_tags(self):
+        profile = self.members["cy"].profile
+        profile.skills = "Go"
+        profile.save()
+        sync_profile_tags([profile])
+        self.assertEqual(list(profile.skill_tags.values_list("name", flat=True)), ["go"])
+        self.assertEqual(self.listed(skills="rust"), [])
+
+    def test_export_command_takes_the_same_filters(self):
+        out = io.StringIO()
+        call_command("export_members", "--format", "ndjson", "--skills", "django,go", "--skills-match", "any",
+                     stdout=out)
+        exported = sorted(json.loads(line)["full_name"] for line in out.getvalue().splitlines())
+        self.assertEqual(exported, ["ana", "ben"])
+
+    def test_unknown_match_is_a_400(self):
+        response = self.client.get("/api/admin/users/", {"skills": "go", "skills_match": "some"})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("skills_match", response.json())
+
+
+@override_settings(PASSWORD_HASHERS=["django.contrib.auth.hashers.MD5PasswordHasher"])
+class MediaServingTests(TestCase):
+    def setUp(self):
+        root = self.enterContext(tempfile.TemporaryDirectory())
+        self.enterContext(override_settings(MEDIA_ROOT=root, MEDIA_ACCEL=""))
+        self.storage = ContentAddressedStorage(location=root)
+        self.name = self.storage.save("resumes/cv.pdf", ContentFile(b"0123456789", name="cv.pdf"))
+        self.owner = CustomUser.objects.create_user("owner@example.com", "Owner", "pw", is_active=True)
+        UserProfile.objects.filter(user=self.owner).update(resume=self.name)
+        self.factory = RequestFactory()
+
+    def get(self, path=None, user=None, data=None, **headers):
+        request = self.factory.get("/", data, headers=headers)
+        request.user = user or AnonymousUser()
+        return serve_media(request, path or self.name)
+
+    def test_identical_uploads_share_one_blob(self):
+        again = self.storage.save("resumes/copy.pdf", ContentFile(b"0123456789", name="copy.pdf"))
+        self.assertEqual(again, self.name)
+        response = self.get(user=self.owner)
+        self.assertEqual(b"".join(response.streaming_content), b"0123456789")
+        self.assertEqual(response["Cache-Control"], "private, max-age=31536000, immutable")
+
+    def test_photos_are_public_and_immutable(self):
+        photo = self.storage.save("profiles/me.png", ContentFile(b"png", name="me.png"))
+        self.assertEqual(self.get(photo)["Cache-Control"], IMMUTABLE_CACHE_CONTROL)
+
+    def test_resume_needs_the_owner_staff_or_a_share_link(self):
+        with self.assertRaises(Http404):
+            self.get()
+        with self.assertRaises(Http404):
+            self.get(user=CustomUser.objects.create_user("other@example.com", "Other", "pw", is_active=True))
+        staff = CustomUser.objects.create_superuser("admin@example.com", "Admin", "pw")
+        self.assertEqual(self.get(user=staff).status_code, 200)
+        self.assertEqual(self.get(data={"token": str(RefreshToken.for_user(self.owner).access_token)}).status_code, 200)
+
+        link = ProfileShareLink.objects.create(user=self.owner, expiry_date=timezone.now() + timedelta(days=1))
+        self.assertEqual(self.get(data={"share": str(link.token)}).status_code, 200)
+        with self.assertRaises(Http404):
+            self.get(data={"share": "not-a-token"})
+        ProfileShareLink.objects.filter(pk=link.pk).update(expiry_date=timezone.now() - timedelta(days=1))
+        cache.clear()
+        with self.assertRaises(Http404):
+            self.get(data={"share": str(link.token)})
+
+    def test_shared_page_links_the_resume_with_its_token(self):
+        link = ProfileShareLink.objects.create(user=self.owner, expiry_date=timezone.now() + timedelta(days=1))
+        response = self.client.get(f"/api/profile/share/{link.token}/")
+        self.assertTrue(response.data["resume"].endswith(f"{self.name}?share={link.token}"), response.data["resume"])
+
+    def test_revalidation_gets_a_304(self):
+        etag = self.get(user=self.owner)["ETag"]
+        self.assertEqual(self.get(user=self.owner, **{"If-None-Match": etag}).status_code, 304)
+        self.assertEqual(self.get(user=self.owner, **{"If-None-Match": '"other"'}).status_code, 200)
+
+    def test_ranges(self):
+        response = self.get(user=self.owner, Range="bytes=2-5")
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response["Content-Range"], "bytes 2-5/10")
+        self.assertEqual(b"".join(response.streaming_content), b"2345")
+
+        self.assertEqual(b"".join(self.get(user=self.owner, Range="bytes=-3").streaming_content), b"789")
+        self.assertEqual(self.get(user=self.owner, Range="bytes=20-").status_code, 416)
+        # a stale If-Range gets the whole (changed) file instead of a piece of it
+        self.assertEqual(self.get(user=self.owner, Range="bytes=2-5", **{"If-Range": '"stale"'}).status_code, 200)
+
+    def test_scratch_space_and_traversal_are_hidden(self):
+        with self.assertRaises(Http404):
+            self.get(".incoming/anything")
+        with self.assertRaises(Http404):
+            self.get("../etc/passwd")
+
+
+@override_settings(PASSWORD_HASHERS=["django.contrib.auth.hashers.MD5PasswordHasher"])
+class SearchIndexTests(TestCase):
+    def test_member_is_reindexed_once_per_transaction(self):
+        with mock.patch.object(search, "reindex", wraps=search.reindex) as reindex, \
+                self.captureOnCommitCallbacks(execute=True):
+            user = CustomUser.objects.create_user("ada@example.com", "Ada Lovelace", "pw")
+            profile = user.profile
+            profile.skills = "Mathematics"
+            profile.save()
+            Education.objects.create(user_profile=profile, degree="Analytical Engines", university="London",
+                                     year_of_completion=1843, marks_cgpa="A")
+        reindex.assert_called_once_with([user.pk])
+        self.assertEqual(search.search_members("lovelace engines")[1][0][0], user.pk)
+
+    def test_rolled_back_savepoint_does_not_lose_later_changes(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            user = CustomUser.objects.create_user("ada@example.com", "Ada", "pw")
+        with self.captureOnCommitCallbacks(execute=True):
+            try:  # the batch is registered inside the savepoint, and discarded with it
+                with transaction.atomic():
+                    user.full_name = "Rolled Back"
+                    user.save()
+                    raise DatabaseError
+            except DatabaseError:
+                pass
+            user.full_name = "Ada Byron"
+            user.save()
+        self.assertEqual(search.search_members("byron")[0], 1)
+
+    def test_admin_list_filters_by_search_words(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            ada = CustomUser.objects.create_user("ada@example.com", "Ada Lovelace", "pw", is_active=True)
+            CustomUser.objects.create_user("byron@example.com", "Ada Byron", "pw", is_active=False)
+            CustomUser.objects.create_user("grace@example.com", "Grace Hopper", "pw", is_active=True)
+        self.client.force_login(CustomUser.objects.create_superuser("admin@example.com", "Admin", "pw"))
+        response = self.client.get("/api/admin/users/", {"q": "ada", "status": "active"})
+        self.assertEqual([user["id"] for user in response.data["results"]], [ada.pk])
+
+
+@override_settings(PASSWORD_HASHERS=["django.contrib.auth.hashers.MD5PasswordHasher"])
+class CachedAuthenticationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = CustomUser.objects.create_user("member@example.com", "Member", "pw")
+
+    def get_me(self, user=None):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f"Bearer {RefreshToken.for_user(user or self.user).access_token}")
+        with CaptureQueriesContext(connection) as captured:
+            response = client.get("/api1/profile/me/")
+        user_queries = [q for q in captured if 'FROM "users_customuser"' in q["sql"]]
+        return response, len(user_queries)
+
+    @override_settings(CACHE_SHARED=True)
+    def test_user_is_cached_without_its_password_until_it_changes(self):
+        self.assertEqual(self.get_me()[1], 1)
+        response, user_queries = self.get_me()
+        self.assertEqual((response.status_code, user_queries), (200, 0))
+        self.assertEqual(response.data["user"]["email"], "member@example.com")
+        _, values, _ = cache.get(f"auth-user:{self.user.pk}")
+        self.assertNotIn("password", values)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.is_blocked = True
+            self.user.save()
+        self.assertEqual(self.get_me()[0].status_code, 401)
+
+    @override_settings(CACHE_SHARED=True)
+    def test_async_lookup_shares_the_cached_entry(self):
+        with self.assertNumQueries(1):
+            self.assertEqual(authentication.cached_user(CustomUser, self.user.pk).email, "member@example.com")
+        with self.assertNumQueries(0):
+            user = async_to_sync(authentication.acached_user)(CustomUser, self.user.pk)
+        self.assertEqual((user.pk, user.email), (self.user.pk, "member@example.com"))
+        with self.captureOnCommitCallbacks(execute=True):
+            CustomUser.objects.filter(pk=self.user.pk).update(full_name="Renamed")
+            authentication.invalidate_user(self.user.pk)
+        self.assertEqual(async_to_sync(authentication.acached_user)(CustomUser, self.user.pk).full_name, "Renamed")
+
+    @override_settings(CACHE_SHARED=False)
+    def test_per_process_cache_falls_back_to_the_database(self):
+        self.get_me()
+        response, user_queries = self.get_me()
+        self.assertEqual((response.status_code, user_queries), (200, 1))
+        self.assertIsNone(cache.get(f"auth-user:{self.user.pk}"))
+
+    @override_settings(CACHE_SHARED=True)
+    @mock.patch.object(jwt_settings, "CHECK_REVOKE_TOKEN", True)  # simplejwt's modules hold this object
+    def test_password_change_revokes_tokens(self):
+        self.assertEqual(self.get_me()[0].status_code, 200)
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f"Bearer {RefreshToken.for_user(self.user).access_token}")
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.set_password("new")
+            self.user.save()
+        self.assertEqual(client.get("/api1/profile/me/").status_code, 401)
+
+
+@override_settings(
+    PASSWORD_HASHERS=["django.contrib.auth.hashers.MD5PasswordHasher"],
+    LOGIN_THROTTLE_ENABLED=True,
+    LOGIN_THROTTLE_BACKEND="cache",
+    LOGIN_THROTTLE_RATES={"token": {"ip": "1/min", "email": "2/min"}},
+)
+class LoginThrottleTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        CustomUser.objects.create_user("victim@example.com", "Victim", "pw")
+
+    def login(self, ip, email="victim@example.com", **headers):
+        return self.client.post("/api/token/", {"email": email, "password": "wrong"}, REMOTE_ADDR=ip, **headers)
+
+    def test_throttled_ip_does_not_drain_the_email_bucket(self):
+        self.assertEqual(self.login("10.0.0.1").status_code, 401)
+        for _ in range(3):
+            response = self.login("10.0.0.1")
+            self.assertEqual(response.status_code, 429)
+            self.assertIn("Retry-After", response)
+        # the victim's own attempt from elsewhere still gets through
+        self.assertEqual(self.login("10.0.0.2").status_code, 401)
+        self.assertEqual(self.login("10.0.0.3").status_code, 429)  # now the email bucket is empty
+
+    def test_forwarded_for_cannot_pick_a_fresh_bucket(self):
+        self.assertEqual(self.login("10.0.0.1", "a@example.com", HTTP_X_FORWARDED_FOR="1.1.1.1").status_code, 401)
+        self.assertEqual(self.login("10.0.0.1", "b@example.com", HTTP_X_FORWARDED_FOR="2.2.2.2").status_code, 429)
+
+
+@override_settings(
+    PASSWORD_HASHERS=["django.contrib.auth.hashers.MD5PasswordHasher"],
+    METRICS_ENABLED=True, METRICS_SAMPLE_RATE=1, METRICS_TOKEN="scrape-token",
+)
+class MetricsTests(TestCase):
+    def setUp(self):
+        registry.clear()
+
+    def test_histogram_and_label_rendering(self):
+        registry.observe("http_request_duration_seconds", {"view": 'a"b'}, 0.02)
+        registry.inc("http_requests_total", {"view": "v", "method": "GET", "status": "200"}, 2)
+        text = registry.render()
+        self.assertIn('http_request_duration_seconds_bucket{view="a\\"b",le="0.01"} 0', text)
+        self.assertIn('http_request_duration_seconds_bucket{view="a\\"b",le="0.025"} 1', text)
+        self.assertIn('http_request_duration_seconds_count{view="a\\"b"} 1', text)
+        self.assertIn('http_requests_total{method="GET",status="200",view="v"} 2', text)
+
+    def test_requests_are_recorded_with_sampled_query_counts(self):
+        self.client.get("/api/admin/stats/")
+        text = registry.render()
+        self.assertIn('http_requests_total{method="GET",status="401",view="admin-stats"} 1', text)
+        self.assertIn('http_request_db_queries_count{view="admin-stats"} 1', text)
+
+    def test_async_requests_record_queries_run_in_the_sync_to_async_thread(self):
+        async def view(request):
+            await CustomUser.objects.acount()
+            await CustomUser.objects.acount()
+            return HttpResponse("ok")
+
+        async def serve():
+            # a fresh event loop, as under ASGI: the ORM calls run in sync_to_async's own thread
+            try:
+                return await RequestMetricsMiddleware(view)(RequestFactory().get("/async/"))
+            finally:
+                await sync_to_async(connections.close_all)()
+
+        self.assertEqual(asyncio.run(serve()).status_code, 200)
+        self.assertIn('http_request_db_queries_sum{view="<unmatched>"} 2', registry.render())
+
+    def test_scrape_needs_the_token_or_a_staff_session(self):
+        self.assertEqual(self.client.get("/metrics").status_code, 404)
+        self.assertEqual(self.client.get("/metrics", HTTP_AUTHORIZATION="Bearer wrong").status_code, 404)
+        response = self.client.get("/metrics", HTTP_AUTHORIZATION="Bearer scrape-token")
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b"# TYPE http_requests_total counter", response.content)
+
+        self.client.force_login(CustomUser.objects.create_superuser("admin@example.com", "Admin", "pw"))
+        self.assertEqual(self.client.get("/metrics").status_code, 200)
+
+
+@skipUnless(connection.vendor == "sqlite", "the replica is a second SQLite database next to the default one")
+@override_settings(PASSWORD_HASHERS=["django.contrib.auth.hashers.MD5PasswordHasher"], READ_YOUR_WRITES_SECONDS=30)
+class ReplicaRoutingTests(TransactionTestCase):
+    """Routing against a "replica" that is a separate SQLite file and never catches up."""
+
+    @classmethod
+    def setUpClass(cls):
+        # added here rather than in settings, so the runner doesn't try to create it
+        cls.replica_dir = tempfile.TemporaryDirectory()
+        name = os.path.join(cls.replica_dir.name, "replica.sqlite3")
+        default = connections.settings["default"]
+        connections.settings["replica1"] = {**default, "NAME": name, "TEST": {**default["TEST"], "NAME": name}}
+        call_command("migrate", database="replica1", verbosity=0)
+        cls.databases = {"default", "replica1"}
+        cls.aliases = mock.patch.object(routers, "replica_aliases", return_value=["replica1"])
+        cls.aliases.start()
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        cls.aliases.stop()
+        connections["replica1"].close()
+        del connections["replica1"]
+        del connections.settings["replica1"]
+        cls.replica_dir.cleanup()
+
+    def setUp(self):
+        self.admin = CustomUser.objects.create_superuser("admin@example.com", "Admin", "pw")
+        self.member = CustomUser.objects.create_user("member@example.com", "Member", "pw", is_active=True)
+        # the replica has both users, but the member's name from before a change it never got
+        fields = [field.attname for field in CustomUser._meta.concrete_fields]
+        CustomUser.objects.using("replica1").bulk_create(
+            CustomUser(**{field: getattr(user, field) for field in fields}) for user in (self.admin, self.member))
+        CustomUser.objects.using("replica1").filter(pk=self.member.pk).update(full_name="Stale Member")
+        self.client.force_login(self.admin)
+        self.url = f"/api/admin/users/{self.member.pk}/"
+        cache.clear()  # long after both were created: nobody is pinned
+
+    def rename(self, full_name):
+        response = self.client.patch(self.url, {"full_name": full_name}, content_type="application/json")
+        self.assertEqual(response.status_code, 200, response.content)
+        return response
+
+    def test_reads_go_to_the_replica(self):
+        self.assertEqual(self.client.get(self.url).data["full_name"], "Stale Member")
+
+    @override_settings(CACHE_SHARED=False)
+    def test_writer_is_pinned_by_cookie_without_a_shared_cache(self):
+        response = self.rename("Renamed Member")
+        self.assertIn(routers.PIN_COOKIE, response.cookies)
+        self.assertEqual(self.client.get(self.url).data["full_name"], "Renamed Member")
+
+        # nothing was kept in this process's cache: without the cookie the read is unpinned
+        del self.client.cookies[routers.PIN_COOKIE]
+        self.assertEqual(self.client.get(self.url).data["full_name"], "Stale Member")
+
+    def test_forged_pin_cookie_is_ignored(self):
+        self.client.cookies[routers.PIN_COOKIE] = str(self.admin.pk)
+        self.assertEqual(self.client.get(self.url).data["full_name"], "Stale Member")
+
+    @override_settings(CACHE_SHARED=True)
+    def test_profile_owner_is_pinned_in_the_shared_cache(self):
+        link = ProfileShareLink.objects.create(user=self.member, expiry_date=timezone.now() + timedelta(days=1))
+        shared_url = f"/api/profile/share/{link.token}/"
+        visitor = APIClient()
+        self.assertEqual(visitor.get(shared_url).status_code, 404)  # the replica has no profile yet
+
+        self.rename("Renamed Member")
+        response = visitor.get(shared_url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["user"]["full_name"], "Renamed Member")
+
+
+@override_settings(PASSWORD_HASHERS=["django.contrib.auth.hashers.MD5PasswordHasher"], DELTA_SYNC_OVERLAP_SECONDS=60)
+class DeltaSyncTests(TestCase):
+    def setUp(self):
+        self.client.force_login(CustomUser.objects.create_superuser("admin@example.com", "Admin", "pw"))
+        self.edited, self.untouched, self.deleted = (
+            CustomUser.objects.create_user(f"member{i}@example.com", f"Member {i}", "pw", is_active=True) for i in range(3))
+        # everything so far happened before the client's last sync
+        CustomUser.objects.update(updated_at=timezone.now() - timedelta(hours=2))
+        self.since = (timezone.now() - timedelta(hours=1)).isoformat()
+
+    def sync(self, since, **params):
+        return self.client.get("/api/admin/users/", {"updated_since": since, **params})
+
+    def test_reports_profile_changes_and_tombstones(self):
+        Education.objects.create(user_profile=self.edited.profile, degree="BSc", university="State",
+                                 year_of_completion=2020, marks_cgpa="8.1")
+        deleted_id = self.deleted.pk
+        self.deleted.delete()
+
+        response = self.sync(self.since)
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual([row["id"] for row in response.data["results"]], [self.edited.pk])
+        self.assertEqual(response.data["deleted"], [deleted_id])
+        self.assertTrue(UserTombstone.objects.filter(user_id=deleted_id).exists())
+
+        # the next sync starts from synced_at, moved back by the overlap: the same change comes again
+        response = self.sync(response.data["synced_at"].isoformat())
+        self.assertEqual([row["id"] for row in response.data["results"]], [self.edited.pk])
+        self.assertEqual(response.data["deleted"], [deleted_id])
+
+    def test_tombstones_only_come_with_the_first_page(self):
+        CustomUser.objects.exclude(pk=self.deleted.pk).update(updated_at=timezone.now())
+        deleted_id = self.deleted.pk
+        self.deleted.delete()
+        first = self.sync(self.since, page_size=2).data
+        self.assertEqual(first["deleted"], [deleted_id])
+        self.assertIsNotNone(first["next"])
+        second = self.client.get(first["next"]).data
+        self.assertEqual(second["deleted"], [])
+        ids = [row["id"] for row in first["results"] + second["results"]]
+        self.assertEqual(len(ids), len(set(ids)))
+        self.assertCountEqual(ids, CustomUser.objects.values_list("pk", flat=True))
+
+    @override_settings(RETENTION={**settings.RETENTION, "USER_TOMBSTONE_DAYS": 1})
+    def test_sync_older_than_the_tombstones_is_refused(self):
+        response = self.sync((timezone.now() - timedelta(days=2)).isoformat())
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("updated_since", response.data)
+
+
+@override_settings(
+    PASSWORD_HASHERS=["django.contrib.auth.hashers.MD5PasswordHasher"],
+    CHANGE_STREAM_MAX_SECONDS=0.1, CHANGE_STREAM_POLL_INTERVAL=0.01, CHANGE_STREAM_GAP_SECONDS=5,
+    CHANGE_STREAM_SYNC_MAX_STREAMS=1,
+)
+class ChangeStreamTests(TestCase):
+    def setUp(self):
+        self.admin = CustomUser.objects.create_superuser("admin@example.com", "Admin", "pw")
+        self.client.force_login(self.admin)
+        for i in range(3):
+            CustomUser.objects.create_user(f"member{i}@example.com", f"Member {i}", "pw")
+        self.ids = list(ChangeEvent.objects.order_by("id").values_list("id", flat=True))
+
+    def stream(self, **headers):
+        response = self.client.get("/api/admin/events/", **headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], "text/event-stream")
+        return b"".join(response.streaming_content).decode()
+
+    def sent_ids(self, body):
+        return [int(line[4:]) for line in body.splitlines() if line.startswith("id: ")]
+
+    def test_resumes_after_last_event_id(self):
+        body = self.stream(HTTP_LAST_EVENT_ID=str(self.ids[1]))
+        self.assertEqual(self.sent_ids(body), self.ids[2:])
+        self.assertIn("event: registered", body)
+
+    def test_new_stream_starts_from_now(self):
+        self.assertEqual(self.sent_ids(self.stream()), [])
+
+    def test_purged_history_sends_a_reset(self):
+        ChangeEvent.objects.filter(id__lte=self.ids[1]).delete()
+        body = self.stream(HTTP_LAST_EVENT_ID=str(self.ids[0]))
+        self.assertIn(f'event: reset\ndata: {{"latest_id":{self.ids[-1]}}}', body)
+        self.assertEqual(self.sent_ids(body), [self.ids[-1]])  # the reset carries the latest id; nothing follows
+
+    def test_async_view_sends_the_same_frames(self):
+        request = RequestFactory().get("/api/admin/events/", {"token": str(RefreshToken.for_user(self.admin).access_token)},
+                                       HTTP_LAST_EVENT_ID=str(self.ids[1]))
+
+        async def body():
+            response = await async_views.change_events(request)
+            return "".join([chunk.decode() async for chunk in response.streaming_content])
+
+        self.assertEqual(self.sent_ids(async_to_sync(body)()), self.ids[2:])
+
+    def test_sync_streams_are_capped_per_process(self):
+        first = self.client.get("/api/admin/events/")
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(self.client.get("/api/admin/events/").status_code, 503)
+        b"".join(first.streaming_content)  # the test client closes it at the end
+        self.stream()  # the slot is free again
+        with override_settings(CHANGE_STREAM_SYNC_MAX_STREAMS=0):
+            self.assertEqual(self.client.get("/api/admin/events/").status_code, 503)
+
+    def test_gap_holds_back_later_events_until_it_settles(self):
+        after = self.ids[-1]
+        fresh = ChangeEvent(id=after + 2, created_at=timezone.now())
+        self.assertEqual(events._ready([fresh], after), [])  # after + 1 may still commit
+        settled = ChangeEvent(id=after + 2, created_at=timezone.now() - timedelta(seconds=10))
+        self.assertEqual(events._ready([settled], after), [settled])
+
+
+@override_settings(PASSWORD_HASHERS=["django.contrib.auth.hashers.MD5PasswordHasher"])
+class BulkActionTests(TestCase):
+    def setUp(self):
+        self.admin = CustomUser.objects.create_superuser("admin@example.com", "Admin", "pw")
+        self.client.force_login(self.admin)
+        self.active = CustomUser.objects.create_user("active@example.com", "Active", "pw", is_active=True)
+        self.blocked = CustomUser.objects.create_user("blocked@example.com", "Blocked", "pw", is_active=True, is_blocked=True)
+        self.pending = CustomUser.objects.create_user("pending@example.com", "Pending", "pw", is_active=False)
+
+    def bulk(self, body):
+        return self.client.post("/api/admin/users/bulk/", body, content_type="application/json")
+
+    def test_block_by_ids_skips_the_acting_admin_and_reports_unknown_ids(self):
+        events_before = ChangeEvent.objects.count()
+        response = self.bulk({"action": "block", "ids": [self.admin.pk, self.active.pk, self.blocked.pk, 999999]})
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(response.data["results"], {
+            str(self.admin.pk): "skipped", str(self.active.pk): "updated",
+            str(self.blocked.pk): "unchanged", "999999": "not_found",
+        })
+        self.assertEqual(response.data["counts"], {"skipped": 1, "updated": 1, "unchanged": 1, "not_found": 1})
+
+        self.assertFalse(CustomUser.objects.get(pk=self.admin.pk).is_blocked)
+        self.assertTrue(CustomUser.objects.get(pk=self.active.pk).is_blocked)
+        self.assertEqual(stats.current(), stats.compute())
+        self.assertEqual(ChangeEvent.objects.count(), events_before + 1)
+        event = ChangeEvent.objects.latest("id")
+        self.assertEqual((event.kind, event.user_id), (ChangeEvent.KIND_BLOCKED, self.active.pk))
+
+    def test_activate_by_filter(self):
+        response = self.bulk({"action": "activate", "filter": {"status": "pending"}})
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(response.data["results"], {str(self.pending.pk): "updated"})
+        self.assertTrue(CustomUser.objects.get(pk=self.pending.pk).is_active)
+        self.assertEqual(stats.current(), stats.compute())
+
+    @override_settings(BULK_ACTION_MAX_USERS=2)
+    def test_filter_matching_too_many_users_is_refused(self):
+        response = self.bulk({"action": "block", "filter": {}})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("more than 2 users", response.data["error"])
+        self.assertFalse(CustomUser.objects.filter(is_blocked=True).exclude(pk=self.blocked.pk).exists())
+
+    def test_needs_exactly_one_of_ids_and_filter(self):
+        self.assertEqual(self.bulk({"action": "block"}).status_code, 400)
+        self.assertEqual(self.bulk({"action": "block", "ids": [self.active.pk], "filter": {}}).status_code, 400)
@@ -0,0 +1,136 @@
+"""
+Token-bucket throttles for the endpoints that hash a password.
+
+Each request takes one token from a bucket per client IP and then one per
+submitted email; a bucket of rate ``N/period`` holds at most N tokens and
+refills continuously at N per period. A request is refused with 429 and
+Retry-After as soon as one of its buckets is empty, and the later buckets
+are left alone: a client that is over its IP limit can't drain (and lock
+out) the email buckets of other people's accounts. DRF runs throttles in
+``initial()``, before the handler, so a refused request never reaches the
+password hasher or the database (the throttled views also skip
+authentication for the same reason).
+
+Buckets live in this process (``memory``, per worker) or in the Django
+cache (``cache``). The cache backend is only shared by all workers if the
+cache is (Redis, Memcached, the database; not the default LocMemCache):
+otherwise every worker allows the full rate, and the users.W001 system
+check says so. It does a plain read-modify-write, so concurrent requests
+can occasionally both take the last token; close enough for abuse
+protection.
+
+The client IP is DRF's ``get_ident``: REMOTE_ADDR, or the address
+REST_FRAMEWORK["NUM_PROXIES"] hops back in X-Forwarded-For. Left unset,
+DRF would take the whole header, which any client can forge.
+"""
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.throttling import BaseThrottle
+
+PERIODS = {"s": 1, "sec": 1, "m": 60, "min": 60, "h": 3600, "hour": 3600, "d": 86400, "day": 86400}
+
+
+def parse_rate(rate):
+    """``"5/min"`` -> ``(capacity, tokens_per_second)``."""
+    count, period = rate.split("/")
+    count = int(count)
+    return count, count / PERIODS[period]
+
+
+class MemoryBuckets:
+    """Per-process buckets, least recently used evicted beyond ``max_keys``."""
+
+    def __init__(self, max_keys=10000):
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def take(self, key, capacity, refill_rate):
+        """Take one token; returns 0 if one was available, else the seconds until one will be."""
+        with self._lock:
+            now = time.monotonic()
+            tokens, stamp = self._buckets.pop(key, (capacity, now))
+            tokens = min(capacity, tokens + (now - stamp) * refill_rate)
+            wait = 0 if tokens >= 1 else (1 - tokens) / refill_rate
+            if not wait:
+                tokens -= 1
+            self._buckets[key] = (tokens, now)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+            return wait
+
+
+class CacheBuckets:
+    """Buckets in the default cache, shared across workers."""
+
+    def take(self, key, capacity, refill_rate):
+        now = time.time()
+        tokens, stamp = cache.get(key) or (capacity, now)
+        tokens = min(capacity, tokens + (now - stamp) * refill_rate)
+        wait = 0 if tokens >= 1 else (1 - tokens) / refill_rate
+        if not wait:
+            tokens -= 1
+        # a bucket left alone long enough is full again, so it can expire
+        cache.set(key, (tokens, now), timeout=int(capacity / refill_rate) + 1)
+        return wait
+
+
+BACKENDS = {"memory": MemoryBuckets, "cache": CacheBuckets}
+_buckets = {}
+
+
+def buckets():
+    name = settings.LOGIN_THROTTLE_BACKEND
+    if name not in _buckets:
+        _buckets[name] = BACKENDS[name]()
+    return _buckets[name]
+
+
+class PasswordHashThrottle(BaseThrottle):
+    """
+    Throttle on ``settings.LOGIN_THROTTLE_RATES[scope]``, e.g. ``{"ip": "20/min", "email": "5/min"}``.
+    """
+    scope = None
+
+    def identify(self, kind, request):
+        if kind == "ip":
+            return self.get_ident(request)
+        if kind == "email":
+            email = request.data.get("email") if hasattr(request.data, "get") else None
+            return str(email).strip().lower() if email else None
+        raise ValueError(f"Unknown throttle key {kind!r}")
+
+    def allow_request(self, request, view):
+        self.wait_seconds = 0
+        if not settings.LOGIN_THROTTLE_ENABLED:
+            return True
+        rates = settings.LOGIN_THROTTLE_RATES.get(self.scope, {})
+        for kind in sorted(rates, key=lambda kind: kind != "ip"):  # the IP bucket first
+            ident = self.identify(kind, request)
+            if not ident:
+                continue
+            digest = hashlib.sha1(ident.encode()).hexdigest()
+            self.wait_seconds = buckets().take(f"throttle:{self.scope}:{kind}:{digest}", *parse_rate(rates[kind]))
+            if self.wait_seconds:
+                return False
+        return True
+
+    def wait(self):
+        return self.wait_seconds
+
+
+class TokenObtainThrottle(PasswordHashThrottle):
+    scope = "token"
+
+
+class AdminLoginThrottle(PasswordHashThrottle):
+    scope = "admin_login"
+
+
+class RegisterThrottle(PasswordHashThrottle):
+    scope = "register"
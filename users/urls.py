@@ -1,19 +1,32 @@
 from django.urls import path,include
-from .views import RegisterUser, VerifyEmail,GenerateShareLink, SharedProfileView
+from django.conf import settings
+from . import async_views, events
+from .views import RegisterUser, VerifyEmail,GenerateShareLink, SharedProfileView, ShareLinkStatsView
 from .views import MyTokenObtainPairView,AdminUserViewSet,admin_stats,admin_login
 from rest_framework_simplejwt.views import TokenRefreshView
 from rest_framework.routers import DefaultRouter
 router = DefaultRouter()
 router.register(r"admin/users", AdminUserViewSet, basename="admin-users")
+
+# async implementations of the hot read paths, for ASGI deployments
+if settings.ASYNC_READ_VIEWS:
+    admin_stats_view, shared_profile_view = async_views.admin_stats, async_views.shared_profile
+    change_events_view = async_views.change_events
+else:
+    admin_stats_view, shared_profile_view = admin_stats, SharedProfileView.as_view()
+    change_events_view = events.change_events
+
 urlpatterns = [
     path('register/', RegisterUser.as_view(), name='register'),
     path('verify/<str:uid>/', VerifyEmail.as_view(), name='verify-email'),
     path('token/', MyTokenObtainPairView.as_view(), name='token_obtain_pair'),
     path('refresh/', TokenRefreshView.as_view(), name='token_refresh'),
     path("", include(router.urls)),
-    path("admin/stats/", admin_stats, name="admin-stats"),
+    path("admin/stats/", admin_stats_view, name="admin-stats"),
+    path("admin/events/", change_events_view, name="admin-events"),
     path("admin/login/", admin_login, name="admin-login"),
     path("profile/share/generate/", GenerateShareLink.as_view(), name="generate_share_link"),
-    path("profile/share/<uuid:token>/", SharedProfileView.as_view(), name="shared_profile"),
+    path("profile/share/stats/", ShareLinkStatsView.as_view(), name="share_link_stats"),
+    path("profile/share/<uuid:token>/", shared_profile_view, name="shared_profile"),
     
 ]
\ No newline at end of file
@@ -0,0 +1,247 @@
+"""
+Ingestion of ProfileViewLog rows for shared profile pages.
+
+``PROFILE_VIEW_LOG_MODE`` picks how a view is recorded:
+
+* ``sync``     - one INSERT per view inside the request (the old behaviour).
+* ``buffered`` - events are kept in process memory and written with
+  ``bulk_create`` once ``PROFILE_VIEW_LOG_BATCH_SIZE`` events are queued or
+  ``PROFILE_VIEW_LOG_FLUSH_INTERVAL`` seconds have passed. Whatever is left
+  is flushed when the worker exits. All writes happen on a background
+  thread, never in the request; if the database is unreachable the events
+  are written to the spool directory instead.
+* ``spool``    - every event is appended to a per-process, per-minute
+  segment file in ``PROFILE_VIEW_LOG_SPOOL_DIR``; ``manage.py
+  flush_view_logs`` loads closed segments in batches.
+
+Events whose share link can't be found yet are spooled again and retried by
+``flush_view_logs`` until they are PROFILE_VIEW_LOG_RETRY_SECONDS old; only
+then are they taken to belong to a deleted link and dropped.
+"""
+import atexit
+import json
+import logging
+import os
+import threading
+import time
+from datetime import timedelta
+from pathlib import Path
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import LoadedSpoolSegment, ProfileShareLink, ProfileViewLog
+
+logger = logging.getLogger(__name__)
+
+SEGMENT_SECONDS = 60
+
+
+def _event(share_link_id, viewer_ip, user_agent):
+    return {
+        "share_link_id": share_link_id,
+        "viewer_ip": viewer_ip or None,
+        "user_agent": user_agent or "",
+        "viewed_at": timezone.now(),
+    }
+
+
+def write_events(events, batch_size=None):
+    """
+    ``bulk_create`` a list of view events.
+
+    Returns ``(rows written, unresolved events)``: the events whose share link
+    doesn't exist (or isn't visible yet), for the caller to retry.
+    """
+    if not events:
+        return 0, []
+    batch_size = batch_size or settings.PROFILE_VIEW_LOG_BATCH_SIZE
+    link_ids = {event["share_link_id"] for event in events}
+    live_ids = set(ProfileShareLink.objects.filter(pk__in=link_ids).values_list("pk", flat=True))
+    rows = [
+        ProfileViewLog(
+            share_link_id=event["share_link_id"],
+            viewer_ip=event["viewer_ip"],
+            user_agent=event["user_agent"],
+            viewed_at=event["viewed_at"],
+        )
+        for event in events
+        if event["share_link_id"] in live_ids
+    ]
+    ProfileViewLog.objects.bulk_create(rows, batch_size=batch_size)
+    return len(rows), [event for event in events if event["share_link_id"] not in live_ids]
+
+
+def retry_later(events):
+    """Spool unresolved events for the next ``flush_view_logs``, dropping those past the retry window."""
+    cutoff = timezone.now() - timedelta(seconds=settings.PROFILE_VIEW_LOG_RETRY_SECONDS)
+    retry = [event for event in events if event["viewed_at"] >= cutoff]
+    if len(retry) < len(events):
+        logger.warning("Dropping %s profile views of share links that no longer exist", len(events) - len(retry))
+    if retry:
+        spool_events(retry)
+
+
+# --- spool files -----------------------------------------------------------
+
+def spool_dir():
+    path = Path(settings.PROFILE_VIEW_LOG_SPOOL_DIR)
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+_spool_lock = threading.Lock()
+
+
+def spool_events(events):
+    """Append events to this process's current segment file."""
+    segment = int(time.time()) // SEGMENT_SECONDS
+    path = spool_dir() / f"views-{segment}-{os.getpid()}.ndjson"
+    lines = "".join(json.dumps(dict(event, viewed_at=event["viewed_at"].isoformat())) + "\n" for event in events)
+    with _spool_lock:
+        # reopened per write so a finished segment is never touched again
+        with open(path, "a", encoding="utf-8") as spool:
+            spool.write(lines)
+
+
+def _read_segment(path):
+    events = []
+    with open(path, encoding="utf-8") as spool:
+        for line in spool:
+            try:
+                event = json.loads(line)
+            except ValueError:
+                # a torn last line from a killed worker; everything before it is fine
+                logger.warning("Skipping unreadable line in %s", path)
+                continue
+            event["viewed_at"] = parse_datetime(event["viewed_at"])
+            events.append(event)
+    return events
+
+
+def ingest_spool(include_current=False, batch_size=None):
+    """
+    Load spooled segments into ProfileViewLog and delete them.
+
+    Each segment is loaded in one transaction that also records it in
+    LoadedSpoolSegment, so a run that dies before deleting the file skips it
+    the next time instead of inserting its rows twice. Segments still being
+    written (the current minute) are left alone unless ``include_current`` is
+    set, which is only safe once the workers are stopped.
+    Returns ``(segments, rows)``.
+    """
+    current = int(time.time()) // SEGMENT_SECONDS
+    segments = rows = 0
+    for path in sorted(spool_dir().glob("views-*.ndjson")):
+        segment = int(path.name.split("-")[1])
+        if segment >= current and not include_current:
+            continue
+        written, unresolved = 0, []
+        try:
+            with transaction.atomic():
+                # the marker's unique name also serialises concurrent flush_view_logs runs
+                _, created = LoadedSpoolSegment.objects.get_or_create(name=path.name)
+                if created:
+                    written, unresolved = write_events(_read_segment(path), batch_size)
+        except FileNotFoundError:
+            continue  # another run loaded and deleted it meanwhile
+        rows += written
+        # after the commit: a crash in between can only lose views of links that don't exist
+        retry_later(unresolved)
+        path.unlink(missing_ok=True)
+        LoadedSpoolSegment.objects.filter(name=path.name).delete()
+        segments += 1
+    return segments, rows
+
+
+# --- in-process buffer -----------------------------------------------------
+
+class ViewLogBuffer:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.events = []
+        self.first_event_at = None
+        self.pid = os.getpid()
+        self.flusher = None
+        self.wake = threading.Event()
+
+    def add(self, event):
+        """Queue an event; when a flush is due, wake the flusher thread (the request never writes)."""
+        with self.lock:
+            if self.pid != os.getpid():
+                # forked (e.g. gunicorn --preload): the parent's queue isn't ours
+                self.__init__()
+            self.events.append(event)
+            if self.first_event_at is None:
+                self.first_event_at = time.monotonic()
+            due = (
+                len(self.events) >= settings.PROFILE_VIEW_LOG_BATCH_SIZE
+                or time.monotonic() - self.first_event_at >= settings.PROFILE_VIEW_LOG_FLUSH_INTERVAL
+            )
+            if self.flusher is None:
+                self.flusher = threading.Thread(target=self._flush_periodically, name="viewlog-flusher", daemon=True)
+                self.flusher.start()
+        if due:
+            self.wake.set()
+
+    def take(self):
+        with self.lock:
+            events, self.events, self.first_event_at = self.events, [], None
+        return events
+
+    def flush(self):
+        events = self.take()
+        if not events:
+            return 0
+        try:
+            written, unresolved = write_events(events)
+        except Exception:
+            logger.exception("Could not write %s buffered profile views, spooling them", len(events))
+            spool_events(events)
+            return 0
+        retry_later(unresolved)
+        return written
+
+    def _flush_periodically(self):
+        while True:
+            self.wake.wait(settings.PROFILE_VIEW_LOG_FLUSH_INTERVAL)
+            self.wake.clear()
+            if self.events:
+                self.flush()
+                # this thread owns its own connection; don't leave it idle
+                connection.close()
+
+
+_buffer = ViewLogBuffer()
+
+
+def record_view(share_link_id, viewer_ip, user_agent):
+    mode = settings.PROFILE_VIEW_LOG_MODE
+    if mode == "buffered":
+        _buffer.add(_event(share_link_id, viewer_ip, user_agent))
+    elif mode == "spool":
+        spool_events([_event(share_link_id, viewer_ip, user_agent)])
+    else:
+        ProfileViewLog.objects.create(share_link_id=share_link_id, viewer_ip=viewer_ip, user_agent=user_agent)
+
+
+async def arecord_view(share_link_id, viewer_ip, user_agent):
+    """``record_view`` for async views: never blocks the event loop on the database or disk."""
+    mode = settings.PROFILE_VIEW_LOG_MODE
+    if mode == "buffered":
+        _buffer.add(_event(share_link_id, viewer_ip, user_agent))
+    elif mode == "spool":
+        await sync_to_async(spool_events, thread_sensitive=False)([_event(share_link_id, viewer_ip, user_agent)])
+    else:
+        await ProfileViewLog.objects.acreate(share_link_id=share_link_id, viewer_ip=viewer_ip, user_agent=user_agent)
+
+
+def flush():
+    """Write out whatever this process has buffered. Safe to call at any time."""
+    return _buffer.flush()
+
+
+atexit.register(flush)
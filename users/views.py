@@ -2,8 +2,8 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
 from .serializers import UserRegisterSerializer
-from .models import CustomUser,ProfileShareLink, ProfileViewLog
-from django.core.mail import send_mail
+from .models import CustomUser,ProfileShareLink, ShareLinkDailyViews, ShareLinkHourlyViews
+from django.db import transaction
 from django.conf import settings
 from django.urls import reverse
 from django.utils.http import urlsafe_base64_encode, urlsafe_base64_decode
@@ -18,37 +18,54 @@ from rest_framework.permissions import IsAuthenticated
 from django.contrib.auth import get_user_model
 from rest_framework_simplejwt.tokens import RefreshToken
 from django.contrib.auth import authenticate
-from rest_framework.decorators import action, api_view, permission_classes
+from rest_framework.decorators import action, api_view, authentication_classes, permission_classes, throttle_classes
 from rest_framework.permissions import AllowAny,IsAdminUser
-from django.db.models import Count, Q
+from django.db.models import Prefetch, Sum
+from django.db.models.functions import Coalesce
+from rest_framework.filters import OrderingFilter
 import logging
+from collections import Counter
+
+from django.http import Http404, StreamingHttpResponse
+from django.utils.http import parse_etags
+from .exports import EXPORT_FORMATS, export_queryset, iter_export
+from .filters import AdminUserFilterBackend, filter_users
+from .outbox import enqueue_email
+from .viewlog import record_view
+from . import bulk, changes, membership, profile_cache, rollups, routers, search, stats
+from .pagination import AdminUserCursorPagination, AdminUserDeltaPagination, MemberSearchPagination
+from .throttling import AdminLoginThrottle, RegisterThrottle, TokenObtainThrottle
 
 from .serializers import (
+    ShareLinkStatsSerializer,
     AdminUserSerializer,
     AdminUserStatusSerializer,
     AdminUserProfileSerializer,
+    AdminBulkActionSerializer,
 )
 from django.utils import timezone
 from datetime import timedelta
 
 class RegisterUser(APIView):
     permission_classes = [AllowAny]
+    authentication_classes = []  # nothing to authenticate; lets the throttle run before any DB work
+    throttle_classes = [RegisterThrottle]
     def post(self, request):
         serializer = UserRegisterSerializer(data=request.data)
         if serializer.is_valid():
-            user = serializer.save()  # This calls create_user() -> encrypts password & generates membership ID
-            user.is_active = False
-            user.save()
-            # Send verification email
-            uid = urlsafe_base64_encode(force_bytes(user.pk))
-            verification_link = f"https://socrp-frontend-v2-2.onrender.com/verify/{uid}/"
-            send_mail(
-                subject="Verify your account",
-                message=f"Click the link to verify your account: {verification_link}",
-                from_email=settings.DEFAULT_FROM_EMAIL,
-                recipient_list=[user.email],
-                fail_silently=False,
-            )
+            membership.prefetch_block()  # its own short transaction, not this one
+            with transaction.atomic():
+                # This calls create_user() -> encrypts password & generates membership ID;
+                # inactive from the start, so the new row is saved (and signalled) only once
+                user = serializer.save(is_active=False)
+                # Queue the verification email; `send_outbox_emails` delivers it
+                uid = urlsafe_base64_encode(force_bytes(user.pk))
+                verification_link = f"https://socrp-frontend-v2-2.onrender.com/verify/{uid}/"
+                enqueue_email(
+                    subject="Verify your account",
+                    message=f"Click the link to verify your account: {verification_link}",
+                    recipient_list=[user.email],
+                )
 
             return Response({'msg': 'User registered successfully. Check your email for verification.'}, status=status.HTTP_201_CREATED)
 
@@ -85,8 +102,10 @@ class UserProfileViewSet(viewsets.ModelViewSet):
 
     @action(detail=False, methods=["get"])
     def me(self, request):
+        routers.use_replica(request.user.pk)
         profile = UserProfile.objects.filter(user=request.user).first()
         if profile:
+            profile.user = request.user  # already loaded by authentication, don't fetch it again
             serializer = self.get_serializer(profile)
             return Response(serializer.data)
         # fallback: just return user data
@@ -109,6 +128,7 @@ class MyTokenObtainPairSerializer(TokenObtainPairSerializer):
 
 class MyTokenObtainPairView(TokenObtainPairView):
     serializer_class = MyTokenObtainPairSerializer
+    throttle_classes = [TokenObtainThrottle]
     
 class GenerateShareLink(APIView):
     permission_classes = [permissions.IsAuthenticated]
@@ -123,53 +143,184 @@ class GenerateShareLink(APIView):
 
         share_url = f"https://socrp-frontend-v2-2.onrender.com/shared-profile/{link.token}"
         return Response({"share_url": share_url, "expiry_date": expiry}, status=status.HTTP_201_CREATED)
+class ShareLinkStatsView(APIView):
+    """How often each of the current user's share links was opened, served from the rollups."""
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request):
+        try:
+            days = min(max(int(request.query_params.get("days", 30)), 1), 365)
+            hours = min(max(int(request.query_params.get("hours", 48)), 1), settings.VIEW_ROLLUP_HOURLY_RETENTION_DAYS * 24)
+        except ValueError:
+            return Response({"error": "days and hours must be integers"}, status=status.HTTP_400_BAD_REQUEST)
+
+        now = timezone.now()
+        links = (
+            ProfileShareLink.objects.filter(user=request.user)
+            .annotate(total_views=Coalesce(Sum("daily_views__views"), 0))
+            .prefetch_related(
+                Prefetch("daily_views", queryset=ShareLinkDailyViews.objects.filter(
+                    day__gte=(now - timedelta(days=days - 1)).date()).order_by("day")),
+                Prefetch("hourly_views", queryset=ShareLinkHourlyViews.objects.filter(
+                    hour__gte=now - timedelta(hours=hours)).order_by("hour")),
+            )
+            .order_by("-created_at")
+        )
+        mark = rollups.watermark()
+        return Response({
+            # views logged after this moment aren't counted yet
+            "aggregated_at": mark.updated_at if mark else None,
+            "links": ShareLinkStatsSerializer(links, many=True).data,
+        })
+
 class SharedProfileView(APIView):
     permission_classes = [permissions.AllowAny]  # Anyone with link can view
 
     def get(self, request, token):
-        share_link = get_object_or_404(ProfileShareLink, token=token)
+        share_link = profile_cache.get_share_link(token)
+        if share_link is None:
+            raise Http404
+        link_id, user_id, expiry_date = share_link
 
-        if not share_link.is_valid():
+        remaining = (expiry_date - timezone.now()).total_seconds()
+        if remaining <= 0:
             return Response({"error": "Link expired"}, status=status.HTTP_410_GONE)
 
-        # Log the view
-        ProfileViewLog.objects.create(
-            share_link=share_link,
+        # the link came from the primary (or its cache); the page itself can come from a replica
+        routers.use_replica(user_id)
+
+        # Log the view (batched unless PROFILE_VIEW_LOG_MODE is "sync")
+        record_view(
+            link_id,
             viewer_ip=request.META.get("REMOTE_ADDR"),
             user_agent=request.META.get("HTTP_USER_AGENT", "")
         )
 
-        # Return profile details (you already have serializer → reuse it)
-        user = share_link.user
-        return Response(UserProfileSerializer(user).data, status=status.HTTP_200_OK)
+        version = profile_cache.profile_version(user_id)
+        cached = profile_cache.get_cached_response(token, version)
+        if cached is None:
+            profile = get_object_or_404(
+                UserProfile.objects.select_related("user").prefetch_related("educations", "experiences"),
+                user_id=user_id,
+            )
+            data = UserProfileSerializer(profile, context={"share_token": token}).data
+            cached = profile_cache.cache_response(token, version, expiry_date, data)
+        etag, data = cached
+
+        headers = profile_cache.response_headers(etag, remaining)
+        if etag in parse_etags(request.headers.get("If-None-Match", "")):
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers=headers)
+        return Response(data, status=status.HTTP_200_OK, headers=headers)
 logger = logging.getLogger(__name__)
 
 class AdminUserViewSet(viewsets.ModelViewSet):
-    queryset = CustomUser.objects.all().select_related("profile")
+    queryset = CustomUser.objects.all().select_related("profile").prefetch_related(
+        "profile__educations", "profile__experiences"
+    )
     serializer_class = AdminUserSerializer
     permission_classes = [IsAdminUser]
+    pagination_class = AdminUserCursorPagination
+    filter_backends = [AdminUserFilterBackend, OrderingFilter]
+    ordering_fields = ["date_joined", "full_name", "email", "membership_id", "id"]
+    ordering = ["-date_joined"]
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if request.method in permissions.SAFE_METHODS:
+            routers.use_replica(request.user.pk)
 
-    # List all users with profiles
+    # The dashboard's list: validated by ETag, or only what changed with ?updated_since=
     def list(self, request, *args, **kwargs):
-        users = self.get_queryset()
-        serializer = AdminUserSerializer(users, many=True)
-        data = serializer.data
+        since = request.query_params.get("updated_since")
+        if since:
+            return self.delta(request, changes.parse_since(since))
 
-        # inject membership_id into each user JSON
-        for i, user in enumerate(users):
-            data[i]["membership_id"] = getattr(user, "membership_id", None) or getattr(user.user, "membership_id", None)
+        page = self.paginate_queryset(self.filter_queryset(self.get_queryset()))
+        etag = changes.page_etag(page, self.paginator.get_next_link(), self.paginator.get_previous_link())
+        not_modified = changes.not_modified(request, etag)
+        if not_modified is not None:
+            return not_modified
+        response = self.get_paginated_response(self.get_serializer(page, many=True).data)
+        for header, value in changes.validator_headers(etag).items():
+            response[header] = value
+        return response
 
-        return Response(data)
+    def delta(self, request, since):
+        """
+        Users changed or deleted since ``since``, oldest change first.
+
+        The list filters don't apply: a user who stopped matching them has to
+        come back too, so the client re-applies its own view. Deleted ids are
+        sent with the first page; once ``next`` is null, ``synced_at`` is
+        the ``updated_since`` of the following sync.
+        """
+        synced_at = timezone.now()
+        paginator = AdminUserDeltaPagination()
+        page = paginator.paginate_queryset(changes.changed_since(self.get_queryset(), since), request, view=self)
+        first_page = not request.query_params.get(paginator.cursor_query_param)
+        return Response({
+            "synced_at": synced_at,
+            "next": paginator.get_next_link(),
+            "previous": paginator.get_previous_link(),
+            "results": self.get_serializer(page, many=True).data,
+            "deleted": changes.deleted_since(since) if first_page else [],
+        })
 
     def retrieve(self, request, *args, **kwargs):
+        if changes.is_conditional(request):
+            # revalidate from the timestamp alone, before loading the profile and its rows
+            stamp = self.stored_updated_at(kwargs[self.lookup_field])
+            if stamp is not None:
+                not_modified = changes.not_modified(request, changes.user_etag(kwargs[self.lookup_field], stamp), stamp)
+                if not_modified is not None:
+                    return not_modified
+
         user = self.get_object()
-        serializer = AdminUserSerializer(user)
-        data = serializer.data
+        response = Response(self.get_serializer(user).data)
+        for header, value in changes.validator_headers(changes.user_etag(user.pk, user.updated_at), user.updated_at).items():
+            response[header] = value
+        return response
+
+    def stored_updated_at(self, pk):
+        try:
+            return self.filter_queryset(CustomUser.objects.filter(pk=pk)).values_list("updated_at", flat=True).first()
+        except (TypeError, ValueError):
+            return None  # not an id; get_object() answers 404
 
-        # inject membership_id into single user JSON
-        data["membership_id"] = getattr(user, "membership_id", None) or getattr(user.user, "membership_id", None)
+    # Stream every matching user (same filters as the list) as CSV or NDJSON
+    @action(detail=False, methods=["get"], url_path="export")
+    def export(self, request):
+        export_format = request.query_params.get("export_format", "csv")
+        if export_format not in EXPORT_FORMATS:
+            return Response(
+                {"error": f"export_format must be one of: {', '.join(EXPORT_FORMATS)}"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        queryset = export_queryset(request.query_params)
+        if routers.current_replica():
+            # the stream is consumed after this request's routing has ended: pin it explicitly
+            queryset = queryset.using(routers.current_replica())
+        content_type = "text/csv" if export_format == "csv" else "application/x-ndjson"
+        response = StreamingHttpResponse(iter_export(queryset, export_format), content_type=content_type)
+        response["Content-Disposition"] = f'attachment; filename="members.{export_format}"'
+        return response
+
+    # Ranked full-text search: ?q=<words>&limit=&offset=
+    @action(detail=False, methods=["get"], url_path="search")
+    def search_users(self, request):
+        query = request.query_params.get("q", "")
+        if not search.terms(query):
+            return Response({"error": "q is required"}, status=status.HTTP_400_BAD_REQUEST)
+        paginator = MemberSearchPagination()
+        hits = paginator.paginate_search(search.search_members, query, request)
+        users = self.get_queryset().in_bulk([user_id for user_id, _ in hits])
+        results = []
+        for user_id, rank in hits:
+            if user_id in users:
+                results.append({**AdminUserSerializer(users[user_id], context={"request": request}).data,
+                                "rank": rank})
+        return paginator.get_paginated_response(results)
 
-        return Response(data)
     # Update user and profile
     def update(self, request, *args, **kwargs):
         user = self.get_object()
@@ -195,8 +346,31 @@ class AdminUserViewSet(viewsets.ModelViewSet):
         user.save()
         serializer = AdminUserSerializer(user)
         return Response({"message": f"User {user.email} unblocked", "user": serializer.data})
+
+    # Block / unblock / activate many users: {"action": ..., "ids": [...]} or {"action": ..., "filter": {...}}
+    @action(detail=False, methods=["post"], url_path="bulk")
+    def bulk_action(self, request):
+        serializer = AdminBulkActionSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+        if "ids" in data:
+            queryset = CustomUser.objects.filter(pk__in=data["ids"])
+        else:
+            queryset = filter_users(CustomUser.objects.all(), data["filter"])
+            if queryset.count() > settings.BULK_ACTION_MAX_USERS:
+                return Response({"error": f"The filter matches more than {settings.BULK_ACTION_MAX_USERS} users; "
+                                          "narrow it down or send ids."}, status=status.HTTP_400_BAD_REQUEST)
+
+        results = bulk.apply(data["action"], queryset, ids=data.get("ids"), actor=request.user)
+        return Response({
+            "action": data["action"],
+            "counts": Counter(results.values()),
+            "results": {str(user_id): result for user_id, result in sorted(results.items())},
+        })
 @api_view(["POST"])
 @permission_classes([AllowAny])
+@authentication_classes([])
+@throttle_classes([AdminLoginThrottle])
 def admin_login(request):
     email = request.data.get("email")
     password = request.data.get("password")
@@ -222,10 +396,6 @@ def admin_login(request):
 @api_view(["GET"])
 @permission_classes([IsAdminUser])
 def admin_stats(request):
-    stats = CustomUser.objects.aggregate(
-        total_users=Count("id"),
-        active_users=Count("id", filter=Q(is_active=True, is_blocked=False)),
-        blocked_users=Count("id", filter=Q(is_blocked=True)),
-        pending_users=Count("id", filter=Q(is_active=False, is_blocked=False)),
-    )
-    return Response(stats)
\ No newline at end of file
+    # O(1): counters are maintained on every status change (see users.stats)
+    routers.use_replica(request.user.pk)
+    return Response(stats.current())